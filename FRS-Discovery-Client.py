@@ -17,122 +17,185 @@ its employees, or its help desk. This is an independent community tool.
 For official FlexRadio support: https://www.flexradio.com
 """
 
-import socket
 import time
+STARTED = time.perf_counter()  # Startup timing includes the imports below
+
+import socket
 import datetime
-import configparser
 import logging
 import json
 import os
-import sys
-import shutil
-import glob
-from health_checks import HealthChecker
+import select
+import struct
+import threading
+from admin_socket import AdminServer
+from config_reload import ConfigReloader, apply_settings, diagnostics_setters
+from console_status import ConsoleRenderer
+from scheduler import StartupTimer
+from stream_protocol import (CompressedLineFramer, RadioFilter, HEARTBEAT_FRAME, COMPRESSION_METHOD, PROTOCOL_VERSION,
+                             FRAME_ENCODING, set_keepalive, encode_message, decode_frames)
+from settings import ClientSettings, load_config
+from stream_hub import StreamHub
+from log_pipeline import ChangeJournal, HexDump, FieldTable, diff_fields
 
 __version__ = "3.0.1"
 
 # Logging will be configured after log rotation
 LOG_FILE = 'discovery-client.log'
+JOURNAL_FILE = 'discovery-client-journal.jsonl'
 
-def rotate_log_file(log_file, max_log_files=2):
-    """Rotate log file at startup by renaming with timestamp and clean up old logs
-    
-    Args:
-        log_file: Path to the log file to rotate
-        max_log_files: Maximum number of archived log files to keep (0 = keep all)
-    """
-    if os.path.exists(log_file):
-        # Get file modification time for timestamp
-        try:
-            file_time = os.path.getmtime(log_file)
-            timestamp = datetime.datetime.fromtimestamp(file_time).strftime("%Y%m%d_%H%M%S")
-            
-            # Create archived filename
-            base_name = os.path.splitext(log_file)[0]
-            ext = os.path.splitext(log_file)[1]
-            archived_name = f"{base_name}_{timestamp}{ext}"
-            
-            # Rename existing log
-            shutil.move(log_file, archived_name)
-            print(f"Rotated log file: {log_file} → {archived_name}")
-            
-            # Clean up old log files if max_log_files is set
-            if max_log_files > 0:
-                cleanup_old_logs(log_file, max_log_files)
-            
-            return True
-        except Exception as e:
-            print(f"Warning: Could not rotate log file: {e}")
-            return False
-    return False
-
-def cleanup_old_logs(log_file, max_log_files):
-    """Remove old archived log files beyond the specified limit
-    
-    Args:
-        log_file: Base log file name
-        max_log_files: Maximum number of archived logs to keep
-    """
-    try:
-        base_name = os.path.splitext(log_file)[0]
-        ext = os.path.splitext(log_file)[1]
-        directory = os.path.dirname(log_file) or '.'
-        
-        # Find all archived log files matching the pattern
-        pattern = os.path.join(directory, f"{os.path.basename(base_name)}_*{ext}")
-        archived_logs = glob.glob(pattern)
-        
-        # Sort by modification time (oldest first)
-        archived_logs.sort(key=lambda x: os.path.getmtime(x))
-        
-        # Delete oldest files if we exceed the limit
-        files_to_delete = len(archived_logs) - max_log_files
-        if files_to_delete > 0:
-            for old_log in archived_logs[:files_to_delete]:
-                try:
-                    os.remove(old_log)
-                    print(f"Deleted old log file: {old_log}")
-                except Exception as e:
-                    print(f"Warning: Could not delete old log file {old_log}: {e}")
-    except Exception as e:
-        print(f"Warning: Could not cleanup old log files: {e}")
+# Seconds to wait for the server's hello_ack; a v3.0.x server never sends one
+HELLO_ACK_TIMEOUT = 5.0
 
 class DiscoveryClient:
     """Main client class handling TCP socket connection"""
-    def __init__(self, config):
+    def __init__(self, config, config_path=None, settings=None, startup=None):
+        """
+        Args:
+            config: ConfigParser with the CLIENT and DIAGNOSTICS sections
+            config_path: config.ini to watch for reloads (None = no reload)
+            settings: ClientSettings already read from config (read here if not
+                      given; an invalid value raises SettingsError)
+            startup: StartupTimer with the phases so far (default: starts now)
+        """
+        self.startup = startup or StartupTimer()
         self.config = config
+        self.settings = settings = settings or ClientSettings.from_config(config)
+        diagnostics = settings.diagnostics
         self.running = False
         
         # Client settings
-        self.broadcast_address = config['CLIENT']['Broadcast_Address']
-        self.discovery_port = int(config['CLIENT']['Discovery_Port'])
-        self.server_address = config['CLIENT']['Server_Address']
-        self.stream_port = int(config['CLIENT']['Stream_Port'])
-        self.reconnect_interval = float(config['CLIENT']['Reconnect_Interval'])
+        self.broadcast_address = settings.broadcast_address
+        self.discovery_port = settings.discovery_port
+        self.server_address = settings.server_address
+        self.stream_port = settings.stream_port
+        self.reconnect_interval = settings.reconnect_interval
         
         # Cache settings
-        self.cached_packet_file = config['CLIENT'].get('Cached_Packet_File', 'last_discovery_packet.json')
-        self.use_cached_packet = config['CLIENT'].getboolean('Use_Cached_Packet', fallback=True)
-        self.max_cache_age = int(config['CLIENT'].get('Max_Cache_Age', 3600))
-        self.cached_broadcast_interval = float(config['CLIENT'].get('Cached_Broadcast_Interval', 3.0))
+        self.cached_packet_file = settings.cached_packet_file
+        self.use_cached_packet = settings.use_cached_packet
+        self.max_cache_age = settings.max_cache_age
+        self.cached_broadcast_interval = settings.cached_broadcast_interval
+        
+        # Dead-peer detection: TCP keepalive plus application heartbeats
+        self.keepalive_idle = settings.link.keepalive_idle
+        self.keepalive_interval = settings.link.keepalive_interval
+        self.keepalive_count = settings.link.keepalive_count
+        self.heartbeat_interval = settings.link.heartbeat_interval
+        self.heartbeat_timeout = settings.link.heartbeat_timeout
+        
+        # Transport: 'tcp' stream, or 'udp' datagrams for lossy links (no retransmits, newest frame wins)
+        self.transport = settings.transport
+        self.recv_size = 65535 if self.transport == 'udp' else 4096
+        
+        # Ask the server to compress the stream (TCP only; the server must support it too)
+        self.compression = settings.compression
+        
+        # Subscription: only receive the radios matching these patterns (empty = every radio)
+        self.subscribe_filters = settings.subscribe or {}
+        self.radio_filter = RadioFilter(self.subscribe_filters) if self.subscribe_filters else None
+        if self.transport == 'udp' and self.heartbeat_interval <= 0:
+            # UDP registrations expire without keepalives
+            self.heartbeat_interval, self.heartbeat_timeout = 2.0, 6.0
         
-        # Sockets
+        # Multicast delivery of frames, when the server offers a group
+        self.use_multicast = settings.use_multicast
+        self.multicast_interface = settings.multicast_interface
+        
+        # Sockets (tcp_sock is a connected UDP socket with Transport = udp)
         self.tcp_sock = None
+        self.framer = CompressedLineFramer()  # Splits the stream into newline-delimited JSON messages
         self.udp_sock = None
+        self.multicast_sock = None
+        
+        # Heartbeats are only sent and enforced once the server has sent one or acknowledged our
+        # hello (older servers do neither); the timeout stretches for a server with a slower heartbeat
+        self.server_heartbeats = False
+        self.server_heartbeat_timeout = self.heartbeat_timeout
+        self.server_protocol = 0  # From the server's hello_ack (0 = older server)
+        self.hello_sent_at = 0.0
+        self.hello_ack_timeout = HELLO_ACK_TIMEOUT
+        self.last_server_data = 0.0
+        self.last_heartbeat_sent = 0.0
         
         # Statistics
         self.broadcast_count = 0
         self.last_status = None
         self.last_packet_hex = None
         
+        # Frame sequence tracking (gap detection and resume after reconnect)
+        self.server_id = None
+        self.last_seq = None
+        self.resume_pending = False
+        self.resume_sent_at = 0.0
+        self.sequence_gaps = 0
+        self.frames_missed = 0
+        self.frames_replayed = 0
+        self.server_restarts = 0
+        self.radios_gone = 0
+        self.duplicates = 0
+        
+        # Multicast state: the group's server run, whether frames arrive on it, and
+        # the latest sequence number a heartbeat reported that hadn't arrived yet
+        self.multicast_server_id = None
+        self.multicast_active = False
+        self.multicast_lag_seq = None
+        self.multicast_frames = 0
+        
         # Track payload changes
         self.last_payload = None
+        self.last_parsed = {}
         self.first_packet_received = False
         
+        # Console output is rendered at a fixed rate by a background thread
+        self.reconnect_attempts = 0
+        self.console = ConsoleRenderer(
+            refresh_interval=diagnostics.console_refresh_interval,
+            summary_interval=diagnostics.console_summary_interval,
+            quiet=diagnostics.quiet_console,
+            summary=self.format_status_summary
+        )
+        
+        # Structured journal of discovery changes (JSON Lines)
+        self.journal = None
+        if diagnostics.change_journal:
+            self.journal = ChangeJournal(JOURNAL_FILE)
+        
+        # Relay mode: also serve the stream to downstream clients, under this
+        # client's own sequence numbers (e.g. a site that fans out to several PCs)
+        self.relay = None
+        self.relay_payloads = {}
+        if settings.relay:
+            self.relay = StreamHub.from_settings(settings.relay, self.console, label="Relay client", software=__version__)
+        
         # Cached packet mode
         self.using_cached_packet = False
         self.cached_packet_data = None
         
+        # Local admin socket (stats, relay clients, log level, health checks)
+        self.started_at = time.monotonic()
+        commands = {'stats': self.admin_stats, 'health': self.admin_health}
+        if self.relay:
+            commands.update({'clients': lambda args: self.relay.client_list(), 'kick': self.admin_kick})
+        self.admin = AdminServer.from_settings(settings.admin, commands)
+        
+        # Startup health checks run in the background (Fast_Start)
+        self.startup_check_results = None
+        
+        # Hot reload of config.ini (SIGHUP or file change), without dropping downstream clients
+        self.reloader = ConfigReloader(config_path, config, self.apply_config, console=self.console,
+                                       sections=('CLIENT', 'DIAGNOSTICS')) if config_path else None
+        self.startup.mark('setup')
+    
+    def new_health_checker(self):
+        """Health checker for the current settings
+        
+        health_checks (and the subprocess and platform modules it uses) is
+        imported on first use, so a start without startup tests doesn't pay for it.
+        """
+        from health_checks import HealthChecker
+        return HealthChecker(self.settings, mode='client', version=__version__)
+    
     def start(self):
         """Start the client"""
         print("\n" + "="*70)
@@ -144,25 +207,52 @@ class DiscoveryClient:
         print(f"  Discovery Port: {self.discovery_port}")
         print(f"  Server Address: {self.server_address}")
         print(f"  Stream Port: {self.stream_port}")
+        if self.transport == 'udp':
+            print(f"  Transport: UDP")
+        if self.radio_filter:
+            print(f"  Subscribe: {self.radio_filter}")
         print(f"  Reconnect Interval: {self.reconnect_interval}s")
+        if self.relay:
+            print(f"  Relay: {self.relay.listen_address}:{self.relay.port} (Max Clients: {self.relay.max_clients})")
+        if self.admin:
+            print(f"  Admin Socket: {self.admin.address}:{self.admin.port}")
         
         logging.info(f"Client v{__version__} started")
+        if self.reloader and self.reloader.install_signal_handler():
+            print(f"  Config Reload: on change or SIGHUP (pid {os.getpid()})")
         
-        # Run startup health checks
-        health_checker = HealthChecker(self.config, mode='client', version=__version__)
-        if health_checker.enabled and health_checker.startup_tests:
+        # Run startup health checks; Fast_Start runs them in the background
+        # once packets are being forwarded instead
+        diagnostics = self.settings.diagnostics
+        startup_tests = diagnostics.enable_health_checks and diagnostics.startup_tests
+        if startup_tests and not diagnostics.fast_start:
+            health_checker = self.new_health_checker()
             print()  # Blank line before health checks
             health_checker.run_all_checks()
             health_checker.print_results(title="Startup Health Check")
+            self.startup.mark('health checks')
         else:
             print("\n" + "="*70)
         
         # Setup broadcast socket
         self.setup_udp_socket()
+        self.startup.mark('sockets')
+        
+        # Start accepting downstream stream clients
+        if self.relay:
+            self.relay.start()
+            logging.info(f"Relay listening on {self.relay.listen_address}:{self.relay.port}")
+        if self.admin:
+            self.admin.start()
+        self.startup.mark('services')
         
         print("\nMonitoring for discovery packets...\n")
         
         self.running = True
+        self.console.start()
+        logging.info(f"Startup: {self.startup.summary()}")
+        if startup_tests and diagnostics.fast_start:
+            threading.Thread(target=self.run_deferred_health_check, name='startup-health-check', daemon=True).start()
         
         # Run client
         try:
@@ -193,7 +283,7 @@ class DiscoveryClient:
             with open(self.cached_packet_file, 'w') as f:
                 json.dump(cache_data, f, indent=2)
         except Exception as e:
-            print(f"⚠ Warning: Could not save cached packet: {e}")
+            self.console.notice(f"⚠ Warning: Could not save cached packet: {e}")
     
     def load_cached_packet(self):
         """Load cached discovery packet from file"""
@@ -209,19 +299,21 @@ class DiscoveryClient:
             age_seconds = time.time() - cached_time
             
             if self.max_cache_age > 0 and age_seconds > self.max_cache_age:
-                print(f"⚠ Cached packet is {age_seconds:.0f}s old (max age: {self.max_cache_age}s) - too old to use")
+                self.console.notice(f"⚠ Cached packet is {age_seconds:.0f}s old (max age: {self.max_cache_age}s) - too old to use")
                 return None
             
-            print(f"✓ Loaded cached packet from {cache_data.get('saved_at', 'unknown time')}")
-            print(f"  Cache age: {age_seconds:.0f} seconds")
+            self.console.notice(f"✓ Loaded cached packet from {cache_data.get('saved_at', 'unknown time')}")
+            self.console.notice(f"  Cache age: {age_seconds:.0f} seconds")
             return cache_data['packet_data']
-            
+        
         except Exception as e:
-            print(f"⚠ Warning: Could not load cached packet: {e}")
+            self.console.notice(f"⚠ Warning: Could not load cached packet: {e}")
             return None
     
     def connect_to_server(self):
         """Connect to the server via TCP"""
+        if self.transport == 'udp':
+            return self.register_udp()
         try:
             if self.tcp_sock:
                 try:
@@ -232,41 +324,527 @@ class DiscoveryClient:
             self.tcp_sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
             self.tcp_sock.settimeout(10.0)  # 10 second timeout for connect
             
-            print(f"Connecting to server {self.server_address}:{self.stream_port}...")
+            self.console.notice(f"Connecting to server {self.server_address}:{self.stream_port}...")
             self.tcp_sock.connect((self.server_address, self.stream_port))
             
-            # Set shorter timeout for receiving data (allows periodic status updates)
-            self.tcp_sock.settimeout(2.0)
+            try:
+                set_keepalive(self.tcp_sock, self.keepalive_idle, self.keepalive_interval, self.keepalive_count)
+            except OSError as e:
+                logging.warning(f"Could not enable TCP keepalive: {e}")
+            
+            # Set shorter timeout for receiving data (allows periodic status updates and heartbeats)
+            self.tcp_sock.settimeout(min(2.0, self.heartbeat_interval) if self.heartbeat_interval > 0 else 2.0)
+            
+            # A new connection starts on the stream; the server offers multicast again
+            self.leave_multicast()
+            
+            self.server_heartbeats = False
+            self.server_heartbeat_timeout = self.heartbeat_timeout
+            self.server_protocol = 0
+            self.last_server_data = self.last_heartbeat_sent = time.monotonic()
+            self.framer.reset()
+            self.resume_pending = False
+            self.tcp_sock.sendall(self.build_hello())
+            self.hello_sent_at = time.monotonic()
             
             current_time = datetime.datetime.now().strftime("%H:%M:%S")
-            print(f"\n{current_time} - ✓ Connected to server")
-            print(f"  Listening for discovery packets...\n")
+            self.console.notice(f"\n{current_time} - ✓ Connected to server")
+            self.console.notice(f"  Listening for discovery packets...\n")
             # logging.info(f"Connected to server {self.server_address}:{self.stream_port}")
             return True
-            
+        
         except socket.timeout:
-            print(f"⚠ Connection timeout to {self.server_address}:{self.stream_port}")
+            self.console.notice(f"⚠ Connection timeout to {self.server_address}:{self.stream_port}")
             # logging.error(f"Connection timeout")
             return False
         except ConnectionRefusedError:
-            print(f"⚠ Connection refused by {self.server_address}:{self.stream_port}")
+            self.console.notice(f"⚠ Connection refused by {self.server_address}:{self.stream_port}")
             # logging.error(f"Connection refused")
             return False
         except Exception as e:
-            print(f"⚠ Connection error: {e}")
+            self.console.notice(f"⚠ Connection error: {e}")
             # logging.error(f"Connection error: {e}")
             return False
     
+    def build_hello(self):
+        """Hello message announcing what this client supports and wants
+        
+        The server's hello_ack says what it will use; servers that don't know
+        hello ignore it and just stream (frames are filtered here too).
+        """
+        hello = {'protocol': PROTOCOL_VERSION, 'software': __version__, 'encodings': [FRAME_ENCODING],
+                 'compression': [COMPRESSION_METHOD] if self.compression else [],
+                 'heartbeat_interval': self.heartbeat_interval}
+        if self.compression:
+            # The server's compress line switches the framer over; it stops looking
+            # for it when the hello_ack declines or doesn't come (check_hello_answered)
+            self.framer.expect_compression()
+        
+        # Only the radios we need
+        if self.subscribe_filters:
+            hello['subscribe'] = self.subscribe_filters
+        
+        # Resume token: replay radio state changes missed while disconnected
+        if self.server_id is not None and self.last_seq is not None:
+            hello['resume'] = {'server_id': self.server_id, 'seq': self.last_seq}
+            self.resume_pending = True
+            self.resume_sent_at = time.perf_counter()
+        return encode_message('hello', **hello)
+    
+    def register_udp(self):
+        """Register with the server for frames by datagram (Transport = udp)
+        
+        The server's reply confirms it is reachable; heartbeats keep the
+        registration alive and the run loop re-registers when they stop.
+        """
+        self.close_connection()
+        self.leave_multicast()
+        self.console.notice(f"Registering with server {self.server_address}:{self.stream_port} (UDP)...")
+        deadline = time.monotonic() + min(2.0, self.heartbeat_timeout)
+        try:
+            self.tcp_sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            self.tcp_sock.connect((self.server_address, self.stream_port))
+            fields = {'filters': self.subscribe_filters} if self.subscribe_filters else {}
+            self.tcp_sock.sendall(encode_message('register', **fields))
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise socket.timeout
+                self.tcp_sock.settimeout(remaining)
+                message = json.loads(self.tcp_sock.recv(self.recv_size))
+                if isinstance(message, dict) and message.get('type') == 'registered':
+                    break
+        except (socket.timeout, OSError, ValueError):
+            self.console.notice(f"⚠ No reply from {self.server_address}:{self.stream_port} (UDP)")
+            self.close_connection()
+            return False
+        
+        self.tcp_sock.settimeout(min(2.0, self.heartbeat_interval))
+        self.framer.reset()
+        self.server_heartbeats = True
+        self.last_server_data = self.last_heartbeat_sent = time.monotonic()
+        self.resume_pending = False  # Newest frame wins: nothing is replayed over UDP
+        
+        current_time = datetime.datetime.now().strftime("%H:%M:%S")
+        self.console.notice(f"\n{current_time} - ✓ Registered with server (UDP)")
+        self.console.notice(f"  Listening for discovery packets...\n")
+        return True
+    
+    def log_payload_event(self, current_time, packet_data, packet_bytes, radio_info, parsed_payload):
+        """Log the initial discovery packet or a payload change with full details
+        
+        Records are only queued here; formatting (hex dump, field table) and disk
+        writes happen on the background logging thread.
+        """
+        initial = not self.first_packet_received
+        changed_fields = [] if initial else diff_fields(self.last_parsed, parsed_payload)
+        server_version = packet_data.get('server_version', 'Unknown')
+        
+        logging.info("=" * 80)
+        logging.info(f"{'INITIAL DISCOVERY PACKET' if initial else 'DISCOVERY PAYLOAD CHANGED'} - {current_time}")
+        logging.info("=" * 80)
+        logging.info(f"Radio: {radio_info['model']} ({radio_info['nickname']})")
+        logging.info(f"Callsign: {radio_info['callsign']} | IP: {radio_info['ip']}")
+        logging.info(f"Status: {radio_info['status']} | Version: {radio_info['version']}")
+        if initial:
+            logging.info(f"Serial: {radio_info['serial']}")
+        logging.info(f"Server Version: {server_version}")
+        if initial:
+            logging.info(f"Broadcasting to local network on port {self.discovery_port}")
+        logging.info(f"Packet Size: {len(packet_bytes)} bytes")
+        logging.info("")
+        
+        if changed_fields:
+            logging.info("Changed Fields:")
+            logging.info("-" * 80)
+            for key, old_val, new_val in changed_fields:
+                if old_val is None:
+                    logging.info(f"  {key:30} = (new) '{new_val}'")
+                elif new_val is None:
+                    logging.info(f"  {key:30} = (removed) was '{old_val}'")
+                else:
+                    logging.info(f"  {key:30} = '{old_val}' → '{new_val}'")
+            logging.info("")
+        
+        logging.info("Full Packet Hex Dump:")
+        logging.info("-" * 80)
+        logging.info("%s", HexDump(packet_bytes))
+        logging.info("-" * 80)
+        logging.info("")
+        
+        logging.info("Parsed Discovery Fields:" if initial else "All Current Discovery Fields:")
+        logging.info("-" * 80)
+        logging.info("%s", FieldTable(parsed_payload))
+        logging.info("=" * 80)
+        logging.info("")
+        
+        if self.journal:
+            self.journal.record('initial' if initial else 'changed', radio_info, changed_fields,
+                                server_version=server_version, packet_size=len(packet_bytes))
+        
+        if initial:
+            self.console.notice(f"   ℹ Initial discovery packet logged to {LOG_FILE} (full hex dump included)")
+        else:
+            self.console.notice(f"   ℹ Payload change logged to {LOG_FILE} (full hex dump included)")
+        
+        self.first_packet_received = True
+        self.last_parsed = parsed_payload
+    
+    def format_status_summary(self, counters, elapsed):
+        """Periodic console summary line (called by the console renderer)"""
+        broadcasts = counters.get('broadcasts', 0)
+        if not broadcasts:
+            return None
+        if self.using_cached_packet and self.cached_packet_data:
+            radio_info = self.cached_packet_data.get('radio_info', {})
+            return (f"[CACHED MODE] Broadcasting {radio_info.get('model', 'Unknown')} (packet #{self.broadcast_count})\n"
+                    f"  Reconnect attempts: {self.reconnect_attempts} | Next attempt in {self.reconnect_interval:.0f}s")
+        relayed = f" → relayed to {self.relay.client_count} client(s)" if self.relay else ""
+        lost = f" ({counters['frames_lost']} frame(s) lost over UDP)" if counters.get('frames_lost') else ""
+        return f"✓ [LIVE] Broadcasting... ({broadcasts} in {elapsed:.0f}s, packet #{self.broadcast_count}){relayed}{lost}"
+    
+    def service_heartbeat(self):
+        """Send a heartbeat to the server when one is due
+        
+        Returns:
+            False if the server has sent nothing for longer than Heartbeat_Timeout
+        """
+        if self.heartbeat_interval <= 0 or not self.server_heartbeats:
+            return True
+        now = time.monotonic()
+        if now - self.last_server_data > self.server_heartbeat_timeout:
+            return False
+        if now - self.last_heartbeat_sent >= self.heartbeat_interval:
+            self.tcp_sock.sendall(HEARTBEAT_FRAME)
+            self.last_heartbeat_sent = now
+        return True
+    
+    def handle_server_message(self, message, via_multicast=False):
+        """Handle a control message received from the server"""
+        message_type = message.get('type')
+        if message_type == 'hello_ack':
+            self.handle_hello_ack(message)
+        elif message_type == 'heartbeat':
+            self.server_heartbeats = True
+            if self.multicast_active and isinstance(message.get('seq'), int):
+                self.check_multicast_lag(message['seq'])
+        elif message_type == 'resumed':
+            self.handle_resumed(message)
+        elif message_type == 'radio_gone':
+            if self.is_duplicate(message):
+                return
+            self.track_sequence(message, via_multicast)
+            if self.radio_filter is None or self.radio_filter.match(message.get('radio_info')):
+                self.handle_radio_gone(message)
+        elif message_type == 'multicast':
+            self.join_multicast(message)
+    
+    def handle_hello_ack(self, ack):
+        """Adopt the options the server chose in answer to our hello"""
+        self.server_protocol = ack.get('protocol') if isinstance(ack.get('protocol'), int) else 0
+        interval = ack.get('heartbeat_interval')
+        if isinstance(interval, (int, float)) and interval > 0 and self.heartbeat_interval > 0:
+            self.server_heartbeats = True
+            self.server_heartbeat_timeout = max(self.heartbeat_timeout, 3 * interval)
+        if not ack.get('compression'):
+            self.framer.expect_compression(False)
+        elif not self.framer.compressed and not self.framer.expecting_compression:
+            # Answered after check_hello_answered gave up: the compressed stream can't be read
+            logging.warning(f"Server answered hello after {self.hello_ack_timeout:g}s with compression - reconnecting")
+            self.close_connection()
+            return
+        logging.info(f"Server {ack.get('software') or 'unknown version'} (protocol {self.server_protocol}, "
+                     f"server ID {ack.get('server_id')}): compression {ack.get('compression') or 'off'}, "
+                     f"heartbeat {interval or 'off'}, history {ack.get('history')} changes")
+    
+    def check_hello_answered(self, now):
+        """Stop looking for the compress line if the server hasn't answered the hello in time
+        
+        A v3.0.x server never sends hello_ack, so the stream stays plain JSON;
+        searching every chunk for the switch would cost CPU for the life of
+        the connection.
+        """
+        if self.framer.expecting_compression and now - self.hello_sent_at > self.hello_ack_timeout:
+            self.framer.expect_compression(False)
+            logging.info(f"No hello_ack from server in {self.hello_ack_timeout:g}s (v3.0.x server): "
+                         f"stream is not compressed")
+    
+    def request_resume(self, until=None):
+        """Ask the server to replay radio state changes after the last frame received
+        
+        Args:
+            until: Sequence number of the first frame received after a gap
+                   (default: everything missed up to the live stream)
+        """
+        fields = {'server_id': self.server_id, 'seq': self.last_seq}
+        if until is not None:
+            fields['until'] = until
+        self.tcp_sock.sendall(encode_message('resume', **fields))
+        self.resume_pending = True
+        self.resume_sent_at = time.perf_counter()
+    
+    def join_multicast(self, offer):
+        """Join the multicast group the server offered (frames keep coming over TCP until one arrives)"""
+        if not self.use_multicast or self.radio_filter is not None or self.multicast_sock is not None:
+            return  # Multicast carries every radio, so subscribed clients stay on the stream
+        group, port = offer.get('group'), offer.get('port')
+        try:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            sock.bind(('', port))
+            membership = struct.pack('4s4s', socket.inet_aton(group), socket.inet_aton(self.multicast_interface or '0.0.0.0'))
+            sock.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP, membership)
+        except (OSError, TypeError) as e:
+            logging.warning(f"Could not join multicast group {group}:{port}: {e} - staying on TCP")
+            return
+        self.multicast_sock = sock
+        self.multicast_server_id = offer.get('server_id')
+        logging.info(f"Joined multicast group {group}:{port}")
+    
+    def leave_multicast(self):
+        """Leave the multicast group (frames come over TCP)"""
+        if self.multicast_sock is not None:
+            self.multicast_sock.close()
+            self.multicast_sock = None
+        self.multicast_active = False
+        self.multicast_lag_seq = None
+    
+    def receive_multicast(self):
+        """Read one multicast datagram (one frame)"""
+        try:
+            data = self.multicast_sock.recv(65535)
+            packet_data = json.loads(data)
+        except (OSError, ValueError):
+            return
+        if not isinstance(packet_data, dict) or packet_data.get('server_id') != self.multicast_server_id:
+            return  # Not from the server we're connected to
+        
+        if not self.multicast_active:
+            # Frames arrive: stop the server sending them over TCP as well
+            self.multicast_active = True
+            self.tcp_sock.sendall(encode_message('multicast', active=True))
+            current_time = datetime.datetime.now().strftime("%H:%M:%S")
+            self.console.notice(f"{current_time} - ✓ Receiving frames by multicast")
+            logging.info("Receiving frames by multicast")
+        self.multicast_frames += 1
+        try:
+            self.handle_frame(packet_data, via_multicast=True)
+        except Exception as e:
+            self.console.notice(f"Error processing packet: {e}")
+    
+    def check_multicast_lag(self, seq):
+        """Fall back to TCP if frames a heartbeat announced still haven't arrived by the next one"""
+        if self.last_seq is None or self.last_seq >= seq:
+            self.multicast_lag_seq = None
+            return
+        if self.multicast_lag_seq is None or self.last_seq >= self.multicast_lag_seq:
+            self.multicast_lag_seq = seq  # Could still be in flight
+            return
+        
+        current_time = datetime.datetime.now().strftime("%H:%M:%S")
+        self.console.notice(f"{current_time} - ⚠ Multicast frames stopped arriving - falling back to TCP")
+        logging.warning("Multicast frames stopped arriving - falling back to TCP")
+        self.tcp_sock.sendall(encode_message('multicast', active=False))
+        self.leave_multicast()
+        self.request_resume()
+    
+    def is_duplicate(self, packet_data):
+        """True for a frame already received or superseded (multicast duplicate, late UDP datagram)
+        
+        Older frames are expected while a resume request is being answered.
+        """
+        seq = packet_data.get('seq')
+        if (seq is None or self.last_seq is None or self.resume_pending
+                or packet_data.get('server_id') != self.server_id or seq > self.last_seq):
+            return False
+        self.duplicates += 1
+        return True
+    
+    def handle_radio_gone(self, message):
+        """Stop rebroadcasting a radio the server no longer hears"""
+        radio_info = message.get('radio_info', {})
+        serial = message.get('serial')
+        self.radios_gone += 1
+        
+        current_time = datetime.datetime.now().strftime("%H:%M:%S")
+        self.console.notice(f"{current_time} - ⚠ Radio gone: {radio_info.get('model', 'Unknown')} "
+                            f"({radio_info.get('nickname', 'Unknown')}) - server no longer hears it")
+        logging.warning(f"Radio gone: {radio_info.get('model', 'Unknown')} ({radio_info.get('nickname', 'Unknown')}) serial {serial}")
+        if self.journal:
+            self.journal.record('radio_gone', radio_info)
+        
+        # Forget the cached packet so cached mode doesn't advertise a dead radio
+        cached_serial = (self.cached_packet_data or {}).get('radio_info', {}).get('serial')
+        if cached_serial == serial:
+            self.cached_packet_data = None
+            try:
+                os.remove(self.cached_packet_file)
+            except OSError:
+                pass
+        
+        if self.last_packet_hex and radio_info.get('serial') == self.last_parsed.get('serial'):
+            self.console.forget('radio')
+            self.last_packet_hex = None
+        
+        if self.relay:
+            self.relay_payloads.pop(serial, None)
+            self.relay.publish(dict(message), is_change=True)
+    
+    def handle_resumed(self, message):
+        """Record the outcome of a resume request"""
+        self.resume_pending = False
+        elapsed_ms = (time.perf_counter() - self.resume_sent_at) * 1000
+        current_time = datetime.datetime.now().strftime("%H:%M:%S")
+        
+        if message.get('missed') is None:
+            # Server was restarted: its history doesn't cover what we missed
+            if message.get('server_id') != self.server_id:
+                self.note_server_restart(message.get('server_id'), message.get('seq'))
+            return
+        
+        missed = message.get('missed', 0)
+        replayed = message.get('replayed', 0)
+        self.frames_missed += missed
+        self.frames_replayed += replayed
+        if missed:
+            self.sequence_gaps += 1
+        if isinstance(message.get('seq'), int):
+            self.last_seq = max(self.last_seq or 0, message['seq'])
+        
+        incomplete = "" if message.get('complete', True) else " (older changes no longer available)"
+        self.console.notice(f"{current_time} - Resumed stream: {missed} frame(s) missed while disconnected, "
+                            f"{replayed} change(s) replayed in {elapsed_ms:.0f}ms{incomplete}")
+        logging.info(f"Resumed stream: {missed} frame(s) missed, {replayed} change(s) replayed in {elapsed_ms:.0f}ms{incomplete}")
+    
+    def note_server_restart(self, server_id, seq):
+        """Start sequence tracking over for a new server run"""
+        if self.server_id is not None:
+            self.server_restarts += 1
+            current_time = datetime.datetime.now().strftime("%H:%M:%S")
+            self.console.notice(f"{current_time} - Server restarted - frames sent while disconnected can't be recovered")
+            logging.warning("Server restarted - sequence numbers reset")
+        self.server_id = server_id
+        self.last_seq = seq
+    
+    def track_sequence(self, packet_data, via_multicast=False):
+        """Count frames lost between consecutive sequence numbers
+        
+        Datagrams lost from the multicast group are fetched over TCP instead.
+        With Transport = udp loss is expected, so gaps are counted in the
+        console summary and logged at debug level rather than one warning each.
+        """
+        seq = packet_data.get('seq')
+        if seq is None:
+            return  # Older server without sequence numbers
+        if packet_data.get('server_id') != self.server_id:
+            self.note_server_restart(packet_data.get('server_id'), seq)
+            return
+        if self.last_seq is not None and seq > self.last_seq + 1 and not self.resume_pending:
+            if self.radio_filter is not None:
+                self.last_seq = seq  # Frames of other radios are skipped on purpose
+                return
+            if via_multicast:
+                self.request_resume(until=seq)  # The 'resumed' reply counts the gap
+                self.last_seq = seq
+                return
+            missed = seq - self.last_seq - 1
+            self.sequence_gaps += 1
+            self.frames_missed += missed
+            if self.transport == 'udp':
+                self.console.count('frames_lost', missed)
+                logging.debug(f"Sequence gap: {missed} frame(s) lost (seq {self.last_seq} -> {seq})")
+            else:
+                logging.warning(f"Sequence gap: {missed} frame(s) missed (seq {self.last_seq} -> {seq})")
+        if self.last_seq is None or seq > self.last_seq:
+            self.last_seq = seq
+    
+    def close_connection(self):
+        """Close the server connection (the run loop reconnects)"""
+        if self.tcp_sock is None:
+            return
+        try:
+            self.tcp_sock.close()
+        except Exception:
+            pass
+        self.tcp_sock = None
+    
+    def handle_frame(self, packet_data, via_multicast=False):
+        """Process one frame from the server (stream or multicast)"""
+        # Control messages carry a "type" field; discovery packets don't
+        if 'type' in packet_data:
+            self.handle_server_message(packet_data, via_multicast)
+            return
+        
+        if self.is_duplicate(packet_data):
+            return
+        self.track_sequence(packet_data, via_multicast)
+        if self.radio_filter is not None and not self.radio_filter.match(packet_data.get('radio_info')):
+            return  # Not subscribed (older server sends every radio)
+        
+        # Extract packet hex and convert to bytes
+        packet_bytes = bytes.fromhex(packet_data['packet_hex'])
+        
+        # Display radio information
+        current_time = datetime.datetime.now().strftime("%H:%M:%S")
+        radio_info = packet_data['radio_info']
+        parsed_payload = packet_data.get('parsed_payload', {})
+        
+        # Check if payload changed (compare parsed payload as string to avoid header variations)
+        payload_str = json.dumps(parsed_payload, sort_keys=True)
+        payload_changed = (payload_str != self.last_payload)
+        
+        # Only print if packet changed or status changed
+        if packet_data['packet_hex'] != self.last_packet_hex or self.last_status != 'broadcasting':
+            self.console.update('radio', f"Radio discovered:\n"
+                                         f"  {radio_info['model']} ({radio_info['nickname']})\n"
+                                         f"  Callsign: {radio_info['callsign']} | IP: {radio_info['ip']}\n"
+                                         f"  Status: {radio_info['status']} | Version: {radio_info['version']}\n"
+                                         f"  Server: v{packet_data.get('server_version', 'Unknown')}")
+        
+        # Log initial packet or payload changes (formatted and written by the background logger)
+        if not self.first_packet_received or payload_changed:
+            self.log_payload_event(current_time, packet_data, packet_bytes, radio_info, parsed_payload)
+            self.last_payload = payload_str
+        
+        # Broadcast the packet
+        self.udp_sock.sendto(packet_bytes, (self.broadcast_address, self.discovery_port))
+        self.broadcast_count += 1
+        if self.startup.first_packet is None:
+            self.startup_complete()
+        
+        # Forward downstream (radio state changes are kept for relay clients that resume)
+        if self.relay:
+            is_change = self.relay_payloads.get(radio_info['serial']) != payload_str
+            self.relay_payloads[radio_info['serial']] = payload_str
+            self.relay.publish(dict(packet_data), is_change=is_change)
+        
+        # Save packet to cache for offline use
+        if self.use_cached_packet:
+            self.save_cached_packet(packet_data)
+            self.cached_packet_data = packet_data  # Keep in memory too
+        
+        # Status update (periodic progress is reported by the console summary)
+        self.console.count('broadcasts')
+        if self.last_status != 'broadcasting':
+            self.console.notice(f"{current_time} - ✓ Started broadcasting discovery packets [LIVE MODE]")
+            self.last_status = 'broadcasting'
+        
+        self.last_packet_hex = packet_data['packet_hex']
+    
     def run(self):
         """Run client with TCP connection to server"""
-        health_checker = HealthChecker(self.config, mode='client', version=__version__)
         last_health_check = time.time()
         last_status_update = time.time()
         last_cached_broadcast = 0
-        buffer = ""  # Buffer for incomplete JSON messages
+        last_reload_check = time.monotonic()
+        framer = self.framer  # Reset by connect_to_server
         reconnect_attempts = 0
         
         while self.running:
+            if self.reloader and time.monotonic() - last_reload_check >= self.reloader.poll_interval:
+                self.reloader.check()
+                last_reload_check = time.monotonic()
+            
             # Try to connect if not connected
             if not self.tcp_sock:
                 if not self.connect_to_server():
@@ -280,20 +858,16 @@ class DiscoveryClient:
                         if self.cached_packet_data:
                             self.using_cached_packet = True
                             current_time = datetime.datetime.now().strftime("%H:%M:%S")
-                            print(f"\n{current_time} - ⚠ Server unreachable after {reconnect_attempts} attempts")
-                            print(f"  Switching to CACHED PACKET MODE")
-                            print(f"  Broadcasting cached discovery packet every {self.cached_broadcast_interval}s")
-                            print(f"  Will continue trying to reconnect to server...\n")
+                            self.console.notice(f"\n{current_time} - ⚠ Server unreachable after {reconnect_attempts} attempts")
+                            self.console.notice(f"  Switching to CACHED PACKET MODE")
+                            self.console.notice(f"  Broadcasting cached discovery packet every {self.cached_broadcast_interval}s")
+                            self.console.notice(f"  Will continue trying to reconnect to server...\n")
                             
                             # Log the switch to cached mode
                             radio_info = self.cached_packet_data.get('radio_info', {})
                             logging.warning(f"Server unreachable - switched to cached packet mode")
                             logging.info(f"  Broadcasting cached packet: {radio_info.get('model', 'Unknown')} ({radio_info.get('nickname', 'Unknown')})")
                             logging.info(f"  Last received: {self.cached_packet_data.get('timestamp', 'Unknown')}")
-                            
-                            # Flush log
-                            for handler in logging.getLogger().handlers:
-                                handler.flush()
                     
                     # If using cached packet, broadcast it while waiting to reconnect
                     if self.using_cached_packet and self.cached_packet_data:
@@ -305,24 +879,19 @@ class DiscoveryClient:
                                 packet_bytes = bytes.fromhex(self.cached_packet_data['packet_hex'])
                                 self.udp_sock.sendto(packet_bytes, (self.broadcast_address, self.discovery_port))
                                 self.broadcast_count += 1
+                                self.reconnect_attempts = reconnect_attempts
+                                self.console.count('broadcasts')
                                 last_cached_broadcast = current_time_val
-                                
-                                # Periodic status message
-                                if self.broadcast_count % 20 == 0:
-                                    current_time = datetime.datetime.now().strftime("%H:%M:%S")
-                                    radio_info = self.cached_packet_data.get('radio_info', {})
-                                    print(f"{current_time} - [CACHED MODE] Broadcasting {radio_info.get('model', 'Unknown')} (packet #{self.broadcast_count})")
-                                    print(f"  Reconnect attempts: {reconnect_attempts} | Next attempt in {self.reconnect_interval:.0f}s")
                             except Exception as e:
-                                print(f"⚠ Error broadcasting cached packet: {e}")
+                                self.console.notice(f"⚠ Error broadcasting cached packet: {e}")
                         
                         # Wait a bit before next reconnect attempt
                         time.sleep(0.5)
                     else:
                         # No cached packet available
                         if reconnect_attempts == 1 and self.use_cached_packet:
-                            print(f"  No cached packet available for offline mode")
-                        print(f"Retrying in {self.reconnect_interval} seconds...")
+                            self.console.notice(f"  No cached packet available for offline mode")
+                        self.console.notice(f"Retrying in {self.reconnect_interval} seconds...")
                         time.sleep(self.reconnect_interval)
                     
                     continue
@@ -330,212 +899,70 @@ class DiscoveryClient:
                     # Successfully connected
                     if self.using_cached_packet:
                         current_time = datetime.datetime.now().strftime("%H:%M:%S")
-                        print(f"\n{current_time} - ✓ Reconnected to server - switching to LIVE MODE\n")
+                        self.console.notice(f"\n{current_time} - ✓ Reconnected to server - switching to LIVE MODE\n")
                         logging.info("Reconnected to server - switched from cached to live mode")
                         self.using_cached_packet = False
                     
                     reconnect_attempts = 0
             
             try:
+                if not self.service_heartbeat():
+                    # Server went silent (e.g. VPN dropped): don't wait for TCP to notice
+                    current_time = datetime.datetime.now().strftime("%H:%M:%S")
+                    self.console.notice(f"\n{current_time} - No heartbeat from server for {self.server_heartbeat_timeout:g}s - reconnecting")
+                    logging.warning("Server heartbeat timeout - reconnecting")
+                    self.close_connection()
+                    self.last_status = 'disconnected'
+                    continue
+                
+                # Multicast frames arrive on their own socket; the stream stays the control channel
+                if self.multicast_sock is not None:
+                    readable, _, _ = select.select([self.tcp_sock, self.multicast_sock], [], [], self.tcp_sock.gettimeout())
+                    if self.multicast_sock in readable:
+                        self.receive_multicast()
+                    if self.tcp_sock not in readable:
+                        if not readable:
+                            raise socket.timeout
+                        continue
+                
                 # Receive data from server (with timeout)
-                data = self.tcp_sock.recv(4096)
+                data = self.tcp_sock.recv(self.recv_size)
                 
                 if not data:
                     # Server closed connection
                     current_time = datetime.datetime.now().strftime("%H:%M:%S")
-                    print(f"\n{current_time} - Server closed connection")
+                    self.console.notice(f"\n{current_time} - Server closed connection")
                     # logging.warning("Server closed connection")
                     self.tcp_sock = None
                     time.sleep(self.reconnect_interval)
                     continue
                 
+                self.last_server_data = time.monotonic()
+                self.check_hello_answered(self.last_server_data)
+                
                 # Log received data
                 # logging.debug(f"Received {len(data)} bytes from server")
                 
-                # Add received data to buffer
-                buffer += data.decode('utf-8')
-                # logging.debug(f"Buffer now contains {len(buffer)} characters")
-                
-                # Process complete JSON messages (delimited by newlines)
-                while '\n' in buffer:
-                    line, buffer = buffer.split('\n', 1)
-                    
-                    if not line.strip():
-                        # logging.debug("Skipping empty line")
-                        continue
-                    
+                # Process complete JSON messages (delimited by newlines; malformed ones are skipped)
+                for packet_data in decode_frames(framer.feed(data)):
                     try:
-                        # logging.debug(f"Parsing JSON line ({len(line)} chars)")
-                        # Parse JSON packet data
-                        packet_data = json.loads(line)
-                        # logging.debug(f"Successfully parsed JSON packet")
-                        
-                        # Extract packet hex and convert to bytes
-                        packet_bytes = bytes.fromhex(packet_data['packet_hex'])
-                        
-                        # Display radio information
-                        current_time = datetime.datetime.now().strftime("%H:%M:%S")
-                        radio_info = packet_data['radio_info']
-                        parsed_payload = packet_data.get('parsed_payload', {})
-                        
-                        # Check if payload changed (compare parsed payload as string to avoid header variations)
-                        payload_str = json.dumps(parsed_payload, sort_keys=True)
-                        payload_changed = (payload_str != self.last_payload)
-                        
-                        # Only print if packet changed or status changed
-                        if packet_data['packet_hex'] != self.last_packet_hex or self.last_status != 'broadcasting':
-                            print(f"{current_time} - Radio discovered:")
-                            print(f"  {radio_info['model']} ({radio_info['nickname']})")
-                            print(f"  Callsign: {radio_info['callsign']} | IP: {radio_info['ip']}")
-                            print(f"  Status: {radio_info['status']} | Version: {radio_info['version']}")
-                            print(f"  Server: v{packet_data.get('server_version', 'Unknown')}")
-                        
-                        # Log initial packet or payload changes
-                        if not self.first_packet_received:
-                            # Log the first discovery packet with full details
-                            logging.info("=" * 80)
-                            logging.info(f"INITIAL DISCOVERY PACKET - {current_time}")
-                            logging.info("=" * 80)
-                            logging.info(f"Radio: {radio_info['model']} ({radio_info['nickname']})")
-                            logging.info(f"Callsign: {radio_info['callsign']} | IP: {radio_info['ip']}")
-                            logging.info(f"Status: {radio_info['status']} | Version: {radio_info['version']}")
-                            logging.info(f"Serial: {radio_info['serial']}")
-                            logging.info(f"Server Version: {packet_data.get('server_version', 'Unknown')}")
-                            logging.info(f"Broadcasting to local network on port {self.discovery_port}")
-                            logging.info(f"Packet Size: {len(packet_bytes)} bytes")
-                            logging.info("")
-                            
-                            # Log full hex dump
-                            logging.info("Full Packet Hex Dump:")
-                            logging.info("-" * 80)
-                            # Format hex dump in 16-byte lines with offset
-                            for i in range(0, len(packet_bytes), 16):
-                                hex_part = ' '.join(f"{b:02x}" for b in packet_bytes[i:i+16])
-                                ascii_part = ''.join(chr(b) if 32 <= b < 127 else '.' for b in packet_bytes[i:i+16])
-                                logging.info(f"{i:04x}  {hex_part:<48}  {ascii_part}")
-                            logging.info("-" * 80)
-                            logging.info("")
-                            
-                            # Log all parsed fields
-                            logging.info("Parsed Discovery Fields:")
-                            logging.info("-" * 80)
-                            for key, value in sorted(parsed_payload.items()):
-                                logging.info(f"  {key:30} = {value}")
-                            logging.info("=" * 80)
-                            logging.info("")
-                            
-                            # Flush log to disk immediately
-                            for handler in logging.getLogger().handlers:
-                                handler.flush()
-                            
-                            print(f"   ℹ Initial discovery packet logged to {LOG_FILE} (full hex dump included)")
-                            self.first_packet_received = True
-                            self.last_payload = payload_str
-                        elif payload_changed:
-                            # Log when payload changes with full details
-                            logging.info("=" * 80)
-                            logging.info(f"DISCOVERY PAYLOAD CHANGED - {current_time}")
-                            logging.info("=" * 80)
-                            logging.info(f"Radio: {radio_info['model']} ({radio_info['nickname']})")
-                            logging.info(f"Callsign: {radio_info['callsign']} | IP: {radio_info['ip']}")
-                            logging.info(f"Status: {radio_info['status']} | Version: {radio_info['version']}")
-                            logging.info(f"Server Version: {packet_data.get('server_version', 'Unknown')}")
-                            logging.info(f"Packet Size: {len(packet_bytes)} bytes")
-                            logging.info("")
-                            
-                            # Log specific changed fields
-                            if self.last_payload:
-                                try:
-                                    old_parsed = json.loads(self.last_payload)
-                                    changed_fields = []
-                                    for key in parsed_payload.keys():
-                                        if key in old_parsed and parsed_payload[key] != old_parsed.get(key):
-                                            changed_fields.append((key, old_parsed.get(key), parsed_payload[key]))
-                                        elif key not in old_parsed:
-                                            changed_fields.append((key, None, parsed_payload[key]))
-                                    
-                                    # Check for removed fields
-                                    for key in old_parsed.keys():
-                                        if key not in parsed_payload:
-                                            changed_fields.append((key, old_parsed[key], None))
-                                    
-                                    if changed_fields:
-                                        logging.info("Changed Fields:")
-                                        logging.info("-" * 80)
-                                        for key, old_val, new_val in changed_fields:
-                                            if old_val is None:
-                                                logging.info(f"  {key:30} = (new) '{new_val}'")
-                                            elif new_val is None:
-                                                logging.info(f"  {key:30} = (removed) was '{old_val}'")
-                                            else:
-                                                logging.info(f"  {key:30} = '{old_val}' → '{new_val}'")
-                                        logging.info("")
-                                except:
-                                    pass
-                            
-                            # Log full hex dump
-                            logging.info("Full Packet Hex Dump:")
-                            logging.info("-" * 80)
-                            # Format hex dump in 16-byte lines with offset
-                            for i in range(0, len(packet_bytes), 16):
-                                hex_part = ' '.join(f"{b:02x}" for b in packet_bytes[i:i+16])
-                                ascii_part = ''.join(chr(b) if 32 <= b < 127 else '.' for b in packet_bytes[i:i+16])
-                                logging.info(f"{i:04x}  {hex_part:<48}  {ascii_part}")
-                            logging.info("-" * 80)
-                            logging.info("")
-                            
-                            # Log all current parsed fields
-                            logging.info("All Current Discovery Fields:")
-                            logging.info("-" * 80)
-                            for key, value in sorted(parsed_payload.items()):
-                                logging.info(f"  {key:30} = {value}")
-                            logging.info("=" * 80)
-                            logging.info("")
-                            
-                            # Flush log to disk immediately
-                            for handler in logging.getLogger().handlers:
-                                handler.flush()
-                            
-                            print(f"   ℹ Payload change logged to {LOG_FILE} (full hex dump included)")
-                            self.last_payload = payload_str
-                        
-                        # Broadcast the packet
-                        self.udp_sock.sendto(packet_bytes, (self.broadcast_address, self.discovery_port))
-                        self.broadcast_count += 1
-                        
-                        # Save packet to cache for offline use
-                        if self.use_cached_packet:
-                            self.save_cached_packet(packet_data)
-                            self.cached_packet_data = packet_data  # Keep in memory too
-                        
-                        # Status update
-                        if self.last_status != 'broadcasting':
-                            print(f"{current_time} - ✓ Started broadcasting discovery packets [LIVE MODE]")
-                            self.last_status = 'broadcasting'
-                        else:
-                            # Periodic update
-                            if self.broadcast_count % 10 == 0:  # Every 10 broadcasts
-                                mode_indicator = "[LIVE]" if not self.using_cached_packet else "[CACHED]"
-                                print(f"{current_time} - ✓ {mode_indicator} Broadcasting... (packet #{self.broadcast_count})")
-                        
-                        self.last_packet_hex = packet_data['packet_hex']
-                        
-                    except json.JSONDecodeError as e:
-                        # logging.error(f"JSON decode error: {e}")
-                        continue
+                        self.handle_frame(packet_data)
                     except Exception as e:
-                        print(f"Error processing packet: {e}")
+                        self.console.notice(f"Error processing packet: {e}")
                         # logging.error(f"Packet processing error: {e}")
                         continue
                 
                 # Periodic health check
                 current_time_val = time.time()
-                if (health_checker.enabled and 
-                    health_checker.periodic_interval > 0 and 
-                    current_time_val - last_health_check >= health_checker.periodic_interval):
+                diagnostics = self.settings.diagnostics  # Replaced when the config is reloaded
+                if (diagnostics.enable_health_checks and 
+                    diagnostics.periodic_check_interval > 0 and 
+                    current_time_val - last_health_check >= diagnostics.periodic_check_interval):
                     
                     current_time = datetime.datetime.now().strftime("%H:%M:%S")
+                    self.console.render()  # Keep output in order before the health check report
                     print(f"\n{current_time} - Running periodic health check...")
+                    health_checker = self.new_health_checker()
                     health_checker.run_all_checks()
                     health_checker.print_results(title="Periodic Health Check")
                     last_health_check = current_time_val
@@ -548,26 +975,157 @@ class DiscoveryClient:
                 if current_time_val - last_status_update >= 10.0:
                     current_time = datetime.datetime.now().strftime("%H:%M:%S")
                     if self.last_status != 'broadcasting':
-                        print(f"{current_time} - Waiting for discovery packets from server...")
-                        print(f"  Connected but no packets received yet (broadcast count: {self.broadcast_count})")
+                        self.console.notice(f"{current_time} - Waiting for discovery packets from server...")
+                        self.console.notice(f"  Connected but no packets received yet (broadcast count: {self.broadcast_count})")
                     last_status_update = current_time_val
                 
                 continue
             
             except ConnectionResetError:
-                print("Connection reset by server")
+                self.console.notice("Connection reset by server")
                 # logging.warning("Connection reset by server")
                 self.tcp_sock = None
                 self.last_status = 'disconnected'
                 time.sleep(self.reconnect_interval)
             
             except Exception as e:
-                print(f"Socket error: {e}")
+                self.console.notice(f"Socket error: {e}")
                 # logging.error(f"Socket error: {e}")
                 self.tcp_sock = None
                 self.last_status = 'error'
                 time.sleep(self.reconnect_interval)
     
+    def apply_config(self, config, changes):
+        """Apply a reloaded config.ini in place (ConfigReloader callback)
+        
+        Connection settings (keepalive, heartbeats, compression, multicast) take
+        effect from the next connection; a new server address or port reconnects
+        now. Returns the changed settings that need a restart.
+        """
+        settings = ClientSettings.from_config(config)  # SettingsError rejects the whole reload
+        setters = diagnostics_setters(self.console)
+        for name in ('broadcast_address', 'discovery_port', 'reconnect_interval', 'use_cached_packet', 'max_cache_age',
+                     'cached_broadcast_interval', 'compression', 'use_multicast', 'multicast_interface'):
+            setters[('CLIENT', name)] = (lambda s, name=name: getattr(s, name),
+                                         lambda value, name=name: setattr(self, name, value))
+        for name in ('keepalive_idle', 'keepalive_interval', 'keepalive_count', 'heartbeat_interval', 'heartbeat_timeout'):
+            setters[('CLIENT', name)] = (lambda s, name=name: getattr(s.link, name),
+                                         lambda value, name=name: setattr(self, name, value))
+        
+        def reconnect_to(name):
+            def apply(value):
+                setattr(self, name, value)
+                self.close_connection()  # The run loop reconnects to the new server
+            return apply
+        setters[('CLIENT', 'server_address')] = (lambda s: s.server_address, reconnect_to('server_address'))
+        setters[('CLIENT', 'stream_port')] = (lambda s: s.stream_port, reconnect_to('stream_port'))
+        setters[('CLIENT', 'subscribe')] = (lambda s: s.subscribe or {}, self.resubscribe)
+        
+        health_keys = ('enable_health_checks', 'periodic_check_interval', 'ping_timeout', 'display_interface_info',
+                       'test_server_ip', 'test_radio_ip')
+        # Health checks read self.settings when they run: nothing to apply beyond the new settings
+        setters.update({('DIAGNOSTICS', key): (lambda s: s.diagnostics, lambda diagnostics: None)
+                        for key in health_keys})
+        
+        relay = self.relay if settings.relay else None  # Turning the relay on or off needs a restart
+        if relay:
+            setters[('CLIENT', 'relay_max_clients')] = (lambda s: s.relay.max_clients,
+                                                        lambda value: setattr(relay, 'max_clients', value))
+            setters[('CLIENT', 'history_size')] = (lambda s: s.relay.history_size, relay.resize_history)
+        
+        # The relay listener moves only if its address or port changed
+        relay_keys = [key for key in (('CLIENT', 'relay_listen_address'), ('CLIENT', 'relay_port'))
+                      if relay and key in changes]
+        
+        restart = [key for key in apply_settings(settings, changes, setters) if key not in relay_keys]
+        self.config, self.settings = config, settings
+        if self.relay:
+            # Relay clients share this client's keepalive, heartbeat and compression settings
+            for name in ('keepalive_idle', 'keepalive_interval', 'keepalive_count', 'heartbeat_interval',
+                         'heartbeat_timeout', 'compression'):
+                if ('CLIENT', name) in changes:
+                    setattr(self.relay, name, getattr(self, name))
+        if relay_keys:
+            relay_address, relay_port = settings.relay.listen_address, settings.relay.port
+            try:
+                self.relay.rebind(relay_address, relay_port)
+                self.console.notice(f"Relay listening on {self.relay.listen_address}:{self.relay.port}")
+            except OSError as e:
+                self.console.notice(f"⚠ Cannot move the relay to {relay_address}:{relay_port} ({e}) - keeping it where it is")
+                restart += relay_keys
+        return restart
+    
+    def resubscribe(self, filters):
+        """Switch to new subscription filters without reconnecting (config reload)"""
+        self.subscribe_filters = filters
+        self.radio_filter = RadioFilter(filters) if filters else None
+        if self.radio_filter is not None:
+            self.leave_multicast()  # Multicast carries every radio
+        if self.tcp_sock is None:
+            return
+        if self.transport == 'udp':
+            self.close_connection()  # Registers again with the new filters
+            return
+        try:
+            self.tcp_sock.sendall(encode_message('subscribe', filters=filters))
+        except OSError:
+            self.close_connection()
+    
+    def run_deferred_health_check(self):
+        """Startup health checks put off by Fast_Start (background thread; packets are already flowing)"""
+        health_checker = self.new_health_checker()
+        health_checker.run_all_checks()
+        self.console.render()  # Keep output in order before the health check report
+        health_checker.print_results(title="Startup Health Check (deferred by Fast_Start)")
+        self.startup_check_results = health_checker.results
+    
+    def startup_complete(self):
+        """The first packet was forwarded: report how long startup took"""
+        self.startup.first_packet_forwarded()
+        logging.info(f"Startup: {self.startup.summary()}")
+        self.console.notice(f"   ℹ Startup: {self.startup.summary()}")
+    
+    def admin_stats(self, args):
+        """Client statistics (admin socket `stats`)"""
+        return {
+            'version': __version__,
+            'uptime_seconds': round(time.monotonic() - self.started_at),
+            'status': self.last_status,
+            'transport': self.transport,
+            'server': f"{self.server_address}:{self.stream_port}",
+            'server_protocol': self.server_protocol,
+            'server_id': self.server_id,
+            'last_seq': self.last_seq,
+            'broadcasts': self.broadcast_count,
+            'cached_mode': self.using_cached_packet,
+            'sequence_gaps': self.sequence_gaps,
+            'frames_missed': self.frames_missed,
+            'frames_replayed': self.frames_replayed,
+            'server_restarts': self.server_restarts,
+            'duplicates': self.duplicates,
+            'multicast_active': self.multicast_active,
+            'multicast_frames': self.multicast_frames,
+            'compressed_frames': self.framer.compressed_frames,
+            'relay_clients': self.relay.client_count if self.relay else None,
+            'startup': self.startup.summary()
+        }
+    
+    def admin_kick(self, args):
+        """Disconnect a relay client (admin socket `kick <host:port>`)"""
+        if len(args) != 1:
+            raise ValueError("usage: kick <host:port> (see 'clients')")
+        if not self.relay.kick(args[0]):
+            raise ValueError(f"no relay client {args[0]}")
+        logging.info(f"Relay client {args[0]} kicked from the admin socket")
+        return f"kicked {args[0]}"
+    
+    def admin_health(self, args):
+        """Run the health checks now, even if periodic checks are off (admin socket `health`)"""
+        health_checker = self.new_health_checker()
+        health_checker.enabled = True
+        return [{'name': result.name, 'status': result.status.value, 'message': result.message}
+                for result in health_checker.run_all_checks()]
+    
     def stop(self):
         """Stop the client and cleanup"""
         self.running = False
@@ -575,6 +1133,8 @@ class DiscoveryClient:
         # Close sockets
         if self.tcp_sock:
             try:
+                if self.transport == 'udp':
+                    self.tcp_sock.sendall(encode_message('unregister'))
                 self.tcp_sock.close()
             except:
                 pass
@@ -582,48 +1142,41 @@ class DiscoveryClient:
         if self.udp_sock:
             self.udp_sock.close()
         
+        self.leave_multicast()
+        
+        if self.relay:
+            self.relay.stop()
+        
+        if self.admin:
+            self.admin.stop()
+        
+        if self.journal:
+            self.journal.close()
+        
+        self.console.stop()
+        
         print(f"\nSocket(s) closed. Client stopped.")
         print(f"Total broadcasts: {self.broadcast_count}")
+        if self.sequence_gaps or self.server_restarts:
+            print(f"Sequence gaps: {self.sequence_gaps} ({self.frames_missed} frame(s) missed, "
+                  f"{self.frames_replayed} change(s) replayed) | Server restarts: {self.server_restarts}")
+        if self.multicast_frames:
+            print(f"Multicast frames received: {self.multicast_frames} ({self.duplicates} duplicate(s) dropped)")
+        elif self.duplicates:
+            print(f"Late or duplicate frames dropped: {self.duplicates}")
+        if self.framer.compressed_frames:
+            ratio = self.framer.decompressed_bytes / max(1, self.framer.compressed_bytes)
+            cost = self.framer.decompress_time / self.framer.compressed_frames * 1e6
+            print(f"Stream compression: {ratio:.1f}:1 ({self.framer.compressed_bytes} bytes received for "
+                  f"{self.framer.decompressed_bytes}), {cost:.1f} µs per frame to decompress")
         logging.info(f"Client stopped - Total broadcasts: {self.broadcast_count}")
 
-def load_config():
-    """Load configuration from config.ini"""
-    config = configparser.ConfigParser()
-    
-    if not os.path.exists('config.ini'):
-        print("ERROR: config.ini not found!")
-        sys.exit(1)
-    
-    config.read('config.ini')
-    
-    # Get max log files setting
-    max_log_files = config.getint('DIAGNOSTICS', 'Max_Log_Files', fallback=2)
-    
-    # Rotate log file at startup
-    rotate_log_file(LOG_FILE, max_log_files)
-    
-    # Configure logging after rotation
-    logging.basicConfig(
-        filename=LOG_FILE,
-        level=logging.INFO,
-        format='%(asctime)s - %(levelname)s - %(message)s',
-        force=True  # Override any existing configuration
-    )
-    
-    # Configure debug logging if enabled
-    try:
-        debug_logging = config.getboolean('DIAGNOSTICS', 'Debug_Logging', fallback=False)
-        if debug_logging:
-            logging.getLogger().setLevel(logging.DEBUG)
-            print("DEBUG: Debug logging enabled (check discovery-client.log for details)")
-    except:
-        pass
-    
-    return config
-
 def main():
-    config = load_config()
-    client = DiscoveryClient(config)
+    startup = StartupTimer(STARTED)
+    startup.mark('imports')
+    config, settings = load_config('config.ini', ClientSettings, LOG_FILE)
+    startup.mark('config')
+    client = DiscoveryClient(config, config_path='config.ini', settings=settings, startup=startup)
     client.start()
 
 if __name__ == "__main__":
@@ -17,123 +17,81 @@ its employees, or its help desk. This is an independent community tool.
 For official FlexRadio support: https://www.flexradio.com
 """
 
-import socket
 import time
+STARTED = time.perf_counter()  # Startup timing includes the imports below
+
+import socket
 import datetime
-import configparser
 import logging
 import json
 import os
-import sys
 import threading
 import select
-import shutil
-import glob
-from health_checks import HealthChecker, HealthStatus
+from admin_socket import AdminServer
+from config_reload import ConfigReloader, apply_settings, diagnostics_setters
+from console_status import ConsoleRenderer
+from ingress_filter import EchoFilter, IngressFilter
+from scheduler import Scheduler, StartupTimer
+from settings import ServerSettings, load_config
+from socket_handoff import HandoffServer, confirm_takeover, handoff_supported, request_takeover
+from stream_hub import StreamHub
+from stream_protocol import (VITA_HEADER_SIZE, VITA_PACKET_TYPE, extract_radio_info, packet_frame,
+                             parse_discovery_payload)
+from traffic_capture import CaptureWriter
+from log_pipeline import ChangeJournal, HexDump, FieldTable, diff_fields
 
 __version__ = "3.0.1"
 
 # Logging will be configured after log rotation
 LOG_FILE = 'discovery-server.log'
+JOURNAL_FILE = 'discovery-server-journal.jsonl'
 
-def rotate_log_file(log_file, max_log_files=2):
-    """Rotate log file at startup by renaming with timestamp and clean up old logs
-    
-    Args:
-        log_file: Path to the log file to rotate
-        max_log_files: Maximum number of archived log files to keep (0 = keep all)
-    """
-    if os.path.exists(log_file):
-        # Get file modification time for timestamp
-        try:
-            file_time = os.path.getmtime(log_file)
-            timestamp = datetime.datetime.fromtimestamp(file_time).strftime("%Y%m%d_%H%M%S")
-            
-            # Create archived filename
-            base_name = os.path.splitext(log_file)[0]
-            ext = os.path.splitext(log_file)[1]
-            archived_name = f"{base_name}_{timestamp}{ext}"
-            
-            # Rename existing log
-            shutil.move(log_file, archived_name)
-            print(f"Rotated log file: {log_file} → {archived_name}")
-            
-            # Clean up old log files if max_log_files is set
-            if max_log_files > 0:
-                cleanup_old_logs(log_file, max_log_files)
-            
-            return True
-        except Exception as e:
-            print(f"Warning: Could not rotate log file: {e}")
-            return False
-    return False
-
-def cleanup_old_logs(log_file, max_log_files):
-    """Remove old archived log files beyond the specified limit
-    
-    Args:
-        log_file: Base log file name
-        max_log_files: Maximum number of archived logs to keep
-    """
-    try:
-        base_name = os.path.splitext(log_file)[0]
-        ext = os.path.splitext(log_file)[1]
-        directory = os.path.dirname(log_file) or '.'
-        
-        # Find all archived log files matching the pattern
-        pattern = os.path.join(directory, f"{os.path.basename(base_name)}_*{ext}")
-        archived_logs = glob.glob(pattern)
-        
-        # Sort by modification time (oldest first)
-        archived_logs.sort(key=lambda x: os.path.getmtime(x))
-        
-        # Delete oldest files if we exceed the limit
-        files_to_delete = len(archived_logs) - max_log_files
-        if files_to_delete > 0:
-            for old_log in archived_logs[:files_to_delete]:
-                try:
-                    os.remove(old_log)
-                    print(f"Deleted old log file: {old_log}")
-                except Exception as e:
-                    print(f"Warning: Could not delete old log file {old_log}: {e}")
-    except Exception as e:
-        print(f"Warning: Could not cleanup old log files: {e}")
-
-class ClientConnection:
-    """Represents a connected client"""
-    def __init__(self, sock, addr):
-        self.sock = sock
-        self.addr = addr
-        self.connected_at = time.time()
-        self.packets_sent = 0
-    
-    def send_packet(self, data):
-        """Send packet data to client"""
-        try:
-            # Send packet as JSON with newline delimiter
-            json_data = json.dumps(data) + '\n'
-            bytes_data = json_data.encode('utf-8')
-            self.sock.sendall(bytes_data)
-            self.packets_sent += 1
-            # logging.debug(f"Sent {len(bytes_data)} bytes to {self.addr} (packet #{self.packets_sent})")
-            return True
-        except Exception as e:
-            # logging.error(f"Error sending to client {self.addr}: {e}")
-            return False
+class RadioActivity:
+    """Tracks one radio's broadcast cadence for stale detection"""
+    
+    # Weight of the newest inter-arrival time in the moving average
+    EWMA_ALPHA = 0.2
+    
+    def __init__(self, radio_info, now):
+        self.radio_info = radio_info
+        self.first_seen = now
+        self.last_seen = now
+        self.interval = None  # Exponentially weighted inter-arrival time (seconds)
+        self.packets = 1
+    
+    def update(self, radio_info, now):
+        """Record a broadcast received at `now`"""
+        gap = now - self.last_seen
+        if self.interval is None:
+            self.interval = gap
+        else:
+            self.interval += self.EWMA_ALPHA * (gap - self.interval)
+        self.radio_info = radio_info
+        self.last_seen = now
+        self.packets += 1
 
 class DiscoveryServer:
     """Main server class handling TCP socket streaming"""
-    def __init__(self, config):
+    def __init__(self, config, config_path=None, settings=None, startup=None):
+        """
+        Args:
+            config: ConfigParser with the SERVER and DIAGNOSTICS sections
+            config_path: config.ini to watch for reloads (None = no reload)
+            settings: ServerSettings already read from config (read here if not
+                      given; an invalid value raises SettingsError)
+            startup: StartupTimer with the phases so far (default: starts now)
+        """
+        self.startup = startup or StartupTimer()
         self.config = config
+        self.settings = settings = settings or ServerSettings.from_config(config)
+        diagnostics = settings.diagnostics
         self.running = False
-        self.clients = []
-        self.clients_lock = threading.Lock()
         
         # Server settings
-        self.listen_address = config['SERVER']['Listen_Address']
-        self.discovery_port = int(config['SERVER']['Discovery_Port'])
-        self.stream_port = int(config['SERVER']['Stream_Port'])
-        self.max_clients = int(config['SERVER']['Max_Clients'])
+        self.listen_address = settings.listen_address
+        self.discovery_port = settings.discovery_port
+        self.stream_port = settings.stream.port
+        self.max_clients = settings.stream.max_clients
         
         # Sockets
         self.udp_sock = None
@@ -143,10 +101,91 @@ class DiscoveryServer:
         self.packet_count = 0
         self.last_packet_time = None
         
+        # Radio state changes are kept by the stream hub for clients that resume
+        self.radio_payloads = {}
+        
+        # Per-radio stale detection: a radio is gone after Stale_Interval_Multiple
+        # times its own broadcast interval (never sooner than Stale_Minimum_Seconds;
+        # Stale_Default_Seconds until its cadence is known)
+        self.stale_multiple = settings.stale_interval_multiple
+        self.stale_minimum = settings.stale_minimum_seconds
+        self.stale_default = settings.stale_default_seconds
+        self.radios = {}
+        self.next_stale_check = float('inf')
+        
+        # Housekeeping timers, run by the packet loop on every wakeup
+        self.scheduler = Scheduler()
+        self.stale_task = None
+        self.health_task = None
+        self.startup_check_results = None  # Startup health checks run in the background (Fast_Start)
+        
         # Track payload changes
         self.last_payload = None
+        self.last_parsed = {}
         self.first_packet_received = False
         
+        # Console output is rendered at a fixed rate by a background thread
+        self.console = ConsoleRenderer(
+            refresh_interval=diagnostics.console_refresh_interval,
+            summary_interval=diagnostics.console_summary_interval,
+            quiet=diagnostics.quiet_console,
+            summary=self.format_status_summary
+        )
+        
+        # Stream clients: fan-out, heartbeats, keepalive and resume (shared with client relay mode)
+        self.hub = StreamHub.from_settings(settings.stream, self.console, software=__version__)
+        self.clients = self.hub.clients
+        self.clients_lock = self.hub.clients_lock
+        
+        # Structured journal of discovery changes (JSON Lines)
+        self.journal = None
+        if diagnostics.change_journal:
+            self.journal = ChangeJournal(JOURNAL_FILE)
+        
+        # Optional capture of every received datagram (replay with traffic_capture.py)
+        self.capture_file = settings.capture_file
+        self.recorder = CaptureWriter(self.capture_file) if self.capture_file else None
+        
+        # Flood protection: per-source allowlist and rate limit, checked before anything else
+        self.ingress = IngressFilter(settings.source_rate_limit, settings.source_burst, settings.allowed_sources,
+                                     notice=self.console.notice)
+        
+        # Loop protection: copies of recent packets from another source (client rebroadcasts) are dropped
+        self.echoes = EchoFilter(settings.echo_window_seconds, notice=self.console.notice)
+        
+        # Local admin socket (stats, client listing and kicking, log level, health checks)
+        self.started_at = time.monotonic()
+        self.admin = AdminServer.from_settings(settings.admin, {
+            'stats': self.admin_stats,
+            'clients': lambda args: self.hub.client_list(),
+            'radios': self.admin_radios,
+            'kick': self.admin_kick,
+            'health': self.admin_health
+        })
+        
+        # Hot reload of config.ini (SIGHUP or file change), without dropping clients
+        self.reloader = ConfigReloader(config_path, config, self.apply_config, console=self.console,
+                                       sections=('SERVER', 'DIAGNOSTICS')) if config_path else None
+        
+        # Zero-downtime upgrades: a newer process started with the same Handoff_Socket
+        # takes over the bound sockets and client connections (Linux/Unix)
+        self.handoff_path = settings.handoff_socket
+        if self.handoff_path and not handoff_supported():
+            print("⚠ Handoff_Socket needs Unix domain sockets with descriptor passing - handoff disabled")
+            self.handoff_path = ''
+        self.handoff = None
+        self.handed_off = False
+        self.startup.mark('setup')
+    
+    def new_health_checker(self):
+        """Health checker for the current settings
+        
+        health_checks (and the subprocess and platform modules it uses) is
+        imported on first use, so a start without startup tests doesn't pay for it.
+        """
+        from health_checks import HealthChecker
+        return HealthChecker(self.settings, mode='server', version=__version__)
+    
     def start(self):
         """Start the server"""
         print("\n" + "="*70)
@@ -158,40 +197,77 @@ class DiscoveryServer:
         print(f"  Discovery Port: {self.discovery_port}")
         print(f"  Stream Port: {self.stream_port}")
         print(f"  Max Clients: {self.max_clients}")
+        if self.hub.udp:
+            print(f"  UDP Transport: port {self.stream_port}")
+        if self.hub.multicast_group:
+            print(f"  Multicast: {self.hub.multicast_group}:{self.hub.multicast_port} (TTL {self.hub.multicast_ttl})")
+        if self.recorder:
+            print(f"  Traffic Capture: {self.capture_file}")
+        if self.ingress.rate > 0:
+            print(f"  Source Rate Limit: {self.ingress.rate:g} packet(s)/s per source (burst {self.ingress.burst})")
+        if self.ingress.allowed:
+            print(f"  Allowed Sources: {', '.join(str(network) for network in self.ingress.allowed)}")
+        if self.admin:
+            print(f"  Admin Socket: {self.admin.address}:{self.admin.port}")
         
         logging.info(f"Server v{__version__} started")
+        if self.reloader and self.reloader.install_signal_handler():
+            print(f"  Config Reload: on change or SIGHUP (pid {os.getpid()})")
+        
+        # Take over from a running server instead of binding (its ports are in use)
+        takeover = None
+        if self.handoff_path:
+            try:
+                takeover = request_takeover(self.handoff_path)
+            except ConnectionError as e:
+                print(f"⚠ {e} - starting fresh")
         
-        # Run startup health checks (before sockets are setup)
-        health_checker = HealthChecker(self.config, mode='server', version=__version__)
-        if health_checker.enabled and health_checker.startup_tests:
+        # Run startup health checks (before sockets are setup); Fast_Start runs
+        # them in the background once packets are being forwarded instead
+        diagnostics = self.settings.diagnostics
+        startup_tests = takeover is None and diagnostics.enable_health_checks and diagnostics.startup_tests
+        if startup_tests and not diagnostics.fast_start:
+            health_checker = self.new_health_checker()
             print()  # Blank line before health checks
             health_checker.run_all_checks(is_startup=True)
             health_checker.print_results(title="Startup Health Check")
+            self.startup.mark('health checks')
         else:
             print("\n" + "="*70)
         
         # Setup sockets
-        self.setup_udp_socket()
-        self.setup_tcp_socket()
+        if takeover is not None:
+            self.adopt(*takeover[:2])
+        else:
+            self.setup_udp_socket()
+            self.setup_tcp_socket()
+        self.startup.mark('sockets')
         
-        # Set running flag before starting accept thread
+        # Set running flag before starting the stream hub
         self.running = True
         
-        # Start client acceptor thread
-        accept_thread = threading.Thread(target=self.accept_clients, daemon=True)
-        accept_thread.start()
+        # Start accepting and servicing stream clients
+        self.hub.start()
+        if takeover is not None:
+            confirm_takeover(takeover[2])
+            print(f"\n✓ Took over from the running server: {len(self.hub.clients)} client connection(s), "
+                  f"stream continues at #{self.hub.frame_seq}")
+            logging.info(f"Took over from the running server v{takeover[0].get('version')}")
+        if self.admin:
+            self.admin.start()
+        if self.handoff_path:
+            self.handoff = HandoffServer(self.handoff_path)
+            self.handoff.start()
+        self.startup.mark('services')
         
-        # Post-startup verification
-        if health_checker.enabled:
+        # Post-startup verification (the stream socket is already listening: no need to wait)
+        if takeover is None and diagnostics.enable_health_checks and not diagnostics.fast_start:
+            from health_checks import HealthStatus
             print("\n" + "="*70)
             print("Post-Startup Verification")
             print("="*70)
-            time.sleep(0.5)  # Give server time to start listening
-            health_checker_verify = HealthChecker(self.config, mode='server', version=__version__)
-            health_checker_verify.run_all_checks(is_startup=False)
-            
-            # Only print TCP Listener result
-            tcp_result = next((r for r in health_checker_verify.results if 'TCP Listener' in r.name), None)
+            tcp_result = self.new_health_checker().check_listener(self.stream_port)
+            self.startup.mark('verification')
             if tcp_result:
                 status_symbol = {
                     HealthStatus.PASS: "[+]",
@@ -216,6 +292,10 @@ class DiscoveryServer:
         print("(Waiting for radio broadcasts on UDP port 4992)\n")
         
         self.running = True
+        self.console.start()
+        logging.info(f"Startup: {self.startup.summary()}")
+        if startup_tests and diagnostics.fast_start:
+            threading.Thread(target=self.run_deferred_health_check, name='startup-health-check', daemon=True).start()
         
         # Main packet reception loop
         try:
@@ -231,385 +311,530 @@ class DiscoveryServer:
     
     def setup_udp_socket(self):
         """Setup UDP socket for receiving discovery packets"""
-        self.udp_sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        self.udp_sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-        self.udp_sock.bind((self.listen_address, self.discovery_port))
-        self.udp_sock.settimeout(1.0)  # 1 second timeout for periodic checks
+        self.udp_sock = self.open_discovery_socket(self.listen_address, self.discovery_port)
+        self.discovery_port = self.udp_sock.getsockname()[1]  # Resolve port 0 (ephemeral)
+    
+    def adopt(self, state, sockets):
+        """Continue from the sockets and state a previous server process handed over"""
+        self.udp_sock = sockets[0]
+        self.udp_sock.settimeout(1.0)
+        self.listen_address, self.discovery_port = self.udp_sock.getsockname()[:2]
+        self.hub.adopt(state['hub'], sockets[1:])
+        self.tcp_sock = self.hub.sock
+        self.stream_port = self.hub.port
+        
+        self.packet_count = state['packet_count']
+        self.radio_payloads = {serial: bytes.fromhex(payload) for serial, payload in state['radio_payloads'].items()}
+        for info in state['radios']:
+            radio = RadioActivity(info['radio_info'], info['first_seen'])
+            radio.last_seen, radio.interval, radio.packets = info['last_seen'], info['interval'], info['packets']
+            self.radios[info['radio_info']['serial']] = radio
+        self.check_stale_radios(time.time())
+    
+    def hand_off(self):
+        """Pass sockets, clients and state to the process taking over (from the packet loop)"""
+        self.console.notice("Handing over to a new server process...")
+        if self.admin:
+            self.admin.stop()
+        self.hub.detach()
+        hub_state, hub_sockets = self.hub.export_state()
+        state = {
+            'version': __version__,
+            'packet_count': self.packet_count,
+            'radio_payloads': {serial: payload.hex() for serial, payload in self.radio_payloads.items()},
+            'radios': [{'radio_info': radio.radio_info, 'first_seen': radio.first_seen, 'last_seen': radio.last_seen,
+                        'interval': radio.interval, 'packets': radio.packets} for radio in self.radios.values()],
+            'hub': hub_state
+        }
+        if self.handoff.hand_off(state, [self.udp_sock] + hub_sockets):
+            self.handed_off = True
+            self.running = False
+            self.console.notice(f"✓ Handed {len(hub_state['clients'])} client connection(s) over to the new server process")
+            logging.info("Handed over to a new server process")
+            return
+        
+        self.console.notice("⚠ Handoff failed - carrying on")
+        self.hub.start()
+        if self.admin:
+            self.admin.start()
+    
+    @staticmethod
+    def open_discovery_socket(listen_address, port):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        try:
+            sock.bind((listen_address, port))
+        except OSError:
+            sock.close()
+            raise
+        sock.settimeout(1.0)  # 1 second timeout for periodic checks
+        return sock
     
     def setup_tcp_socket(self):
         """Setup TCP socket for client connections"""
-        self.tcp_sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        self.tcp_sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-        self.tcp_sock.bind((self.listen_address, self.stream_port))
-        self.tcp_sock.listen(self.max_clients)
-        self.tcp_sock.settimeout(1.0)  # Non-blocking with timeout
+        self.hub.listen()
+        self.tcp_sock = self.hub.sock
+        self.stream_port = self.hub.port  # Resolved if port 0 (ephemeral)
         logging.info(f"TCP server listening on {self.listen_address}:{self.stream_port}")
     
-    def accept_clients(self):
-        """Accept incoming client connections"""
+    def log_payload_event(self, timestamp, data, addr, radio_info, parsed_info):
+        """Log the initial discovery packet or a payload change with full details
+        
+        Records are only queued here; formatting (hex dump, field table) and disk
+        writes happen on the background logging thread.
+        """
+        initial = not self.first_packet_received
+        changed_fields = [] if initial else diff_fields(self.last_parsed, parsed_info)
+        
+        logging.info("=" * 80)
+        logging.info(f"{'INITIAL DISCOVERY PACKET' if initial else 'DISCOVERY PAYLOAD CHANGED'} - {timestamp}")
+        logging.info("=" * 80)
+        logging.info(f"Radio: {radio_info['model']} ({radio_info['nickname']})")
+        logging.info(f"Callsign: {radio_info['callsign']} | IP: {radio_info['ip']}")
+        logging.info(f"Status: {radio_info['status']} | Version: {radio_info['version']}")
+        if initial:
+            logging.info(f"Serial: {radio_info['serial']}")
+        logging.info(f"Source: {addr[0]}:{addr[1]} | Packet Size: {len(data)} bytes")
+        logging.info("")
+        
+        if changed_fields:
+            logging.info("Changed Fields:")
+            logging.info("-" * 80)
+            for key, old_val, new_val in changed_fields:
+                if old_val is None:
+                    logging.info(f"  {key:30} = (new) '{new_val}'")
+                elif new_val is None:
+                    logging.info(f"  {key:30} = (removed) was '{old_val}'")
+                else:
+                    logging.info(f"  {key:30} = '{old_val}' → '{new_val}'")
+            logging.info("")
+        
+        logging.info("Full Packet Hex Dump:")
+        logging.info("-" * 80)
+        logging.info("%s", HexDump(data))
+        logging.info("-" * 80)
+        logging.info("")
+        
+        logging.info("Parsed Discovery Fields:" if initial else "All Current Discovery Fields:")
+        logging.info("-" * 80)
+        logging.info("%s", FieldTable(parsed_info))
+        logging.info("=" * 80)
+        logging.info("")
+        
+        if self.journal:
+            self.journal.record('initial' if initial else 'changed', radio_info, changed_fields,
+                                source=f"{addr[0]}:{addr[1]}", packet_size=len(data))
+        
+        if initial:
+            self.console.notice(f"   ℹ Initial discovery packet logged to {LOG_FILE} (full hex dump included)")
+        else:
+            self.console.notice(f"   ℹ Payload change logged to {LOG_FILE} (full hex dump included)")
+        
+        self.first_packet_received = True
+        self.last_payload = data[28:]
+        self.last_parsed = parsed_info
+    
+    def format_status_summary(self, counters, elapsed):
+        """Periodic console summary line (called by the console renderer)"""
+        packets = counters.get('packets', 0)
+        dropped = f" ({counters['dropped']} dropped by flood/echo protection)" if counters.get('dropped') else ""
+        if not packets:
+            return f"⚠ No packets forwarded in {elapsed:.0f}s{dropped}" if dropped else None
+        client_count = self.hub.client_count  # Stream and UDP clients
+        if client_count:
+            return f"{packets} packet(s) in {elapsed:.0f}s → forwarded to {client_count} client(s){dropped}"
+        return f"{packets} packet(s) in {elapsed:.0f}s - ⚠ No clients connected{dropped}"
+    
+    def record_datagram(self, data, addr, current_time):
+        """Append a received datagram to the traffic capture (disabled on write errors)"""
         try:
-            # logging.info("Accept thread started")
-            
-            while self.running:
-                try:
-                    client_sock, client_addr = self.tcp_sock.accept()
-                    # logging.debug(f"Accepted connection from {client_addr}")
-                    
-                    with self.clients_lock:
-                        if len(self.clients) >= self.max_clients:
-                            # logging.warning(f"Max clients reached, rejecting {client_addr}")
-                            client_sock.close()
-                            continue
-                        
-                        client = ClientConnection(client_sock, client_addr)
-                        self.clients.append(client)
-                        print(f"→ Client connected: {client_addr} (Total: {len(self.clients)})")
-                        # logging.info(f"Client connected: {client_addr}")
+            self.recorder.write(data, addr, current_time)
+        except (OSError, ValueError) as e:
+            self.stop_capture(e)
+    
+    def flush_capture(self):
+        """Write buffered capture records to disk (scheduled, so the last packets before a quiet spell are kept)"""
+        if self.recorder is None:
+            return
+        try:
+            self.recorder.flush()
+        except (OSError, ValueError) as e:
+            self.stop_capture(e)
+    
+    def stop_capture(self, error):
+        self.console.notice(f"{datetime.datetime.now().strftime('%H:%M:%S')} - Traffic capture stopped: {error}")
+        logging.error(f"Traffic capture stopped: {error}")
+        self.recorder = None
+    
+    def handle_datagram(self, data, addr, current_time=None):
+        """Process one received discovery datagram and forward it to clients
+        
+        Args:
+            data: Raw datagram
+            addr: (ip, port) it was received from
+            current_time: Arrival time (Unix); defaults to now. Replays pass the recorded time.
+        """
+        if current_time is None:
+            current_time = time.time()
+        timestamp = datetime.datetime.fromtimestamp(current_time).strftime("%Y-%m-%d %H:%M:%S")
+        
+        # Checked against packet time as well, so replayed captures detect stale radios too
+        if current_time >= self.next_stale_check:
+            self.check_stale_radios(current_time)
+        
+        self.packet_count += 1
+        
+        # Only process if it's a valid VITA-49 packet
+        if len(data) >= VITA_HEADER_SIZE and data[0:1] == VITA_PACKET_TYPE:
+            # Try to parse the payload (after the VITA-49 header)
+            if len(data) > VITA_HEADER_SIZE:
+                payload = data[VITA_HEADER_SIZE:]
+                parsed_info = parse_discovery_payload(payload)
+                radio_info = extract_radio_info(parsed_info, addr[0])
                 
-                except socket.timeout:
-                    # This is normal - just means no connection attempt in last second
-                    continue
-                except Exception as e:
-                    if self.running:
-                        pass  # logging.error(f"Error accepting client: {e}")
-        except Exception as e:
-            print(f"⚠ FATAL: Accept thread crashed: {e}")
-            # logging.error(f"Accept thread crashed: {e}")
-    
-    def remove_disconnected_clients(self):
-        """Remove clients that have disconnected"""
-        with self.clients_lock:
-            disconnected = []
-            for client in self.clients:
-                try:
-                    # Simple check: try to get peer name
-                    client.sock.getpeername()
-                except:
-                    # Connection is dead
-                    disconnected.append(client)
-            
-            for client in disconnected:
-                self.clients.remove(client)
-                duration = time.time() - client.connected_at
-                print(f"← Client disconnected: {client.addr} ({client.packets_sent} packets sent, {duration:.0f}s)")
-                # logging.info(f"Client disconnected: {client.addr} - Sent {client.packets_sent} packets in {duration:.1f}s")
-                try:
-                    client.sock.close()
-                except:
-                    pass
-    
-    def broadcast_to_clients(self, packet_data):
-        """Send packet data to all connected clients"""
-        with self.clients_lock:
-            if not self.clients:
-                # logging.debug("No clients to broadcast to")
-                return
-            
-            # logging.debug(f"Broadcasting packet to {len(self.clients)} client(s)")
-            
-            failed_clients = []
-            for client in self.clients:
-                success = client.send_packet(packet_data)
-                # logging.debug(f"Send to {client.addr}: {'success' if success else 'FAILED'}")
-                if not success:
-                    failed_clients.append(client)
-            
-            # Remove failed clients
-            for client in failed_clients:
-                if client in self.clients:
-                    self.clients.remove(client)
-                    print(f"← Client send failed: {client.addr}")
-                    # logging.warning(f"Client removed: {client.addr}")
-                    try:
-                        client.sock.close()
-                    except:
-                        pass
-    
-    def parse_discovery_payload(self, payload):
-        """Parse the space-separated key=value pairs from discovery payload"""
+                self.console.update(radio_info['serial'], f"{radio_info['model']} ({radio_info['nickname']}) - {radio_info['callsign']} @ {radio_info['ip']} - {radio_info['status']}")
+                self.track_radio(radio_info, current_time)
+                
+                # Log initial packet or payload changes (formatted and written by the background logger)
+                if not self.first_packet_received or payload != self.last_payload:
+                    self.log_payload_event(timestamp, data, addr, radio_info, parsed_info)
+                
+                # Complete packet for distribution: header, stream_id, timestamps, payload - everything
+                packet_data = packet_frame(data, addr, parsed_info, radio_info, timestamp, current_time, __version__)
+                
+                # Radio state changes are kept for clients that resume after a reconnect
+                is_change = self.radio_payloads.get(radio_info['serial']) != payload
+                if is_change:
+                    self.radio_payloads[radio_info['serial']] = payload
+                
+                # Send packet to all connected clients (sequenced by the hub)
+                self.console.count('packets')
+                self.hub.publish(packet_data, is_change=is_change)
+                
+                if self.last_packet_time is None:
+                    self.startup_complete()
+                self.last_packet_time = current_time
+    
+    def stale_timeout(self, radio):
+        """Seconds of silence after which `radio` is considered gone"""
+        if radio.interval is None:
+            return self.stale_default
+        return max(self.stale_minimum, self.stale_multiple * radio.interval)
+    
+    def track_radio(self, radio_info, now):
+        """Update the broadcast cadence of the radio that sent a packet"""
+        radio = self.radios.get(radio_info['serial'])
+        if radio is None:
+            radio = self.radios[radio_info['serial']] = RadioActivity(radio_info, now)
+        else:
+            radio.update(radio_info, now)
+        # Deadlines only move later, so the earliest one stays a safe lower bound
+        deadline = now + self.stale_timeout(radio)
+        if deadline < self.next_stale_check:
+            self.next_stale_check = deadline
+            self.arm_stale_check()
+    
+    def check_stale_radios(self, now):
+        """Declare radios gone that have been silent too long for their own cadence"""
+        next_check = float('inf')
+        for serial, radio in list(self.radios.items()):
+            deadline = radio.last_seen + self.stale_timeout(radio)
+            if now >= deadline:
+                del self.radios[serial]
+                self.radio_gone(radio, now)
+            else:
+                next_check = min(next_check, deadline)
+        self.next_stale_check = next_check
+        self.arm_stale_check()
+    
+    def arm_stale_check(self):
+        """Schedule a stale check for the earliest radio deadline (covers periods without traffic)"""
+        if self.next_stale_check == float('inf'):
+            if self.stale_task is not None:
+                self.scheduler.cancel(self.stale_task)
+            return
+        delay = max(0.0, self.next_stale_check - time.time())
+        if self.stale_task is None:
+            self.stale_task = self.scheduler.call_later(delay, lambda: self.check_stale_radios(time.time()),
+                                                        name='stale radio check')
+        else:
+            self.scheduler.reschedule(self.stale_task, delay)
+    
+    def schedule_health_checks(self, diagnostics):
+        """(Re)arm the periodic health check from the DIAGNOSTICS settings"""
+        if self.health_task is not None:
+            self.scheduler.cancel(self.health_task)
+            self.health_task = None
+        if diagnostics.enable_health_checks and diagnostics.periodic_check_interval > 0:
+            self.health_task = self.scheduler.every(diagnostics.periodic_check_interval, self.run_periodic_health_check,
+                                                    name='periodic health check')
+    
+    def apply_config(self, config, changes):
+        """Apply a reloaded config.ini in place (ConfigReloader callback)
+        
+        Returns:
+            The changed settings that need a restart
+        """
+        settings = ServerSettings.from_config(config)  # SettingsError rejects the whole reload
+        hub = self.hub
+        setters = diagnostics_setters(self.console)
+        for name in ('keepalive_idle', 'keepalive_interval', 'keepalive_count', 'heartbeat_interval', 'heartbeat_timeout'):
+            setters[('SERVER', name)] = (lambda s, name=name: getattr(s.stream.link, name),
+                                         lambda value, name=name: setattr(hub, name, value))
+        for name in ('max_clients', 'compression'):
+            setters[('SERVER', name)] = (lambda s, name=name: getattr(s.stream, name),
+                                         lambda value, name=name: setattr(hub, name, value))
+        setters.update({
+            ('SERVER', 'history_size'): (lambda s: s.stream.history_size, hub.resize_history),
+            ('SERVER', 'stale_interval_multiple'): (lambda s: s.stale_interval_multiple,
+                                                    lambda value: setattr(self, 'stale_multiple', value)),
+            ('SERVER', 'stale_minimum_seconds'): (lambda s: s.stale_minimum_seconds,
+                                                  lambda value: setattr(self, 'stale_minimum', value)),
+            ('SERVER', 'stale_default_seconds'): (lambda s: s.stale_default_seconds,
+                                                  lambda value: setattr(self, 'stale_default', value)),
+            ('SERVER', 'source_rate_limit'): (lambda s: s.source_rate_limit,
+                                              lambda value: setattr(self.ingress, 'rate', value)),
+            ('SERVER', 'source_burst'): (lambda s: s.source_burst, lambda value: setattr(self.ingress, 'burst', value)),
+            ('SERVER', 'allowed_sources'): (lambda s: s.allowed_sources, self.ingress.set_allowed),
+            ('SERVER', 'echo_window_seconds'): (lambda s: s.echo_window_seconds,
+                                                lambda value: setattr(self.echoes, 'window', value)),
+        })
+        health_keys = ('enable_health_checks', 'periodic_check_interval', 'ping_timeout', 'display_interface_info',
+                       'test_server_ip', 'test_radio_ip')
+        setters.update({('DIAGNOSTICS', key): (lambda s: s.diagnostics, self.schedule_health_checks)
+                        for key in health_keys})
+        
+        # Listeners are rebound after everything else, and only if their address or port changed
+        listen_keys = [key for key in (('SERVER', 'listen_address'), ('SERVER', 'stream_port'), ('SERVER', 'discovery_port'))
+                       if key in changes]
+        
+        restart = [key for key in apply_settings(settings, changes, setters) if key not in listen_keys]
+        self.max_clients = hub.max_clients
+        hub.udp_timeout = hub.heartbeat_timeout if hub.heartbeat_interval > 0 else 6.0
+        self.config, self.settings = config, settings
+        if listen_keys:
+            restart += self.rebind(settings.listen_address, settings.stream.port, settings.discovery_port, listen_keys)
+        return restart
+    
+    def rebind(self, listen_address, stream_port, discovery_port, listen_keys):
+        """Move the discovery and/or stream sockets (config reload); returns the keys left unapplied"""
+        move_discovery = ('SERVER', 'discovery_port') in listen_keys or ('SERVER', 'listen_address') in listen_keys
+        move_stream = ('SERVER', 'stream_port') in listen_keys or ('SERVER', 'listen_address') in listen_keys
+        udp_sock = None
         try:
-            # Decode bytes to string, strip null bytes
-            payload_str = payload.decode('utf-8', errors='ignore').rstrip('\x00')
-            
-            # Parse key=value pairs
-            parsed = {}
-            pairs = payload_str.split(' ')
-            for pair in pairs:
-                if '=' in pair:
-                    key, value = pair.split('=', 1)
-                    parsed[key] = value
-            
-            return parsed
-        except Exception as e:
-            # logging.error(f"Error parsing payload: {e}")
-            return {}
+            if move_discovery:
+                udp_sock = self.open_discovery_socket(listen_address, discovery_port)
+            if move_stream:
+                self.hub.rebind(listen_address, stream_port)
+        except OSError as e:
+            if udp_sock is not None:
+                udp_sock.close()
+            self.console.notice(f"⚠ Cannot listen on {listen_address} ({e}) - keeping the current sockets")
+            return listen_keys
+        
+        if udp_sock is not None:
+            # Swapped on the packet loop thread (reloads run from its scheduler)
+            self.udp_sock.close()
+            self.udp_sock = udp_sock
+            self.discovery_port = udp_sock.getsockname()[1]
+        self.tcp_sock = self.hub.sock
+        self.stream_port = self.hub.port
+        self.listen_address = listen_address
+        self.console.notice(f"Listening on {listen_address}: discovery port {self.discovery_port}, "
+                            f"stream port {self.stream_port}")
+        return []
+    
+    def run_periodic_health_check(self):
+        """Run and print a periodic health check"""
+        self.console.render()  # Keep output in order before the health check report
+        current_time = datetime.datetime.now().strftime("%H:%M:%S")
+        print(f"\n{current_time} - Running periodic health check...")
+        health_checker = self.new_health_checker()
+        health_checker.run_all_checks()
+        health_checker.print_results(title="Periodic Health Check")
+    
+    def run_deferred_health_check(self):
+        """Startup health checks put off by Fast_Start (background thread; packets are already flowing)"""
+        health_checker = self.new_health_checker()
+        health_checker.run_all_checks()
+        self.console.render()  # Keep output in order before the health check report
+        health_checker.print_results(title="Startup Health Check (deferred by Fast_Start)")
+        self.startup_check_results = health_checker.results
+    
+    def startup_complete(self):
+        """The first packet was forwarded: report how long startup took"""
+        self.startup.first_packet_forwarded()
+        logging.info(f"Startup: {self.startup.summary()}")
+        self.console.notice(f"   ℹ Startup: {self.startup.summary()}")
+    
+    def radio_gone(self, radio, now):
+        """Tell clients to stop rebroadcasting a radio that stopped broadcasting"""
+        radio_info = radio.radio_info
+        silent = now - radio.last_seen
+        interval = f"{radio.interval:.2f}s" if radio.interval is not None else "unknown"
+        
+        current_time = datetime.datetime.now().strftime("%H:%M:%S")
+        self.console.notice(f"{current_time} - ⚠ Radio gone: {radio_info['model']} ({radio_info['nickname']}) "
+                            f"- no broadcast for {silent:.1f}s (usual interval {interval})")
+        self.console.forget(radio_info['serial'])
+        logging.warning(f"Radio gone: {radio_info['model']} ({radio_info['nickname']}) serial {radio_info['serial']} "
+                        f"- no broadcast for {silent:.1f}s (usual interval {interval})")
+        if self.journal:
+            self.journal.record('radio_gone', radio_info, silent_seconds=round(silent, 1),
+                                interval_seconds=round(radio.interval, 3) if radio.interval is not None else None)
+        
+        # Returning broadcasts count as a state change again
+        self.radio_payloads.pop(radio_info['serial'], None)
+        
+        message = {
+            'type': 'radio_gone',
+            'serial': radio_info['serial'],
+            'radio_info': radio_info,
+            'last_seen': radio.last_seen
+        }
+        self.hub.publish(message, is_change=True)
+    
+    def admin_stats(self, args):
+        """Server statistics (admin socket `stats`)"""
+        return {
+            'version': __version__,
+            'uptime_seconds': round(time.monotonic() - self.started_at),
+            'packets_received': self.packet_count,
+            'radios': len(self.radios),
+            'clients': self.hub.client_count,
+            'server_id': self.hub.server_id,
+            'frame_seq': self.hub.frame_seq,
+            'resumes_served': self.hub.resumes_served,
+            'frames_replayed': self.hub.frames_replayed,
+            'multicast_frames': self.hub.multicast_frames,
+            'udp_frames_dropped': self.hub.udp_frames_dropped,
+            'ingress': self.ingress.summary(),
+            'echoes': self.echoes.summary(),
+            'compression': self.hub.compression_summary(),
+            'startup': self.startup.summary()
+        }
+    
+    def admin_radios(self, args):
+        """Radios currently broadcasting (admin socket `radios`)"""
+        now = time.time()
+        return [{'serial': serial, 'model': radio.radio_info['model'], 'nickname': radio.radio_info['nickname'],
+                 'ip': radio.radio_info['ip'], 'packets': radio.packets,
+                 'interval_seconds': round(radio.interval, 3) if radio.interval is not None else None,
+                 'last_seen_seconds': round(now - radio.last_seen, 1)}
+                for serial, radio in list(self.radios.items())]
+    
+    def admin_kick(self, args):
+        """Disconnect a client (admin socket `kick <host:port>`)"""
+        if len(args) != 1:
+            raise ValueError("usage: kick <host:port> (see 'clients')")
+        if not self.hub.kick(args[0]):
+            raise ValueError(f"no client {args[0]}")
+        logging.info(f"Client {args[0]} kicked from the admin socket")
+        return f"kicked {args[0]}"
+    
+    def admin_health(self, args):
+        """Run the health checks now, even if periodic checks are off (admin socket `health`)"""
+        health_checker = self.new_health_checker()
+        health_checker.enabled = True
+        return [{'name': result.name, 'status': result.status.value, 'message': result.message}
+                for result in health_checker.run_all_checks()]
     
     def run(self):
-        """Main packet processing loop"""
-        last_health_check = time.time()
-        health_checker = HealthChecker(self.config, mode='server', version=__version__)
+        """Main packet processing loop
+        
+        Housekeeping (stale radio checks, client cleanup, periodic health checks,
+        capture flushes) runs from the scheduler on every wakeup, so it stays on
+        time under steady traffic. The receive timeout is the time until the next
+        task is due.
+        """
+        self.scheduler.every(1.0, self.hub.remove_disconnected_clients)
+        self.schedule_health_checks(self.settings.diagnostics)
+        if self.recorder is not None:
+            self.scheduler.every(self.recorder.flush_interval, self.flush_capture, name='capture flush')
+        if self.reloader:
+            self.scheduler.every(self.reloader.poll_interval, self.reloader.check, name='config reload')
         
         while self.running:
             try:
+                self.udp_sock.settimeout(max(0.001, self.scheduler.time_until_next(maximum=1.0)))
+                
                 # Receive discovery packet
                 data, addr = self.udp_sock.recvfrom(4096)
-                
                 current_time = time.time()
-                timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
                 
-                self.packet_count += 1
-                
-                # Only process if it's a valid VITA-49 packet
-                if len(data) >= 28 and data[0:1] == b'\x38':
-                    # Extract the full packet
-                    packet_hex = data.hex()
+                # Flood and echo protection drop before the datagram is recorded or parsed
+                if not self.ingress.admit(addr[0], current_time) or self.echoes.is_echo(data, addr[0], current_time):
+                    self.console.count('dropped')
+                else:
+                    if self.recorder is not None:
+                        self.record_datagram(data, addr, current_time)
                     
-                    # Try to parse the payload (starts at byte 28)
-                    if len(data) > 28:
-                        payload = data[28:]
-                        parsed_info = self.parse_discovery_payload(payload)
-                        
-                        # Extract key information
-                        radio_info = {
-                            'model': parsed_info.get('model', 'Unknown'),
-                            'serial': parsed_info.get('serial', 'Unknown'),
-                            'ip': parsed_info.get('ip', addr[0]),
-                            'nickname': parsed_info.get('nickname', 'Unknown'),
-                            'callsign': parsed_info.get('callsign', 'Unknown'),
-                            'version': parsed_info.get('version', 'Unknown'),
-                            'status': parsed_info.get('status', 'Unknown')
-                        }
-                        
-                        print(f"[{timestamp}] {radio_info['model']} ({radio_info['nickname']}) - {radio_info['callsign']} @ {radio_info['ip']} - {radio_info['status']}")
-                        
-                        # Log initial packet or payload changes
-                        payload_changed = (payload != self.last_payload)
-                        
-                        if not self.first_packet_received:
-                            # Log the first discovery packet with full details
-                            logging.info("=" * 80)
-                            logging.info(f"INITIAL DISCOVERY PACKET - {timestamp}")
-                            logging.info("=" * 80)
-                            logging.info(f"Radio: {radio_info['model']} ({radio_info['nickname']})")
-                            logging.info(f"Callsign: {radio_info['callsign']} | IP: {radio_info['ip']}")
-                            logging.info(f"Status: {radio_info['status']} | Version: {radio_info['version']}")
-                            logging.info(f"Serial: {radio_info['serial']}")
-                            logging.info(f"Source: {addr[0]}:{addr[1]} | Packet Size: {len(data)} bytes")
-                            logging.info("")
-                            
-                            # Log full hex dump
-                            logging.info("Full Packet Hex Dump:")
-                            logging.info("-" * 80)
-                            # Format hex dump in 16-byte lines with offset
-                            for i in range(0, len(data), 16):
-                                hex_part = ' '.join(f"{b:02x}" for b in data[i:i+16])
-                                ascii_part = ''.join(chr(b) if 32 <= b < 127 else '.' for b in data[i:i+16])
-                                logging.info(f"{i:04x}  {hex_part:<48}  {ascii_part}")
-                            logging.info("-" * 80)
-                            logging.info("")
-                            
-                            # Log all parsed fields
-                            logging.info("Parsed Discovery Fields:")
-                            logging.info("-" * 80)
-                            for key, value in sorted(parsed_info.items()):
-                                logging.info(f"  {key:30} = {value}")
-                            logging.info("=" * 80)
-                            logging.info("")
-                            
-                            # Flush log to disk immediately
-                            for handler in logging.getLogger().handlers:
-                                handler.flush()
-                            
-                            print(f"   ℹ Initial discovery packet logged to {LOG_FILE} (full hex dump included)")
-                            self.first_packet_received = True
-                            self.last_payload = payload
-                        elif payload_changed:
-                            # Log when payload changes with full details
-                            logging.info("=" * 80)
-                            logging.info(f"DISCOVERY PAYLOAD CHANGED - {timestamp}")
-                            logging.info("=" * 80)
-                            logging.info(f"Radio: {radio_info['model']} ({radio_info['nickname']})")
-                            logging.info(f"Callsign: {radio_info['callsign']} | IP: {radio_info['ip']}")
-                            logging.info(f"Status: {radio_info['status']} | Version: {radio_info['version']}")
-                            logging.info(f"Source: {addr[0]}:{addr[1]} | Packet Size: {len(data)} bytes")
-                            logging.info("")
-                            
-                            # Log specific changed fields
-                            if self.last_payload:
-                                old_parsed = self.parse_discovery_payload(self.last_payload)
-                                changed_fields = []
-                                for key in parsed_info.keys():
-                                    if key in old_parsed and parsed_info[key] != old_parsed.get(key):
-                                        changed_fields.append((key, old_parsed.get(key), parsed_info[key]))
-                                    elif key not in old_parsed:
-                                        changed_fields.append((key, None, parsed_info[key]))
-                                
-                                # Check for removed fields
-                                for key in old_parsed.keys():
-                                    if key not in parsed_info:
-                                        changed_fields.append((key, old_parsed[key], None))
-                                
-                                if changed_fields:
-                                    logging.info("Changed Fields:")
-                                    logging.info("-" * 80)
-                                    for key, old_val, new_val in changed_fields:
-                                        if old_val is None:
-                                            logging.info(f"  {key:30} = (new) '{new_val}'")
-                                        elif new_val is None:
-                                            logging.info(f"  {key:30} = (removed) was '{old_val}'")
-                                        else:
-                                            logging.info(f"  {key:30} = '{old_val}' → '{new_val}'")
-                                    logging.info("")
-                            
-                            # Log full hex dump
-                            logging.info("Full Packet Hex Dump:")
-                            logging.info("-" * 80)
-                            # Format hex dump in 16-byte lines with offset
-                            for i in range(0, len(data), 16):
-                                hex_part = ' '.join(f"{b:02x}" for b in data[i:i+16])
-                                ascii_part = ''.join(chr(b) if 32 <= b < 127 else '.' for b in data[i:i+16])
-                                logging.info(f"{i:04x}  {hex_part:<48}  {ascii_part}")
-                            logging.info("-" * 80)
-                            logging.info("")
-                            
-                            # Log all current parsed fields
-                            logging.info("All Current Discovery Fields:")
-                            logging.info("-" * 80)
-                            for key, value in sorted(parsed_info.items()):
-                                logging.info(f"  {key:30} = {value}")
-                            logging.info("=" * 80)
-                            logging.info("")
-                            
-                            # Flush log to disk immediately
-                            for handler in logging.getLogger().handlers:
-                                handler.flush()
-                            
-                            print(f"   ℹ Payload change logged to {LOG_FILE} (full hex dump included)")
-                            self.last_payload = payload
-                        
-                        # Prepare complete packet data for distribution
-                        # This includes: header, stream_id, timestamps, payload - everything
-                        packet_data = {
-                            'timestamp': timestamp,
-                            'timestamp_unix': current_time,
-                            'server_version': __version__,
-                            'packet_hex': packet_hex,  # Complete VITA-49 packet as hex string
-                            'packet_size': len(data),
-                            'source_ip': addr[0],
-                            'source_port': addr[1],
-                            'radio_info': radio_info,
-                            'parsed_payload': parsed_info
-                        }
-                        
-                        # Send packet to all connected clients
-                        with self.clients_lock:
-                            client_count = len(self.clients)
-                        
-                        if client_count > 0:
-                            self.broadcast_to_clients(packet_data)
-                            print(f"   → Sent to {client_count} client(s)")
-                        else:
-                            # Only show warning occasionally
-                            if self.packet_count % 10 == 1:
-                                print(f"   ⚠ No clients connected")
-                        
-                        self.last_packet_time = current_time
+                    self.handle_datagram(data, addr, current_time)
             
             except socket.timeout:
-                # Normal timeout - check for stale connection
-                current_time_val = time.time()
-                if self.last_packet_time and (current_time_val - self.last_packet_time > 30):
-                    current_time = datetime.datetime.now().strftime("%H:%M:%S")
-                    print(f"{current_time} - No packets received for 30+ seconds")
-                    # logging.warning("No discovery packets received for 30+ seconds")
-                    self.last_packet_time = None
-                
-                # Remove disconnected clients
-                self.remove_disconnected_clients()
-                
-                # Periodic health check
-                if (health_checker.enabled and 
-                    health_checker.periodic_interval > 0 and 
-                    current_time_val - last_health_check >= health_checker.periodic_interval):
-                    
-                    current_time = datetime.datetime.now().strftime("%H:%M:%S")
-                    print(f"\n{current_time} - Running periodic health check...")
-                    health_checker.run_all_checks()
-                    health_checker.print_results(title="Periodic Health Check")
-                    last_health_check = current_time_val
-                
-                continue
+                pass  # Normal timeout - a housekeeping task is due
             
             except KeyboardInterrupt:
                 raise
             
             except Exception as e:
                 current_time = datetime.datetime.now().strftime("%H:%M:%S")
-                print(f"{current_time} - Error processing packet: {e}")
+                self.console.notice(f"{current_time} - Error processing packet: {e}")
                 # logging.error(f"Packet processing error: {e}")
-                continue
+            
+            self.scheduler.run_due()
+            if self.handoff is not None and self.handoff.pending is not None:
+                self.hand_off()
     
     def stop(self):
         """Stop the server and cleanup"""
         self.running = False
         
-        # Close all client connections
-        with self.clients_lock:
-            for client in self.clients:
-                try:
-                    client.sock.close()
-                except:
-                    pass
-            self.clients.clear()
+        # Close all client connections and the listening socket (after a handoff
+        # only this process's copies: the new process owns the connections)
+        if self.handed_off:
+            self.hub.release()
+        else:
+            self.hub.stop()
+        if self.admin:
+            self.admin.stop()
+        if self.handoff:
+            self.handoff.stop()
         
         # Close sockets
         if self.udp_sock:
             self.udp_sock.close()
-        if self.tcp_sock:
-            self.tcp_sock.close()
+        
+        if self.journal:
+            self.journal.close()
+        
+        if self.recorder:
+            self.recorder.close()
+            print(f"Traffic capture: {self.recorder.records} packet(s) written to {self.capture_file}")
+        
+        self.console.stop()
         
         print(f"\nSocket(s) closed. Server stopped.")
         print(f"Total packets received: {self.packet_count}")
+        if self.ingress.dropped:
+            print(f"Packets dropped by flood protection: {self.ingress.dropped}")
+        if self.echoes.dropped:
+            print(f"Echoed packets dropped (loop protection): {self.echoes.dropped}")
+        compression = self.hub.compression_summary()
+        if compression:
+            print(f"Stream compression: {compression}")
+        if self.hub.multicast_frames:
+            print(f"Multicast frames sent: {self.hub.multicast_frames}")
+        if self.hub.resumes_served:
+            print(f"Client resumes: {self.hub.resumes_served} ({self.hub.frames_replayed} change frame(s) replayed)")
         logging.info(f"Server stopped - Total packets: {self.packet_count}")
 
-def load_config():
-    """Load configuration from config.ini"""
-    config = configparser.ConfigParser()
-    
-    if not os.path.exists('config.ini'):
-        print("ERROR: config.ini not found!")
-        sys.exit(1)
-    
-    config.read('config.ini')
-    
-    # Get max log files setting
-    max_log_files = config.getint('DIAGNOSTICS', 'Max_Log_Files', fallback=2)
-    
-    # Rotate log file at startup
-    rotate_log_file(LOG_FILE, max_log_files)
-    
-    # Configure logging after rotation
-    logging.basicConfig(
-        filename=LOG_FILE,
-        level=logging.INFO,
-        format='%(asctime)s - %(levelname)s - %(message)s',
-        force=True  # Override any existing configuration
-    )
-    
-    # Configure debug logging if enabled
-    try:
-        debug_logging = config.getboolean('DIAGNOSTICS', 'Debug_Logging', fallback=False)
-        if debug_logging:
-            logging.getLogger().setLevel(logging.DEBUG)
-            print("DEBUG: Debug logging enabled (check discovery-server.log for details)")
-    except:
-        pass
-    
-    return config
-
 def main():
-    config = load_config()
-    server = DiscoveryServer(config)
+    startup = StartupTimer(STARTED)
+    startup.mark('imports')
+    config, settings = load_config('config.ini', ServerSettings, LOG_FILE)
+    startup.mark('config')
+    server = DiscoveryServer(config, config_path='config.ini', settings=settings, startup=startup)
     server.start()
 
 if __name__ == "__main__":
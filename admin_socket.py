@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+FlexRadio Discovery Proxy - Admin Socket Module
+Local control socket for inspecting and tuning a running server or client.
+
+Connect with any line-based TCP tool (e.g. `nc 127.0.0.1 5995`) and send one
+command per line; each command gets one JSON line back: {"ok": true,
+"result": ...} or {"ok": false, "error": "..."}. `help` lists the commands.
+
+The socket has its own service thread, so a slow command (such as a health
+check) never holds up the packet loop. There is no authentication: keep
+Admin_Address on a loopback address.
+
+Copyright (c) 2026 Chris L White (WX7V)
+
+Licensed under the MIT License - see LICENSE file for details
+"""
+
+import ipaddress
+import json
+import logging
+import selectors
+import socket
+import threading
+from typing import Callable, Dict, List, Optional
+
+from settings import AdminSettings
+from stream_protocol import LineFramer
+
+LOG_LEVELS = ('DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL')
+
+
+class AdminServer:
+    """Line-based command socket
+    
+    Commands map a name to a handler taking the command's arguments (a list
+    of strings) and returning a JSON-serializable result. A handler raises
+    ValueError for bad arguments; the message is sent back as the error.
+    """
+    
+    def __init__(self, address: str, port: int, commands: Dict[str, Callable[[List[str]], object]],
+                 max_sessions: int = 4):
+        self.address = address
+        self.port = port
+        self.max_sessions = max_sessions
+        self.commands = {'help': self.help, 'loglevel': self.loglevel}
+        self.commands.update(commands)
+        
+        self.running = False
+        self.sock = None
+        self.sessions = {}  # socket -> LineFramer
+        self.commands_run = 0
+        self._thread = None
+    
+    @classmethod
+    def from_settings(cls, settings: AdminSettings,
+                      commands: Dict[str, Callable[[List[str]], object]]) -> Optional['AdminServer']:
+        """Admin server from the Admin_* settings, or None unless Admin_Enabled is set"""
+        if not settings.enabled:
+            return None
+        try:
+            loopback = ipaddress.ip_address(settings.address).is_loopback
+        except ValueError:
+            loopback = settings.address == 'localhost'
+        if not loopback:
+            logging.warning(f"Admin socket on non-loopback address {settings.address}: "
+                            f"anyone who can reach it can kick clients")
+        return cls(settings.address, settings.port, commands)
+    
+    def start(self):
+        """Bind the socket (resolves port 0) and start the service thread"""
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.sock.bind((self.address, self.port))
+        self.port = self.sock.getsockname()[1]
+        self.sock.listen(self.max_sessions)
+        self.running = True
+        self._thread = threading.Thread(target=self.serve, name='admin-socket', daemon=True)
+        self._thread.start()
+        logging.info(f"Admin socket listening on {self.address}:{self.port}")
+    
+    def stop(self):
+        self.running = False
+        if self.sock:
+            try:
+                self.sock.shutdown(socket.SHUT_RDWR)  # Wake the service thread
+            except OSError:
+                pass
+            self.sock.close()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+        for session in list(self.sessions):
+            session.close()
+        self.sessions.clear()
+    
+    def serve(self):
+        """Accept admin sessions and answer their commands"""
+        selector = selectors.DefaultSelector()
+        selector.register(self.sock, selectors.EVENT_READ)
+        try:
+            while self.running:
+                try:
+                    events = selector.select(timeout=1.0)
+                except (OSError, ValueError):
+                    break
+                for key, _ in events:
+                    if key.fileobj is self.sock:
+                        self.accept(selector)
+                    else:
+                        self.service(selector, key.fileobj)
+        except Exception as e:
+            if self.running:
+                logging.error(f"Admin socket error: {e}")
+        finally:
+            selector.close()
+    
+    def accept(self, selector):
+        try:
+            session, addr = self.sock.accept()
+        except OSError:
+            return  # Closed while stopping
+        if len(self.sessions) >= self.max_sessions:
+            session.sendall(self.encode_reply(None, "too many admin sessions"))
+            session.close()
+            return
+        session.settimeout(5.0)  # Replies are small; don't hang on a client that stopped reading
+        self.sessions[session] = LineFramer()
+        selector.register(session, selectors.EVENT_READ)
+        logging.info(f"Admin session opened from {addr}")
+    
+    def service(self, selector, session):
+        """Read from an admin session and answer every complete command line"""
+        try:
+            data = session.recv(4096)
+            lines = self.sessions[session].feed(data) if data else None
+            for line in lines or ():
+                session.sendall(self.execute(line.decode('utf-8', 'replace')))
+        except (OSError, ValueError):
+            lines = None  # Reset, timed out or sent an oversized line
+        if lines is None:
+            selector.unregister(session)
+            session.close()
+            del self.sessions[session]
+    
+    def execute(self, line: str) -> bytes:
+        """Run one command line and return the encoded reply"""
+        words = line.split()
+        if not words:
+            return self.encode_reply(None, "empty command (try 'help')")
+        name, args = words[0].lower(), words[1:]
+        handler = self.commands.get(name)
+        if handler is None:
+            return self.encode_reply(None, f"unknown command '{name}' (try 'help')")
+        self.commands_run += 1
+        try:
+            return self.encode_reply(handler(args))
+        except ValueError as e:
+            return self.encode_reply(None, str(e))
+        except Exception as e:
+            logging.error(f"Admin command '{line.strip()}' failed: {e}")
+            return self.encode_reply(None, f"{name} failed: {e}")
+    
+    @staticmethod
+    def encode_reply(result, error: Optional[str] = None) -> bytes:
+        reply = {'ok': False, 'error': error} if error is not None else {'ok': True, 'result': result}
+        return (json.dumps(reply, default=str) + '\n').encode('utf-8')
+    
+    def help(self, args):
+        """Available commands"""
+        return sorted(self.commands)
+    
+    def loglevel(self, args):
+        """Show or set the log level (loglevel [DEBUG|INFO|WARNING|ERROR|CRITICAL])"""
+        logger = logging.getLogger()
+        if args:
+            level = args[0].upper()
+            if level not in LOG_LEVELS:
+                raise ValueError(f"unknown log level '{args[0]}' (one of {', '.join(LOG_LEVELS)})")
+            logger.setLevel(level)
+            logging.warning(f"Log level set to {level} from the admin socket")
+        return logging.getLevelName(logger.getEffectiveLevel())
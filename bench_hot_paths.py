@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+FlexRadio Discovery Proxy - Hot Path Microbenchmarks
+Times the per-packet code paths of server and client against a fixed packet
+corpus and compares the results with a stored baseline.
+    
+    python bench_hot_paths.py                     # run and compare with baseline
+    python bench_hot_paths.py --update-baseline   # store current results as the baseline
+    python bench_hot_paths.py --threshold 15      # fail on >15% slowdown (default 25%)
+
+Exit status is 1 if any benchmark regressed beyond the threshold. Baselines
+are machine-specific; regenerate after changing hardware or Python version.
+
+Copyright (c) 2026 Chris L White (WX7V)
+
+Licensed under the MIT License - see LICENSE file for details
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import timeit
+from typing import Callable, Dict, List, Tuple
+
+from log_pipeline import format_hex_dump
+from simulation import sample_packets, SCRIPT_DIR
+from stream_hub import ClientConnection
+from stream_protocol import (VITA_HEADER_SIZE, LineFramer, decode_frames, extract_radio_info, frame_compressor,
+                             packet_frame, parse_discovery_payload)
+
+BASELINE_FILE = os.path.join(SCRIPT_DIR, 'benchmark_baseline.json')
+DEFAULT_THRESHOLD = 25.0  # percent
+
+
+class _NullSocket:
+    """Socket stand-in that accepts and discards everything"""
+    def sendall(self, data):
+        pass
+
+
+def build_corpus():
+    """Fixed packet corpus and the derived frames used by the benchmarks"""
+    packets = sample_packets(8)
+    frames = []
+    for data in packets:
+        parsed = parse_discovery_payload(data[VITA_HEADER_SIZE:])
+        frames.append(packet_frame(data, (parsed['ip'], 4992), parsed, extract_radio_info(parsed, parsed['ip']),
+                                   '2026-01-28 12:00:00', 1769600000.0, '3.0.1'))
+    stream = b''.join(json.dumps(frame).encode('utf-8') + b'\n' for frame in frames)
+    return packets, frames, stream
+
+
+def define_benchmarks() -> List[Tuple[str, Callable[[], None], int]]:
+    """Benchmarks as (name, callable, items processed per call)"""
+    packets, frames, stream = build_corpus()
+    payloads = [data[VITA_HEADER_SIZE:] for data in packets]
+    hex_strings = [frame['packet_hex'] for frame in frames]
+    
+    connection = ClientConnection(_NullSocket(), ('127.0.0.1', 0))
+    compressed_connection = ClientConnection(_NullSocket(), ('127.0.0.1', 0))
+    compressed_connection.compressor = frame_compressor()
+    
+    # Typical recv() sizes: whole stream in 4 KiB chunks (frames split across reads)
+    chunks = [stream[i:i + 4096] for i in range(0, len(stream), 4096)]
+    
+    def bench_parse():
+        for payload in payloads:
+            parse_discovery_payload(payload)
+    
+    def bench_send_packet():
+        for frame in frames:
+            connection.send_packet(frame)
+    
+    def bench_send_compressed():
+        for frame in frames:
+            compressed_connection.send_packet(frame)
+    
+    def bench_line_framing():
+        framer = LineFramer()
+        for chunk in chunks:
+            decode_frames(framer.feed(chunk))
+    
+    def bench_fromhex():
+        for hex_string in hex_strings:
+            bytes.fromhex(hex_string)
+    
+    def bench_hex_dump():
+        for data in packets:
+            format_hex_dump(data)
+    
+    return [
+        ('parse_discovery_payload', bench_parse, len(payloads)),
+        ('ClientConnection.send_packet', bench_send_packet, len(frames)),
+        ('send_packet (compressed stream)', bench_send_compressed, len(frames)),
+        ('client JSON line framing', bench_line_framing, len(frames)),
+        ('bytes.fromhex reconstruction', bench_fromhex, len(hex_strings)),
+        ('hex dump formatter', bench_hex_dump, len(packets)),
+    ]
+
+
+def measure(func: Callable[[], None], items: int, repeat: int = 5) -> float:
+    """Best-of-`repeat` time per item in microseconds (each repeat runs >= 0.2 s)"""
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    best = min(timer.repeat(repeat=repeat, number=number))
+    return best / number / items * 1e6
+
+
+def machine_info() -> Dict[str, str]:
+    return {
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'machine': platform.machine(),
+        'system': platform.system(),
+    }
+
+
+def load_baseline(path: str):
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Microbenchmarks for the proxy's per-packet code paths")
+    parser.add_argument('--baseline', default=BASELINE_FILE, help="Baseline results file")
+    parser.add_argument('--update-baseline', action='store_true', help="Store these results as the new baseline")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help=f"Regression threshold in percent (default {DEFAULT_THRESHOLD:g})")
+    parser.add_argument('--repeat', type=int, default=5, help="Timing repetitions per benchmark (default 5)")
+    args = parser.parse_args()
+    
+    baseline = load_baseline(args.baseline)
+    baseline_results = baseline.get('results', {}) if baseline else {}
+    if baseline and baseline.get('machine') != machine_info():
+        print(f"⚠ Baseline was recorded on a different machine/Python: {baseline.get('machine')}")
+    
+    print("\n" + "="*70)
+    print("Hot Path Microbenchmarks (µs per packet, lower is better)")
+    print("="*70)
+    print(f"{'Benchmark':32} {'Current':>10} {'Baseline':>10} {'Change':>9}")
+    print("-"*70)
+    
+    results = {}
+    regressions = []
+    for name, func, items in define_benchmarks():
+        current = measure(func, items, repeat=args.repeat)
+        results[name] = current
+        reference = baseline_results.get(name)
+        if reference:
+            change = (current - reference) / reference * 100.0
+            flag = ""
+            if change > args.threshold:
+                flag = "  [X] REGRESSION"
+                regressions.append(name)
+            print(f"{name:32} {current:10.2f} {reference:10.2f} {change:+8.1f}%{flag}")
+        else:
+            print(f"{name:32} {current:10.2f} {'-':>10} {'-':>9}")
+    print("="*70)
+    
+    if args.update_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump({'machine': machine_info(), 'unit': 'us_per_packet', 'results': results}, f, indent=2)
+            f.write('\n')
+        print(f"Baseline written to {args.baseline}")
+        return 0
+    
+    if regressions:
+        print(f"\n[X] {len(regressions)} benchmark(s) regressed more than {args.threshold:g}%: {', '.join(regressions)}")
+        return 1
+    if baseline_results:
+        print(f"\n[+] No regressions beyond {args.threshold:g}%")
+    else:
+        print("\nNo baseline yet - run with --update-baseline to create one")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+FlexRadio Discovery Proxy - Config Reload Module
+Hot reload of config.ini without restarting (and so without dropping clients).
+
+A reload is requested by SIGHUP (where the platform has it) or noticed when
+the file's modification time changes. The file is re-read, compared with
+the running configuration in the sections the owner reads (server and
+client share one config.ini, so the other role's edits are ignored), and
+only the settings that changed are handed to the owner, which validates
+the new file (settings.py), applies them in place and reports those that
+still need a restart. A file that fails to parse or validate leaves the
+running configuration untouched.
+
+Copyright (c) 2026 Chris L White (WX7V)
+
+Licensed under the MIT License - see LICENSE file for details
+"""
+
+import configparser
+import logging
+import os
+import signal
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from log_pipeline import log_file_handler
+
+# (section, key) -> (old value, new value); None where the key is absent.
+# Section names are as written in the file, keys lower case (configparser).
+ConfigChanges = Dict[Tuple[str, str], Tuple[Optional[str], Optional[str]]]
+
+
+def diff_config(old: configparser.ConfigParser, new: configparser.ConfigParser,
+                sections: Optional[Iterable[str]] = None) -> ConfigChanges:
+    """Settings that differ between two configurations (added and removed keys included)
+    
+    Args:
+        sections: Only compare these sections (default: all)
+    """
+    changes = {}
+    compared = set(old.sections()) | set(new.sections())
+    if sections is not None:
+        compared &= set(sections)
+    for section in compared:
+        old_items = dict(old.items(section, raw=True)) if old.has_section(section) else {}
+        new_items = dict(new.items(section, raw=True)) if new.has_section(section) else {}
+        for key in set(old_items) | set(new_items):
+            if old_items.get(key) != new_items.get(key):
+                changes[(section, key)] = (old_items.get(key), new_items.get(key))
+    return changes
+
+
+# (section, key) -> (select(settings) -> value, apply(value)): how a reloadable
+# setting is taken from the new ServerSettings/ClientSettings and applied in place
+Setters = Dict[Tuple[str, str], Tuple[Callable[[object], object], Callable[[object], None]]]
+
+
+def apply_settings(settings, changes: ConfigChanges, setters: Setters) -> List[Tuple[str, str]]:
+    """Apply the changed settings that have a setter; returns the changed settings that need a restart
+    
+    `settings` were validated as a whole when they were read from the new
+    file, so a bad value (SettingsError) has already rejected the reload
+    before anything is applied.
+    """
+    values = {key: setters[key][0](settings) for key in changes if key in setters}
+    for key, value in values.items():
+        setters[key][1](value)
+    return [key for key in changes if key not in setters]
+
+
+def diagnostics_setters(console) -> Setters:
+    """Setters for the DIAGNOSTICS settings shared by server and client (console and log file)"""
+    handler = log_file_handler()
+    setters = {
+        ('DIAGNOSTICS', 'debug_logging'): (
+            lambda s: s.diagnostics.debug_logging,
+            lambda debug: logging.getLogger().setLevel(logging.DEBUG if debug else logging.INFO)),
+        ('DIAGNOSTICS', 'console_refresh_interval'): (
+            lambda s: s.diagnostics.console_refresh_interval,
+            lambda value: setattr(console, 'refresh_interval', value)),
+        ('DIAGNOSTICS', 'console_summary_interval'): (
+            lambda s: s.diagnostics.console_summary_interval,
+            lambda value: setattr(console, 'summary_interval', value)),
+        ('DIAGNOSTICS', 'quiet_console'): (
+            lambda s: s.diagnostics.quiet_console,
+            lambda value: setattr(console, 'quiet', value)),
+    }
+    if hasattr(handler, 'archive_index'):  # RotatingLogHandler
+        setters.update({
+            ('DIAGNOSTICS', 'max_log_size_mb'): (
+                lambda s: s.diagnostics.max_log_bytes,
+                lambda value: setattr(handler, 'max_bytes', value)),
+            ('DIAGNOSTICS', 'max_log_age_hours'): (
+                lambda s: s.diagnostics.max_log_age,
+                lambda value: setattr(handler, 'max_age', value)),
+            ('DIAGNOSTICS', 'max_log_files'): (
+                lambda s: s.diagnostics.max_log_files,
+                lambda value: setattr(handler.archive_index, 'max_archives', value)),
+        })
+    return setters
+
+
+class ConfigReloader:
+    """Watches the config file and hands changed settings to the owner
+    
+    check() is called from the owner's loop, so settings are applied on the
+    thread that uses them; the SIGHUP handler only sets a flag.
+    """
+    
+    def __init__(self, path: str, config: configparser.ConfigParser,
+                 apply: Callable[[configparser.ConfigParser, ConfigChanges], List[Tuple[str, str]]],
+                 console=None, poll_interval: float = 2.0, sections: Optional[Iterable[str]] = None):
+        """
+        Args:
+            path: Config file to watch
+            config: The running configuration
+            apply: Callback(new_config, changes) that applies changes in place and
+                   returns the (section, key) pairs that need a restart; raises
+                   ValueError (e.g. SettingsError) or configparser.Error, with
+                   nothing applied, for an invalid or missing value
+            console: ConsoleRenderer for the reload notice (default: log only)
+            poll_interval: Seconds the owner should wait between check() calls
+            sections: The sections the owner reads, e.g. ('SERVER', 'DIAGNOSTICS');
+                      changes elsewhere are ignored (default: every section)
+        """
+        self.path = path
+        self.config = config
+        self.apply = apply
+        self.console = console
+        self.poll_interval = poll_interval
+        self.sections = tuple(sections) if sections is not None else None
+        self.reloads = 0
+        self._requested = threading.Event()
+        self._mtime = self._read_mtime()
+    
+    def install_signal_handler(self) -> bool:
+        """Reload on SIGHUP (main thread only; not available on Windows)"""
+        if not hasattr(signal, 'SIGHUP') or threading.current_thread() is not threading.main_thread():
+            return False
+        signal.signal(signal.SIGHUP, lambda signum, frame: self._requested.set())
+        return True
+    
+    def request(self):
+        """Reload at the next check() (what SIGHUP does)"""
+        self._requested.set()
+    
+    def check(self) -> Optional[ConfigChanges]:
+        """Reload if requested or the file changed (call every poll_interval seconds)
+        
+        Returns:
+            The changes applied, if any
+        """
+        mtime = self._read_mtime()
+        if not self._requested.is_set() and mtime == self._mtime:
+            return None
+        self._requested.clear()
+        self._mtime = mtime
+        return self.reload()
+    
+    def reload(self) -> Optional[ConfigChanges]:
+        new_config = configparser.ConfigParser()
+        try:
+            if not new_config.read(self.path):
+                raise OSError(f"{self.path} not found")
+        except (OSError, configparser.Error) as e:
+            self.notice(f"⚠ Config reload failed, keeping the running configuration: {e}")
+            return None
+        
+        changes = diff_config(self.config, new_config, self.sections)
+        if not changes:
+            return changes
+        try:
+            restart = self.apply(new_config, changes)
+        except (ValueError, configparser.Error) as e:
+            self.notice(f"⚠ Config reload rejected, keeping the running configuration: {e}")
+            return None
+        self.config = new_config
+        self.reloads += 1
+        
+        applied = [f"{section}.{key}" for section, key in changes if (section, key) not in restart]
+        for section, key in changes:
+            old, new = changes[(section, key)]
+            logging.info(f"Config {section}.{key}: {old!r} -> {new!r}")
+        message = f"Config reloaded: {len(applied)} setting(s) applied"
+        if applied:
+            message += f" ({', '.join(sorted(applied))})"
+        if restart:
+            message += f"; restart needed for {', '.join(sorted(f'{s}.{k}' for s, k in restart))}"
+        self.notice(message)
+        return changes
+    
+    def notice(self, message: str):
+        if message.startswith('⚠'):
+            logging.warning(message)
+        else:
+            logging.info(message)
+        if self.console is not None:
+            self.console.notice(message)
+    
+    def _read_mtime(self) -> Optional[float]:
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except OSError:
+            return None
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+FlexRadio Discovery Proxy - Console Status Module
+Rate-limited, buffered console output for both server and client.
+
+The packet threads only record events (cheap, non-blocking); a background
+thread renders them to the console at a fixed refresh rate. A slow Windows
+console, pipe or service log therefore never blocks packet forwarding.
+
+Copyright (c) 2026 Chris L White (WX7V)
+
+Licensed under the MIT License - see LICENSE file for details
+"""
+
+import collections
+import datetime
+import sys
+import threading
+import time
+from typing import Optional, Callable, Dict
+
+
+class ConsoleRenderer:
+    """Aggregates status events and writes them to the console at a fixed rate
+    
+    Event types:
+        update(key, text)  - latest-wins status (e.g. one line per radio); only
+                             the newest text per key is printed, and only when
+                             it differs from what was last shown
+        notice(text)       - one-off message (client connected, errors, ...);
+                             bounded, oldest dropped under load
+        count(name)        - counters passed to the summary callback
+    
+    In quiet (daemon) mode status updates and summaries are suppressed and
+    only notices are written.
+    """
+    
+    def __init__(self, refresh_interval: float = 1.0, summary_interval: float = 10.0,
+                 quiet: bool = False, summary: Optional[Callable[[Dict[str, int], float], Optional[str]]] = None,
+                 stream=None, max_notices: int = 100):
+        """
+        Args:
+            refresh_interval: Seconds between console refreshes
+            summary_interval: Seconds between summary lines (0 = never)
+            quiet: Suppress status updates and summaries
+            summary: Callback(counters_since_last_summary, elapsed_seconds) -> line or None
+            stream: Output stream (default sys.stdout)
+            max_notices: Notices kept between refreshes before the oldest are dropped
+        """
+        self.refresh_interval = refresh_interval
+        self.summary_interval = summary_interval
+        self.quiet = quiet
+        self.summary = summary
+        self.stream = stream
+        
+        self.dropped = 0
+        self._lock = threading.Lock()
+        self._notices = collections.deque(maxlen=max_notices)
+        self._pending: Dict[str, str] = {}
+        self._shown: Dict[str, str] = {}
+        self._counters = collections.Counter()
+        self._last_summary = time.monotonic()
+        self._stop = threading.Event()
+        self._thread = None
+    
+    def start(self):
+        """Start the background render thread"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='console-renderer', daemon=True)
+            self._thread.start()
+    
+    def stop(self):
+        """Stop the render thread and write anything still pending"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(self.refresh_interval + 1.0)
+            self._thread = None
+        self.render()
+    
+    def update(self, key: str, text: str):
+        """Set the latest status text for `key` (superseded updates are dropped)"""
+        if self.quiet:
+            return
+        with self._lock:
+            if key in self._pending:
+                self.dropped += 1
+            self._pending[key] = text
+    
+    def notice(self, text: str):
+        """Queue a one-off message for the next refresh"""
+        with self._lock:
+            if len(self._notices) == self._notices.maxlen:
+                self.dropped += 1
+            self._notices.append(text)
+    
+    def count(self, name: str, amount: int = 1):
+        """Increment a summary counter"""
+        with self._lock:
+            self._counters[name] += amount
+    
+    def render(self):
+        """Write pending output in a single buffered write (normally called by the render thread)"""
+        now = time.monotonic()
+        current_time = datetime.datetime.now().strftime("%H:%M:%S")
+        with self._lock:
+            lines = list(self._notices)
+            self._notices.clear()
+            pending, self._pending = self._pending, {}
+            # Compared and updated under the lock: forget() may run on another thread
+            for key, text in pending.items():
+                if self._shown.get(key) != text:
+                    self._shown[key] = text
+                    lines.append(f"{current_time} - {text}")
+            counters = None
+            if self.summary_interval > 0 and now - self._last_summary >= self.summary_interval:
+                counters, self._counters = self._counters, collections.Counter()
+                elapsed = now - self._last_summary
+                self._last_summary = now
+        
+        if counters is not None and self.summary and not self.quiet:
+            summary_line = self.summary(dict(counters), elapsed)
+            if summary_line:
+                lines.append(f"{current_time} - {summary_line}")
+        
+        if lines:
+            stream = self.stream or sys.stdout
+            try:
+                stream.write('\n'.join(lines) + '\n')
+                stream.flush()
+            except Exception:
+                pass
+    
+    def forget(self, key: str):
+        """Forget the last shown text for `key` so its next update is printed again"""
+        with self._lock:
+            self._pending.pop(key, None)
+            self._shown.pop(key, None)
+    
+    def _run(self):
+        while not self._stop.wait(self.refresh_interval):
+            self.render()
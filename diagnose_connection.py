@@ -6,9 +6,10 @@ Tests the connection and shows what's happening in real-time
 
 import socket
 import time
-import json
 import sys
 
+from stream_protocol import LineFramer, decode_frames
+
 def test_server_connection(server_ip, stream_port):
     """Test connection to server and show what data is received"""
     print("\n" + "="*70)
@@ -34,8 +35,9 @@ def test_server_connection(server_ip, stream_port):
         print("\nListening for packets from server...")
         print("(This will wait up to 30 seconds for data)\n")
         
-        buffer = ""
+        framer = LineFramer()
         packet_count = 0
+        control_count = 0
         start_time = time.time()
         
         while time.time() - start_time < 30:
@@ -46,33 +48,26 @@ def test_server_connection(server_ip, stream_port):
                     print("✗ Server closed connection")
                     break
                 
-                # Add to buffer
-                buffer += data.decode('utf-8')
+                # Process complete JSON messages (same framing and decoding as the client)
+                lines = framer.feed(data)
+                frames = decode_frames(lines)
+                if len(frames) < len(lines):
+                    print(f"✗ {len(lines) - len(frames)} malformed message(s) skipped")
                 
-                # Process complete JSON messages
-                while '\n' in buffer:
-                    line, buffer = buffer.split('\n', 1)
-                    
-                    if not line.strip():
+                for packet_data in frames:
+                    if 'type' in packet_data:
+                        control_count += 1  # Heartbeat or other control message
                         continue
+                    packet_count += 1
+                    
+                    current_time = time.strftime("%H:%M:%S")
+                    radio_info = packet_data.get('radio_info', {})
                     
-                    try:
-                        packet_data = json.loads(line)
-                        packet_count += 1
-                        
-                        current_time = time.strftime("%H:%M:%S")
-                        radio_info = packet_data.get('radio_info', {})
-                        
-                        print(f"{current_time} - Packet #{packet_count} received:")
-                        print(f"  Radio: {radio_info.get('model', 'Unknown')} ({radio_info.get('nickname', 'Unknown')})")
-                        print(f"  IP: {radio_info.get('ip', 'Unknown')} | Status: {radio_info.get('status', 'Unknown')}")
-                        print(f"  Server version: {packet_data.get('server_version', 'Unknown')}")
-                        print(f"  Packet size: {packet_data.get('packet_size', 0)} bytes\n")
-                        
-                    except json.JSONDecodeError as e:
-                        print(f"✗ JSON decode error: {e}")
-                    except Exception as e:
-                        print(f"✗ Error processing packet: {e}")
+                    print(f"{current_time} - Packet #{packet_count} received:")
+                    print(f"  Radio: {radio_info.get('model', 'Unknown')} ({radio_info.get('nickname', 'Unknown')})")
+                    print(f"  IP: {radio_info.get('ip', 'Unknown')} | Status: {radio_info.get('status', 'Unknown')}")
+                    print(f"  Server version: {packet_data.get('server_version', 'Unknown')}")
+                    print(f"  Packet size: {packet_data.get('packet_size', 0)} bytes\n")
             
             except socket.timeout:
                 # Show periodic status
@@ -91,6 +86,8 @@ def test_server_connection(server_ip, stream_port):
         print("Diagnostic Results:")
         print("="*70)
         
+        if control_count:
+            print(f"  Control messages (heartbeats etc.): {control_count}")
         if packet_count > 0:
             print(f"✓ SUCCESS: Received {packet_count} packet(s) from server")
             print(f"  The connection is working correctly!")
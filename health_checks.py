@@ -9,8 +9,6 @@ Licensed under the MIT License - see LICENSE file for details
 """
 
 import socket
-import subprocess
-import platform
 import time
 import logging
 from dataclasses import dataclass
@@ -36,38 +34,29 @@ class HealthCheckResult:
 class HealthChecker:
     """Main health check coordinator"""
     
-    def __init__(self, config, mode='server', version='Unknown'):
+    def __init__(self, settings, mode='server', version='Unknown'):
         """
         Initialize health checker
         
         Args:
-            config: ConfigParser object with DIAGNOSTICS section
+            settings: Validated ServerSettings or ClientSettings (ports and
+                      addresses are checked as the program will use them)
             mode: 'server' or 'client'
             version: Current script version
         """
-        self.config = config
+        self.settings = settings
         self.mode = mode
         self.version = version
         self.results: List[HealthCheckResult] = []
         
-        # Load diagnostic settings
-        try:
-            self.enabled = config.getboolean('DIAGNOSTICS', 'Enable_Health_Checks')
-            self.startup_tests = config.getboolean('DIAGNOSTICS', 'Startup_Tests')
-            self.periodic_interval = config.getfloat('DIAGNOSTICS', 'Periodic_Check_Interval')
-            self.ping_timeout = config.getfloat('DIAGNOSTICS', 'Ping_Timeout')
-            self.display_interface_info = config.getboolean('DIAGNOSTICS', 'Display_Interface_Info')
-            self.test_server_ip = config.get('DIAGNOSTICS', 'Test_Server_IP', fallback='')
-            self.test_radio_ip = config.get('DIAGNOSTICS', 'Test_Radio_IP', fallback='')
-        except Exception as e:
-            logging.warning(f"Error loading diagnostics config: {e}. Using defaults.")
-            self.enabled = True
-            self.startup_tests = True
-            self.periodic_interval = 60.0
-            self.ping_timeout = 5.0
-            self.display_interface_info = True
-            self.test_server_ip = ''
-            self.test_radio_ip = ''
+        diagnostics = settings.diagnostics
+        self.enabled = diagnostics.enable_health_checks
+        self.startup_tests = diagnostics.startup_tests
+        self.periodic_interval = diagnostics.periodic_check_interval
+        self.ping_timeout = diagnostics.ping_timeout
+        self.display_interface_info = diagnostics.display_interface_info
+        self.test_server_ip = diagnostics.test_server_ip
+        self.test_radio_ip = diagnostics.test_radio_ip
     
     def run_all_checks(self, is_startup=False) -> List[HealthCheckResult]:
         """Run all applicable health checks based on mode
@@ -100,35 +89,15 @@ class HealthChecker:
         self.results.append(self._check_network_interfaces())
         
         # Port binding check
-        discovery_port = int(self.config['SERVER']['Discovery_Port'])
-        self.results.append(self._check_udp_port_available(discovery_port))
+        self.results.append(self._check_udp_port_available(self.settings.discovery_port))
         
-        # Check stream mode configuration
-        # v3.0+ defaults to socket mode (file mode is legacy v2.x)
-        stream_mode = self.config['SERVER'].get('Stream_Mode', 'socket').lower()
-        
-        # Socket mode checks
-        if stream_mode == 'socket':
-            stream_port = int(self.config['SERVER']['Stream_Port'])
-            self.results.append(self._check_tcp_port_available(stream_port, "Stream Port"))
-            
-            # Only check if server is listening during periodic checks (not startup)
-            if not skip_listener_check:
-                self.results.append(self._check_tcp_listener(stream_port))
+        # Stream socket checks (v3.0+ streams over a socket; file mode was v2.x only)
+        stream_port = self.settings.stream.port
+        self.results.append(self._check_tcp_port_available(stream_port, "Stream Port"))
         
-        # File mode checks (legacy v2.x only)
-        elif stream_mode == 'file':
-            # Only check file path if it's configured
-            if 'Shared_File_Path' in self.config['SERVER']:
-                shared_file = self.config['SERVER']['Shared_File_Path']
-                self.results.append(self._check_file_write_permission(shared_file))
-            else:
-                # File mode configured but no path provided
-                self.results.append(HealthCheckResult(
-                    name="File Mode Configuration",
-                    status=HealthStatus.FAIL,
-                    message="Stream_Mode set to 'file' but Shared_File_Path not configured"
-                ))
+        # Only check if server is listening during periodic checks (not startup)
+        if not skip_listener_check:
+            self.results.append(self._check_tcp_listener(stream_port))
         
         # Radio reachability (if configured)
         if self.test_radio_ip:
@@ -140,43 +109,22 @@ class HealthChecker:
         self.results.append(self._check_network_interfaces())
         
         # Port binding check
-        discovery_port = int(self.config['CLIENT']['Discovery_Port'])
-        self.results.append(self._check_udp_port_available(discovery_port))
+        self.results.append(self._check_udp_port_available(self.settings.discovery_port))
         
         # Broadcast capability check
         self.results.append(self._check_broadcast_capability())
         
-        # Check connection mode configuration
-        # v3.0+ defaults to socket mode (file mode is legacy v2.x)
-        connection_mode = self.config['CLIENT'].get('Connection_Mode', 'socket').lower()
+        # Server connection checks (v3.0+ connects over a socket; file mode was v2.x only)
+        server_address = self.settings.server_address
+        self.results.append(self._check_tcp_connectivity(server_address, self.settings.stream_port))
         
-        # Socket mode checks
-        if connection_mode == 'socket':
-            server_address = self.config['CLIENT']['Server_Address']
-            stream_port = int(self.config['CLIENT']['Stream_Port'])
-            self.results.append(self._check_tcp_connectivity(server_address, stream_port))
-            
-            # Ping test for network reachability
-            if server_address:
-                self.results.append(self._check_ping(server_address, "Server"))
+        # Ping test for network reachability
+        if server_address:
+            self.results.append(self._check_ping(server_address, "Server"))
         
-        # File mode checks (legacy v2.x only)
-        elif connection_mode == 'file':
-            # Only check file path if it's configured
-            if 'Shared_File_Path' in self.config['CLIENT']:
-                shared_file = self.config['CLIENT']['Shared_File_Path']
-                self.results.append(self._check_file_read_permission(shared_file))
-            else:
-                # File mode configured but no path provided
-                self.results.append(HealthCheckResult(
-                    name="File Mode Configuration",
-                    status=HealthStatus.FAIL,
-                    message="Connection_Mode set to 'file' but Shared_File_Path not configured"
-                ))
-            
-            # VPN/Server connectivity (if configured separately)
-            if self.test_server_ip and self.test_server_ip != server_address if connection_mode == 'socket' else True:
-                self.results.append(self._check_ping(self.test_server_ip, "VPN/Server"))
+        # VPN/Server connectivity (if configured separately)
+        if self.test_server_ip and self.test_server_ip != server_address:
+            self.results.append(self._check_ping(self.test_server_ip, "VPN/Server"))
     
     def _check_version_and_config(self) -> HealthCheckResult:
         """Check version and configuration compatibility"""
@@ -190,39 +138,26 @@ class HealthChecker:
             else:
                 version_tuple = (0, 0)
             
-            # Check if socket mode is configured
-            if self.mode == 'server':
-                stream_mode = self.config['SERVER'].get('Stream_Mode', 'file').lower()
-                mode_key = 'Stream_Mode'
-            else:
-                stream_mode = self.config['CLIENT'].get('Connection_Mode', 'file').lower()
-                mode_key = 'Connection_Mode'
+            # Settings only describe socket mode (file mode was v2.x only)
+            mode_key = 'Stream_Mode' if self.mode == 'server' else 'Connection_Mode'
             
             # Socket mode requires v2.2.0 or higher
-            if stream_mode == 'socket' and version_tuple < (2, 2):
+            if version_tuple < (2, 2):
                 return HealthCheckResult(
                     name="Version & Configuration",
                     status=HealthStatus.FAIL,
                     message=f"Socket mode requires v2.2.0+ (running v{self.version})",
                     details=f"Config has {mode_key}=socket but this version doesn't support it.\n"
-                           f"Either upgrade to v2.2.0+ or change {mode_key}=file in config.ini"
+                           f"Upgrade to v2.2.0+"
                 )
             
             # All good
-            if stream_mode == 'socket':
-                return HealthCheckResult(
-                    name="Version & Configuration",
-                    status=HealthStatus.PASS,
-                    message=f"v{self.version} - Socket mode supported",
-                    details=f"Configuration: {mode_key}={stream_mode}"
-                )
-            else:
-                return HealthCheckResult(
-                    name="Version & Configuration",
-                    status=HealthStatus.PASS,
-                    message=f"v{self.version} - File mode",
-                    details=f"Configuration: {mode_key}={stream_mode}"
-                )
+            return HealthCheckResult(
+                name="Version & Configuration",
+                status=HealthStatus.PASS,
+                message=f"v{self.version} - Socket mode supported",
+                details=f"Configuration: {mode_key}=socket"
+            )
         
         except Exception as e:
             return HealthCheckResult(
@@ -329,6 +264,9 @@ class HealthChecker:
                 message=f"No {target_name} IP configured"
             )
         
+        # Imported here rather than at startup: only the ping test needs them
+        import platform
+        import subprocess
         try:
             # Determine ping command based on OS
             param = '-n' if platform.system().lower() == 'windows' else '-c'
@@ -373,83 +311,6 @@ class HealthChecker:
                 details=str(e)
             )
     
-    def _check_file_write_permission(self, file_path: str) -> HealthCheckResult:
-        """Check if we can write to shared file location"""
-        try:
-            # Try to create/write to the file
-            import os
-            directory = os.path.dirname(file_path) or '.'
-            
-            if not os.path.exists(directory):
-                return HealthCheckResult(
-                    name="File Write Permission",
-                    status=HealthStatus.FAIL,
-                    message=f"Directory does not exist: {directory}"
-                )
-            
-            # Try writing a test file
-            test_file = os.path.join(directory, '.health_check_test')
-            with open(test_file, 'w') as f:
-                f.write('test')
-            os.remove(test_file)
-            
-            return HealthCheckResult(
-                name="File Write Permission",
-                status=HealthStatus.PASS,
-                message=f"Can write to {directory}"
-            )
-        except PermissionError:
-            return HealthCheckResult(
-                name="File Write Permission",
-                status=HealthStatus.FAIL,
-                message="Permission denied",
-                details=f"Cannot write to {directory}"
-            )
-        except Exception as e:
-            return HealthCheckResult(
-                name="File Write Permission",
-                status=HealthStatus.WARN,
-                message="Cannot verify write permission",
-                details=str(e)
-            )
-    
-    def _check_file_read_permission(self, file_path: str) -> HealthCheckResult:
-        """Check if we can read from shared file location"""
-        try:
-            import os
-            
-            if not os.path.exists(file_path):
-                return HealthCheckResult(
-                    name="File Read Permission",
-                    status=HealthStatus.WARN,
-                    message="Discovery file not yet created",
-                    details=f"File: {file_path}\nWaiting for server to create it"
-                )
-            
-            # Try reading the file
-            with open(file_path, 'r') as f:
-                f.read(1)  # Read just one byte
-            
-            return HealthCheckResult(
-                name="File Read Permission",
-                status=HealthStatus.PASS,
-                message="Can read discovery file"
-            )
-        except PermissionError:
-            return HealthCheckResult(
-                name="File Read Permission",
-                status=HealthStatus.FAIL,
-                message="Permission denied",
-                details=f"Cannot read {file_path}"
-            )
-        except Exception as e:
-            return HealthCheckResult(
-                name="File Read Permission",
-                status=HealthStatus.WARN,
-                message="Cannot verify read permission",
-                details=str(e)
-            )
-    
     def _check_tcp_port_available(self, port: int, port_name: str = "TCP Port") -> HealthCheckResult:
         """Check if TCP port can be bound"""
         try:
@@ -479,6 +340,10 @@ class HealthChecker:
                     details=str(e)
                 )
     
+    def check_listener(self, port: int) -> HealthCheckResult:
+        """Post-startup check that the stream port accepts connections (without the full suite)"""
+        return self._check_tcp_listener(port)
+    
     def _check_tcp_listener(self, port: int) -> HealthCheckResult:
         """Check if TCP server is listening (for server self-test)"""
         try:
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+FlexRadio Discovery Proxy - Ingress Filter Module
+Flood and loop protection for the server's discovery port.
+
+Every datagram that reaches Discovery_Port costs the single receive thread
+a parse and a send to every client, so a misbehaving device, a broadcast
+storm or a client's rebroadcast looped back onto the radio LAN could
+saturate the server and flood every client. Datagrams are checked here,
+before anything else is done with them:
+
+- Allowed_Sources: only these addresses/networks are accepted (empty = any)
+- Source_Rate_Limit / Source_Burst: a token bucket per source IP; a radio
+  broadcasts about once a second, so the limit only bites on floods
+- Echo_Window_Seconds: a client rebroadcasts packets byte for byte, so a
+  packet that arrives from a second source within the window of the same
+  bytes arriving from the first is an echo (a client rebroadcasting onto
+  this LAN, or two cross-connected proxies) and is dropped before it can
+  circulate again
+
+A source's allowlist verdict is worked out once and cached with its bucket,
+so an admitted datagram costs one dict lookup and a little arithmetic.
+At most MAX_SOURCES sources are tracked, least recently seen first in line
+to go: a source that has been quiet for SOURCE_IDLE_SECONDS (its bucket
+full again) is forgotten to make room for a new one. Only while the table
+is full of active sources - a flood from many (e.g. spoofed) addresses -
+do new sources share a bucket (one for addresses on the allowlist, one for
+the rest), which bounds memory and work however wide the allowlist is.
+
+Copyright (c) 2026 Chris L White (WX7V)
+
+Licensed under the MIT License - see LICENSE file for details
+"""
+
+import collections
+import ipaddress
+import logging
+from typing import Callable, Dict, Iterable, Optional
+
+# Sources tracked individually; while all are active, new ones share an overflow bucket
+# (OTHER_ALLOWED_SOURCES for addresses on the allowlist, OTHER_SOURCES for the rest)
+MAX_SOURCES = 256
+OTHER_SOURCES = 'other'
+OTHER_ALLOWED_SOURCES = 'other (allowed)'
+
+# Seconds without a datagram after which a source may be forgotten to make room
+SOURCE_IDLE_SECONDS = 10.0
+
+# Most packet fingerprints remembered for echo detection (oldest forgotten first)
+MAX_FINGERPRINTS = 4096
+
+
+class SourceState:
+    """Token bucket and counters for one source address"""
+    
+    __slots__ = ('allowed', 'tokens', 'updated', 'packets', 'dropped', 'limited')
+    
+    def __init__(self, allowed: bool, tokens: float, now: float):
+        self.allowed = allowed
+        self.tokens = tokens
+        self.updated = now
+        self.packets = 0      # Datagrams received
+        self.dropped = 0      # Of which dropped (not allowed or over the rate limit)
+        self.limited = False  # Currently being dropped (the notice was given)
+
+
+class IngressFilter:
+    """Per-source allowlist and token-bucket rate limit for received datagrams"""
+    
+    def __init__(self, rate: float = 0.0, burst: int = 0, allowed: Iterable[str] = (),
+                 notice: Optional[Callable[[str], None]] = None, idle: float = SOURCE_IDLE_SECONDS):
+        """
+        Args:
+            rate: Packets per second allowed from each source (0 = no limit)
+            burst: Packets a source may send at once before the rate applies
+            allowed: Source addresses or networks accepted (empty = any source)
+            notice: Called with a message when a source starts being dropped
+            idle: Seconds without a datagram after which a source may be forgotten
+        """
+        self.rate = rate
+        self.burst = burst
+        self.allowed = []
+        self.notice = notice
+        self.idle = idle
+        # Source -> state, least recently seen first
+        self.sources: Dict[str, SourceState] = collections.OrderedDict()
+        self.dropped = 0
+        self.set_allowed(allowed)
+    
+    def set_allowed(self, allowed: Iterable[str]):
+        """Replace the allowlist (config reload); cached verdicts are worked out again"""
+        self.allowed = [ipaddress.ip_network(network, strict=False) for network in allowed]
+        # The overflow buckets mix sources: they are set up again on next use
+        self.sources.pop(OTHER_SOURCES, None)
+        self.sources.pop(OTHER_ALLOWED_SOURCES, None)
+        for source, state in self.sources.items():
+            state.allowed = self.is_allowed(source)
+    
+    def is_allowed(self, source: str) -> bool:
+        if not self.allowed:
+            return True
+        try:
+            address = ipaddress.ip_address(source)
+        except ValueError:
+            return False
+        return any(address in network for network in self.allowed)
+    
+    def admit(self, source: str, now: float) -> bool:
+        """Whether to process a datagram from `source` received at `now` (seconds)"""
+        state = self.sources.get(source)
+        if state is None:
+            state = self.track(source, now)
+        else:
+            self.sources.move_to_end(source)
+        state.packets += 1
+        
+        if state.allowed:
+            if self.rate <= 0:
+                state.updated = now
+                return True
+            state.tokens = min(self.burst, state.tokens + max(0.0, now - state.updated) * self.rate)
+            state.updated = now
+            if state.tokens >= self.burst:
+                state.limited = False  # Back under the limit: notify again if it floods again
+            if state.tokens >= 1.0:
+                state.tokens -= 1.0
+                return True
+            reason = f"over {self.rate:g} packet(s)/s"
+        else:
+            state.updated = now
+            reason = "not in Allowed_Sources"
+        
+        state.dropped += 1
+        self.dropped += 1
+        if not state.limited:
+            state.limited = True
+            message = f"⚠ Dropping discovery packets from {source}: {reason}"
+            logging.warning(message)
+            if self.notice is not None:
+                self.notice(message)
+        return False
+    
+    def track(self, source: str, now: float) -> SourceState:
+        """State for a source seen for the first time (or again after being forgotten)"""
+        self.forget_idle(now)
+        allowed = self.is_allowed(source)
+        if len(self.sources) >= MAX_SOURCES:
+            # Table full of active sources: share a bucket with the others on
+            # (or off) the allowlist, so a flood from inside a wide allowed
+            # network is bounded too
+            shared = OTHER_ALLOWED_SOURCES if allowed and self.allowed else OTHER_SOURCES
+            state = self.sources.get(shared)
+            if state is None:
+                state = self.sources[shared] = SourceState(allowed, self.burst, now)
+            else:
+                self.sources.move_to_end(shared)
+            return state
+        state = self.sources[source] = SourceState(allowed, self.burst, now)
+        return state
+    
+    def forget_idle(self, now: float):
+        """Make room in a full table by dropping the least recently seen sources that have gone quiet"""
+        while len(self.sources) >= MAX_SOURCES:
+            source, state = next(iter(self.sources.items()))
+            if now - state.updated < self.idle:
+                return  # The least recently seen source is still active, so all are
+            if state.allowed and self.rate > 0 and state.tokens + (now - state.updated) * self.rate < self.burst:
+                return  # Its bucket hasn't refilled: a fresh one would let it send more
+            del self.sources[source]
+    
+    def summary(self) -> dict:
+        """Drop statistics for the admin socket `stats` command"""
+        return {
+            'rate_limit': self.rate,
+            'burst': self.burst,
+            'allowed_sources': [str(network) for network in self.allowed],
+            'dropped': self.dropped,
+            'sources': {source: {'packets': state.packets, 'dropped': state.dropped, 'allowed': state.allowed}
+                        for source, state in self.sources.items()}
+        }
+
+
+class EchoFilter:
+    """Drops copies of recent packets that arrive from a different source
+    
+    Fingerprints (hash of the datagram) are kept in arrival order with their
+    first source and expiry, so expired ones are pruned from the front and
+    each datagram costs a hash and a few dict operations.
+    """
+    
+    def __init__(self, window: float = 5.0, notice: Optional[Callable[[str], None]] = None):
+        """
+        Args:
+            window: Seconds a packet's fingerprint is remembered (0 = no echo detection)
+            notice: Called with a message when a source's echoes are first dropped
+        """
+        self.window = window
+        self.notice = notice
+        self.dropped = 0
+        self.sources: Dict[str, int] = {}  # Source -> echoes dropped
+        self._seen = collections.OrderedDict()  # Fingerprint -> (first source, expires)
+    
+    def is_echo(self, data: bytes, source: str, now: float) -> bool:
+        """Whether a datagram from `source` received at `now` is an echo of a recent one"""
+        if self.window <= 0:
+            return False
+        seen = self._seen
+        while seen:
+            first = next(iter(seen.values()))
+            if first[1] > now and len(seen) < MAX_FINGERPRINTS:
+                break
+            seen.popitem(last=False)
+        
+        fingerprint = hash(data)
+        entry = seen.get(fingerprint)
+        if entry is not None and entry[0] != source:
+            self.dropped += 1
+            self.sources[source] = self.sources.get(source, 0) + 1
+            if self.sources[source] == 1:
+                message = (f"⚠ Dropping echoed discovery packets from {source} (copies of packets from {entry[0]}): "
+                           f"a client is rebroadcasting onto this network")
+                logging.warning(message)
+                if self.notice is not None:
+                    self.notice(message)
+            return True
+        
+        # Refresh: the entry moves to the end, keeping expiry order
+        if entry is not None:
+            del seen[fingerprint]
+        seen[fingerprint] = (source, now + self.window)
+        return False
+    
+    def summary(self) -> dict:
+        """Echo statistics for the admin socket `stats` command"""
+        return {'window_seconds': self.window, 'dropped': self.dropped, 'sources': dict(self.sources)}
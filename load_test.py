@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+"""
+FlexRadio Discovery Proxy - Load Test
+Drives a DiscoveryServer with synthetic radios and a swarm of stream clients
+and reports throughput, fan-out latency, CPU and memory.
+
+By default a loopback server is started in-process (ephemeral ports). Use
+--server to test a separately running server instead, e.g.:
+    
+    python load_test.py --radios 4 --rate 2 --clients 200 --duration 30
+    python load_test.py --server 10.0.0.5:4992:5992 --clients 50
+
+Every simulated radio sends from this host's address, so a running server's
+per-source flood protection applies to their total rate: above its
+Source_Rate_Limit (20 packets/s by default) the excess is dropped and the
+throughput is understated. Raise Source_Rate_Limit (or set 0) on the server
+for the test. The loopback server runs without the limit.
+
+Copyright (c) 2026 Chris L White (WX7V)
+
+Licensed under the MIT License - see LICENSE file for details
+"""
+
+import argparse
+import json
+import selectors
+import socket
+import sys
+import threading
+import time
+from typing import List, Optional
+
+from settings import ServerSettings
+from simulation import SyntheticRadioEmitter, import_entry_script, loopback_config, packet_sequence
+
+try:
+    import resource  # Unix only
+except ImportError:
+    resource = None
+
+PACKET_HEX_KEY = b'"packet_hex": "'
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(pct / 100.0 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def start_loopback_server(max_clients: int):
+    """Start a DiscoveryServer in-process on 127.0.0.1 with ephemeral ports
+    
+    Returns:
+        (server, thread, cpu) where cpu['seconds'] is filled with the packet
+        thread's CPU time once the server stops
+    """
+    server_module = import_entry_script('FRS-Discovery-Server.py')
+    
+    server = server_module.DiscoveryServer(loopback_config(max_clients))
+    cpu = {'seconds': 0.0}
+    
+    def serve():
+        started = time.thread_time()
+        server.start()
+        cpu['seconds'] = time.thread_time() - started
+    
+    thread = threading.Thread(target=serve, name='discovery-server', daemon=True)
+    thread.start()
+    
+    deadline = time.time() + 10
+    while not (server.running and server.tcp_sock) and time.time() < deadline:
+        time.sleep(0.01)
+    if not server.running:
+        raise RuntimeError("Loopback server did not start")
+    return server, thread, cpu
+
+
+class ClientSwarm:
+    """Many simulated stream clients serviced by a single selector thread"""
+    
+    def __init__(self, address: str, port: int, count: int, send_times: dict):
+        self.address = address
+        self.port = port
+        self.count = count
+        self.send_times = send_times
+        
+        self.connected = 0
+        self.disconnected = 0
+        self.frames = 0
+        self.bytes_received = 0
+        self.latencies: List[float] = []
+        self._selector = selectors.DefaultSelector()
+        self._buffers = {}
+        self._stop = threading.Event()
+        self._thread = None
+    
+    def connect(self):
+        """Open all client connections"""
+        for _ in range(self.count):
+            sock = socket.create_connection((self.address, self.port), timeout=10)
+            sock.setblocking(False)
+            self._buffers[sock] = b''
+            self._selector.register(sock, selectors.EVENT_READ)
+            self.connected += 1
+        self._thread = threading.Thread(target=self._run, name='client-swarm', daemon=True)
+        self._thread.start()
+    
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(2.0)
+        for sock in list(self._buffers):
+            sock.close()
+    
+    def _run(self):
+        while not self._stop.is_set():
+            for key, _ in self._selector.select(timeout=0.2):
+                sock = key.fileobj
+                try:
+                    data = sock.recv(65536)
+                except (BlockingIOError, InterruptedError):
+                    continue
+                except OSError:
+                    data = b''
+                if not data:
+                    self._selector.unregister(sock)
+                    self._buffers.pop(sock, None)
+                    sock.close()
+                    self.disconnected += 1
+                    continue
+                
+                now = time.perf_counter()
+                self.bytes_received += len(data)
+                lines = (self._buffers[sock] + data).split(b'\n')
+                self._buffers[sock] = lines.pop()
+                for line in lines:
+                    if line:
+                        self.frames += 1
+                        self._record_latency(line, now)
+    
+    def _record_latency(self, line: bytes, now: float):
+        start = line.find(PACKET_HEX_KEY)
+        if start < 0:
+            return
+        start += len(PACKET_HEX_KEY)
+        try:
+            sequence = packet_sequence(bytes.fromhex(line[start:start + 56].decode('ascii')))
+        except ValueError:
+            return
+        sent = self.send_times.get(sequence)
+        if sent is not None:
+            self.latencies.append((now - sent) * 1000.0)
+
+
+def usage_snapshot():
+    """(cpu_seconds, peak_rss_mb or None) for this process"""
+    if resource is None:
+        return time.process_time(), None
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    peak_kb = usage.ru_maxrss / 1024 if sys.platform == 'darwin' else usage.ru_maxrss
+    return usage.ru_utime + usage.ru_stime, peak_kb / 1024
+
+
+def run_load_test(radios: int, rate: float, clients: int, duration: float, flap_every: int = 0,
+                  server_spec: Optional[str] = None) -> dict:
+    """Run one load test and return the measured results"""
+    server = server_thread = server_cpu = None
+    if server_spec:
+        host, discovery_port, stream_port = server_spec.rsplit(':', 2)
+        discovery_port, stream_port = int(discovery_port), int(stream_port)
+    else:
+        server, server_thread, server_cpu = start_loopback_server(max_clients=clients + 1)
+        host, discovery_port, stream_port = '127.0.0.1', server.discovery_port, server.stream_port
+    
+    emitter = SyntheticRadioEmitter((host, discovery_port), radios=radios, rate=rate,
+                                    flap_every=flap_every, tag_sequence=True)
+    swarm = ClientSwarm(host, stream_port, clients, emitter.send_times)
+    swarm.connect()
+    
+    # Wait for the server to register every client before traffic starts
+    if server:
+        deadline = time.time() + 10
+        while time.time() < deadline:
+            with server.clients_lock:
+                if len(server.clients) >= clients:
+                    break
+            time.sleep(0.05)
+    else:
+        time.sleep(1.0)
+    
+    cpu_start, _ = usage_snapshot()
+    started = time.perf_counter()
+    emitter.start()
+    time.sleep(duration)
+    emitter.stop()
+    elapsed = time.perf_counter() - started
+    time.sleep(0.5)  # Let in-flight frames arrive
+    cpu_end, peak_rss_mb = usage_snapshot()
+    swarm.stop()
+    
+    server_received = None
+    if server:
+        server_received = server.packet_count
+        server.running = False
+        server_thread.join(5.0)
+    
+    latencies = sorted(swarm.latencies)
+    expected_frames = emitter.packets_sent * clients
+    return {
+        'radios': radios,
+        'rate': rate,
+        'clients': clients,
+        'duration': elapsed,
+        'packets_emitted': emitter.packets_sent,
+        'server_received': server_received,
+        'frames_delivered': swarm.frames,
+        'frames_expected': expected_frames,
+        'bytes_received': swarm.bytes_received,
+        'clients_dropped': swarm.disconnected,
+        'ingest_rate': emitter.packets_sent / elapsed,
+        'delivery_rate': swarm.frames / elapsed,
+        'latency_ms': {
+            'p50': percentile(latencies, 50),
+            'p90': percentile(latencies, 90),
+            'p99': percentile(latencies, 99),
+            'max': latencies[-1] if latencies else 0.0,
+        },
+        'process_cpu_seconds': cpu_end - cpu_start,
+        'server_thread_cpu_seconds': server_cpu['seconds'] if server_cpu else None,
+        'peak_rss_mb': peak_rss_mb,
+    }
+
+
+def print_report(results: dict):
+    """Print a load test report"""
+    print("\n" + "="*70)
+    print("Load Test Results")
+    print("="*70)
+    print(f"Radios: {results['radios']} @ {results['rate']:g} pkt/s each | "
+          f"Clients: {results['clients']} | Duration: {results['duration']:.1f}s")
+    print()
+    print(f"Packets emitted:      {results['packets_emitted']}")
+    if results['server_received'] is not None:
+        print(f"Packets received:     {results['server_received']} (server)")
+    delivered_pct = 100.0 * results['frames_delivered'] / results['frames_expected'] if results['frames_expected'] else 0.0
+    print(f"Frames delivered:     {results['frames_delivered']} of {results['frames_expected']} ({delivered_pct:.1f}%)")
+    print(f"Clients dropped:      {results['clients_dropped']}")
+    print(f"Ingest throughput:    {results['ingest_rate']:.1f} packets/s")
+    print(f"Fan-out throughput:   {results['delivery_rate']:.1f} frames/s "
+          f"({results['bytes_received'] / results['duration'] / 1024:.1f} KiB/s)")
+    latency = results['latency_ms']
+    print(f"Fan-out latency (ms): p50 {latency['p50']:.2f} | p90 {latency['p90']:.2f} | "
+          f"p99 {latency['p99']:.2f} | max {latency['max']:.2f}")
+    cpu_pct = 100.0 * results['process_cpu_seconds'] / results['duration']
+    print(f"Process CPU:          {results['process_cpu_seconds']:.2f}s ({cpu_pct:.0f}% of one core, includes load generator)")
+    if results['server_thread_cpu_seconds'] is not None:
+        print(f"Server packet thread: {results['server_thread_cpu_seconds']:.2f}s CPU")
+    if results['peak_rss_mb'] is not None:
+        print(f"Peak memory (RSS):    {results['peak_rss_mb']:.1f} MB")
+    print("="*70 + "\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the FlexRadio Discovery Server")
+    parser.add_argument('--radios', type=int, default=1, help="Simulated radios (default 1)")
+    parser.add_argument('--rate', type=float, default=1.0, help="Packets per second per radio (default 1)")
+    parser.add_argument('--clients', type=int, default=100, help="Simulated stream clients (default 100)")
+    parser.add_argument('--duration', type=float, default=10.0, help="Test duration in seconds (default 10)")
+    parser.add_argument('--flap-every', type=int, default=0, help="Toggle radio status every N packets (default off)")
+    parser.add_argument('--server', help="Use a running server instead of a loopback one: HOST:DISCOVERY_PORT:STREAM_PORT")
+    parser.add_argument('--json', help="Also write results to this JSON file")
+    args = parser.parse_args()
+    
+    total_rate = args.radios * args.rate
+    if args.server and total_rate > ServerSettings.source_rate_limit:
+        # All radios share this host's address, so they share one flood protection bucket
+        print(f"⚠ {total_rate:g} packets/s from one address exceeds the default Source_Rate_Limit "
+              f"({ServerSettings.source_rate_limit:g}/s per source): unless the server's limit is raised "
+              f"(or 0), the excess is dropped and throughput is understated")
+    
+    results = run_load_test(args.radios, args.rate, args.clients, args.duration,
+                            flap_every=args.flap_every, server_spec=args.server)
+    print_report(results)
+    
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,466 @@
+#!/usr/bin/env python3
+"""
+FlexRadio Discovery Proxy - Logging Pipeline Module
+Provides asynchronous (queue-based) logging and a structured change journal
+for both server and client.
+
+Log records are handed to a queue on the packet thread and formatted/written
+by a background listener thread, so disk I/O never stalls packet forwarding.
+
+Copyright (c) 2026 Chris L White (WX7V)
+
+Licensed under the MIT License - see LICENSE file for details
+"""
+
+import atexit
+import collections
+import datetime
+import glob
+import gzip
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import shutil
+import sys
+import threading
+import time
+from typing import Optional, List, Dict, Iterator, Tuple, Union
+
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+# Printable ASCII maps to itself, everything else to '.'
+_ASCII_TABLE = bytes(b if 32 <= b < 127 else 0x2e for b in range(256))
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def format_hex_dump(data: bytes, width: int = 16) -> str:
+    """Format bytes as a hex dump (offset, hex bytes, ASCII) one line per `width` bytes"""
+    data = bytes(data)
+    hex_width = width * 3 - 1
+    lines = []
+    for i in range(0, len(data), width):
+        chunk = data[i:i + width]
+        lines.append(f"{i:04x}  {chunk.hex(' '):<{hex_width}}  {chunk.translate(_ASCII_TABLE).decode('ascii')}")
+    return '\n'.join(lines)
+
+
+class HexDump:
+    """Hex dump that is only formatted when the log record is written
+    
+    Pass as a logging argument (``logging.info("%s", HexDump(data))``) so the
+    formatting cost is paid on the listener thread, not the packet thread.
+    """
+    __slots__ = ('data',)
+    
+    def __init__(self, data: bytes):
+        self.data = bytes(data)
+    
+    def __str__(self):
+        return format_hex_dump(self.data)
+
+
+class FieldTable:
+    """Discovery fields rendered as aligned ``key = value`` lines when the record is written"""
+    __slots__ = ('fields',)
+    
+    def __init__(self, fields: Dict[str, str]):
+        self.fields = dict(fields)
+    
+    def __str__(self):
+        return '\n'.join(f"  {key:30} = {value}" for key, value in sorted(self.fields.items()))
+
+
+def diff_fields(old: Dict[str, str], new: Dict[str, str]) -> List[Tuple[str, Optional[str], Optional[str]]]:
+    """Compare two parsed discovery payloads
+    
+    Returns:
+        List of (key, old_value, new_value); old_value is None for new fields
+        and new_value is None for removed fields
+    """
+    changed = []
+    for key, value in new.items():
+        if key not in old:
+            changed.append((key, None, value))
+        elif old[key] != value:
+            changed.append((key, old[key], value))
+    for key, value in old.items():
+        if key not in new:
+            changed.append((key, value, None))
+    return changed
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that leaves message formatting to the listener thread
+    
+    The stock QueueHandler formats every record on the calling thread so it
+    can be pickled. Our queue never leaves the process, so the record (and its
+    arguments) can be enqueued untouched.
+    """
+    
+    def prepare(self, record):
+        return record
+
+
+def archive_name(log_file: str, when: float) -> str:
+    """Archived log file name for a timestamp: discovery-server_YYYYMMDD_HHMMSS.log"""
+    base_name, ext = os.path.splitext(log_file)
+    timestamp = datetime.datetime.fromtimestamp(when).strftime("%Y%m%d_%H%M%S")
+    return f"{base_name}_{timestamp}{ext}"
+
+
+class ArchiveIndex:
+    """Oldest-first index of archived log files used to enforce Max_Log_Files
+    
+    The log directory is scanned once when the index is created; after that,
+    archives are tracked as they are created so pruning never rescans or stats
+    the directory. Archive names embed a sortable timestamp, so name order is
+    age order.
+    """
+    
+    def __init__(self, log_file: str, max_archives: int):
+        self.max_archives = max_archives
+        self._lock = threading.Lock()
+        
+        base_name, ext = os.path.splitext(log_file)
+        pattern = f"{glob.escape(base_name)}_*{ext}"
+        existing = glob.glob(pattern) + glob.glob(pattern + '.gz')
+        self._archives = collections.deque(sorted(existing))
+    
+    def __len__(self):
+        return len(self._archives)
+    
+    def add(self, path: str):
+        """Record a new (newest) archive and prune the oldest beyond the limit"""
+        with self._lock:
+            self._archives.append(path)
+        self.prune()
+    
+    def prune(self):
+        """Delete the oldest archives beyond max_archives (0 = keep all)"""
+        if self.max_archives <= 0:
+            return
+        with self._lock:
+            expired = []
+            while len(self._archives) > self.max_archives:
+                expired.append(self._archives.popleft())
+        for old_log in expired:
+            try:
+                os.remove(old_log)
+                logging.debug(f"Deleted old log file: {old_log}")
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                print(f"Warning: Could not delete old log file {old_log}: {e}")
+
+
+class RotatingLogHandler(logging.FileHandler):
+    """File handler that rotates the log at runtime by size and/or age
+    
+    Archives use the startup rotation naming (discovery-server_YYYYMMDD_HHMMSS.log)
+    and can be gzip-compressed on a background thread. Rotation runs inside
+    emit(), which under start_async_logging() is the listener thread.
+    """
+    
+    def __init__(self, filename: str, archive_index: ArchiveIndex, max_bytes: int = 0,
+                 max_age: float = 0.0, compress: bool = False):
+        """
+        Args:
+            filename: Active log file
+            archive_index: Index that tracks archives and prunes old ones
+            max_bytes: Rotate when the file reaches this size (0 = no size limit)
+            max_age: Rotate when the file has been open this many seconds (0 = no age limit)
+            compress: gzip archives in the background
+        """
+        super().__init__(filename)
+        self.archive_index = archive_index
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.compress = compress
+        self.rotations = 0
+        self._opened_at = time.monotonic()
+        self._last_archive = None
+        self._same_second_count = 0
+        self._compress_queue = None
+        if compress:
+            self._compress_queue = queue.SimpleQueue()
+            threading.Thread(target=self._compress_worker, name='log-compress', daemon=True).start()
+    
+    def should_rotate(self) -> bool:
+        """Check the size and age thresholds for the active file"""
+        if self.stream is None:
+            return False
+        if self.max_bytes > 0 and self.stream.tell() >= self.max_bytes:
+            return True
+        if self.max_age > 0 and time.monotonic() - self._opened_at >= self.max_age:
+            return True
+        return False
+    
+    def rotate(self):
+        """Archive the active log file and start a new one"""
+        if self.stream:
+            self.stream.close()
+            self.stream = None
+        
+        archived = archive_name(self.baseFilename, time.time())
+        if archived == self._last_archive:
+            # More than one rotation in the same second
+            self._same_second_count += 1
+        else:
+            self._last_archive = archived
+            self._same_second_count = 0
+        if self._same_second_count:
+            base_name, ext = os.path.splitext(archived)
+            archived = f"{base_name}_{self._same_second_count}{ext}"
+        
+        try:
+            os.replace(self.baseFilename, archived)
+        except FileNotFoundError:
+            archived = None
+        
+        self.stream = self._open()
+        self._opened_at = time.monotonic()
+        self.rotations += 1
+        
+        if archived:
+            if self._compress_queue is not None:
+                self._compress_queue.put(archived)
+            else:
+                self.archive_index.add(archived)
+    
+    def emit(self, record):
+        try:
+            if self.should_rotate():
+                self.rotate()
+        except Exception:
+            self.handleError(record)
+        super().emit(record)
+    
+    def _compress_worker(self):
+        while True:
+            path = self._compress_queue.get()
+            try:
+                with open(path, 'rb') as src, gzip.open(path + '.gz', 'wb') as dst:
+                    shutil.copyfileobj(src, dst)
+                os.remove(path)
+                self.archive_index.add(path + '.gz')
+            except Exception as e:
+                # Keep the uncompressed archive rather than losing it
+                print(f"Warning: Could not compress log archive {path}: {e}")
+                self.archive_index.add(path)
+
+
+def start_async_logging(target: Union[str, logging.Handler], level: int = logging.INFO) -> logging.handlers.QueueListener:
+    """Route the root logger through a queue to a background file writer
+    
+    Args:
+        target: Path of the log file to append to, or a ready-made handler
+                (e.g. RotatingLogHandler)
+        level: Root logger level
+    
+    Returns:
+        The running QueueListener (also stopped automatically at exit)
+    """
+    global _listener
+    stop_async_logging()
+    
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+        handler.close()
+    
+    file_handler = logging.FileHandler(target) if isinstance(target, str) else target
+    file_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    
+    log_queue = queue.SimpleQueue()
+    root.addHandler(DeferredQueueHandler(log_queue))
+    root.setLevel(level)
+    
+    _listener = logging.handlers.QueueListener(log_queue, file_handler, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+
+def stop_async_logging():
+    """Flush queued records and stop the background writer (safe to call twice)"""
+    global _listener
+    if _listener is not None:
+        listener, _listener = _listener, None
+        listener.stop()
+        for handler in listener.handlers:
+            handler.close()
+
+
+def log_file_handler() -> Optional[logging.Handler]:
+    """The handler the background writer logs to (None unless start_async_logging() is running)"""
+    return _listener.handlers[0] if _listener is not None else None
+
+
+def rotate_log_file(log_file: str, archive_index: Optional[ArchiveIndex] = None) -> bool:
+    """Rotate log file at startup by renaming with timestamp and clean up old logs
+    
+    Args:
+        log_file: Path to the log file to rotate
+        archive_index: ArchiveIndex that tracks archived logs and enforces Max_Log_Files
+    """
+    if os.path.exists(log_file):
+        # Get file modification time for timestamp
+        try:
+            archived_name = archive_name(log_file, os.path.getmtime(log_file))
+            
+            # Rename existing log
+            shutil.move(log_file, archived_name)
+            print(f"Rotated log file: {log_file} → {archived_name}")
+            
+            # Clean up old log files beyond Max_Log_Files
+            if archive_index is not None:
+                archive_index.add(archived_name)
+            
+            return True
+        except Exception as e:
+            print(f"Warning: Could not rotate log file: {e}")
+            return False
+    return False
+
+
+def start_file_logging(log_file: str, diagnostics) -> logging.handlers.QueueListener:
+    """Rotate `log_file` and log to it from now on, as configured in [DIAGNOSTICS]
+    
+    Records are written by a background thread, which also rotates the log at
+    runtime when it exceeds the size/age limits.
+    
+    Args:
+        log_file: Log file of the server or client
+        diagnostics: DiagnosticsSettings (log limits, compression, debug logging)
+    """
+    archive_index = ArchiveIndex(log_file, diagnostics.max_log_files)
+    rotate_log_file(log_file, archive_index)
+    
+    log_handler = RotatingLogHandler(
+        log_file,
+        archive_index,
+        max_bytes=diagnostics.max_log_bytes,
+        max_age=diagnostics.max_log_age,
+        compress=diagnostics.compress_log_archives
+    )
+    listener = start_async_logging(log_handler, level=logging.INFO)
+    
+    # Configure debug logging if enabled
+    if diagnostics.debug_logging:
+        logging.getLogger().setLevel(logging.DEBUG)
+        print(f"DEBUG: Debug logging enabled (check {log_file} for details)")
+    return listener
+
+
+atexit.register(stop_async_logging)
+
+
+class ChangeJournal:
+    """Append-only JSON Lines journal of discovery changes
+    
+    Each entry is one compact JSON object per line, e.g.::
+        
+        {"ts":1769600000.1,"event":"changed","serial":"1234-...","changes":{"status":["Available","In_Use"]}}
+    
+    Entries are queued by the caller and written by a background thread.
+    """
+    
+    _STOP = object()
+    
+    def __init__(self, path: str):
+        self.path = path
+        self.entries_written = 0
+        self._queue = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._writer, name='change-journal', daemon=True)
+        self._thread.start()
+    
+    def record(self, event: str, radio_info: Dict[str, str], changes=None, **extra):
+        """Queue a journal entry
+        
+        Args:
+            event: Event type ('initial', 'changed', ...)
+            radio_info: Radio summary dict (model, serial, nickname, ...)
+            changes: Optional list of (key, old, new) tuples from diff_fields()
+            **extra: Additional JSON-serializable fields (source, packet_size, ...)
+        """
+        entry = {'ts': time.time(), 'event': event, 'serial': radio_info.get('serial', 'Unknown'), 'radio': radio_info}
+        if changes:
+            entry['changes'] = {key: [old, new] for key, old, new in changes}
+        entry.update(extra)
+        self._queue.put(entry)
+    
+    def close(self, timeout: float = 2.0):
+        """Write any queued entries and stop the writer thread"""
+        if self._thread.is_alive():
+            self._queue.put(self._STOP)
+            self._thread.join(timeout)
+    
+    def _writer(self):
+        try:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                while True:
+                    entry = self._queue.get()
+                    # Drain everything already queued before a single flush
+                    while entry is not self._STOP:
+                        f.write(json.dumps(entry, separators=(',', ':')) + '\n')
+                        self.entries_written += 1
+                        try:
+                            entry = self._queue.get_nowait()
+                        except queue.Empty:
+                            break
+                    f.flush()
+                    if entry is self._STOP:
+                        return
+        except Exception as e:
+            logging.error(f"Change journal writer stopped: {e}")
+
+
+def read_journal(path: str, serial: Optional[str] = None, event: Optional[str] = None,
+                 since: Optional[float] = None, until: Optional[float] = None) -> Iterator[dict]:
+    """Iterate journal entries matching the given filters (malformed lines are skipped)"""
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            if serial is not None and entry.get('serial') != serial:
+                continue
+            if event is not None and entry.get('event') != event:
+                continue
+            ts = entry.get('ts', 0)
+            if since is not None and ts < since:
+                continue
+            if until is not None and ts > until:
+                continue
+            yield entry
+
+
+def main():
+    """Query a change journal from the command line"""
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Query a discovery change journal")
+    parser.add_argument('journal', help="Journal file (e.g. discovery-server-journal.jsonl)")
+    parser.add_argument('--serial', help="Only entries for this radio serial")
+    parser.add_argument('--event', help="Only entries of this type (initial, changed, ...)")
+    parser.add_argument('--since-minutes', type=float, help="Only entries from the last N minutes")
+    args = parser.parse_args()
+    
+    since = time.time() - args.since_minutes * 60 if args.since_minutes else None
+    count = 0
+    for entry in read_journal(args.journal, serial=args.serial, event=args.event, since=since):
+        count += 1
+        when = datetime.datetime.fromtimestamp(entry.get('ts', 0)).strftime("%Y-%m-%d %H:%M:%S")
+        radio = entry.get('radio', {})
+        print(f"{when}  {entry.get('event', '?'):8} {radio.get('model', 'Unknown')} ({radio.get('nickname', 'Unknown')}) {entry.get('serial')}")
+        for key, (old, new) in sorted(entry.get('changes', {}).items()):
+            print(f"    {key:30} '{old}' → '{new}'")
+    print(f"\n{count} matching entries")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
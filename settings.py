@@ -0,0 +1,383 @@
+#!/usr/bin/env python3
+"""
+FlexRadio Discovery Proxy - Settings Module
+Typed, validated settings read once from config.ini.
+
+ServerSettings and ClientSettings are built from the ConfigParser at startup
+(and again for each config reload) and handed to every component, so nothing
+parses strings while packets are flowing. Every value is type and range
+checked as it is read: a bad value raises SettingsError naming the section,
+key and problem, before any socket is opened. Sections a role doesn't use
+(e.g. [CLIENT] on a server) are not read.
+
+Copyright (c) 2026 Chris L White (WX7V)
+
+Licensed under the MIT License - see LICENSE file for details
+"""
+
+import configparser
+import ipaddress
+import math
+import sys
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from log_pipeline import start_file_logging
+from stream_protocol import parse_filter_spec
+
+
+class SettingsError(ValueError):
+    """A config.ini value that is malformed, out of range or missing"""
+
+
+class _Section:
+    """Typed, range-checked reads from one config section"""
+    
+    def __init__(self, config: configparser.ConfigParser, section: str):
+        self.config = config
+        self.section = section
+    
+    def error(self, key: str, problem: str) -> SettingsError:
+        value = self.config.get(self.section, key, fallback=None)
+        if value is None:
+            return SettingsError(f"[{self.section}] {key}: {problem}")
+        return SettingsError(f"[{self.section}] {key} = {value!r}: {problem}")
+    
+    def string(self, key: str, default: Optional[str] = '') -> str:
+        """Stripped value; default None makes the key required"""
+        value = self.config.get(self.section, key, fallback=None)
+        value = value.strip() if value is not None else None
+        if not value and default is None:
+            raise self.error(key, "required")
+        return value if value is not None else default
+    
+    def boolean(self, key: str, default: bool) -> bool:
+        value = self.string(key, '').lower()
+        if not value:
+            return default
+        if value not in configparser.ConfigParser.BOOLEAN_STATES:
+            raise self.error(key, "expected true or false")
+        return configparser.ConfigParser.BOOLEAN_STATES[value]
+    
+    def integer(self, key: str, default: Optional[int], minimum: Optional[int] = None,
+                maximum: Optional[int] = None) -> int:
+        value = self.string(key, None if default is None else '')
+        try:
+            number = int(value) if value else default
+        except ValueError:
+            raise self.error(key, "expected a whole number") from None
+        return self.check_range(key, number, minimum, maximum)
+    
+    def number(self, key: str, default: float, minimum: Optional[float] = None,
+               maximum: Optional[float] = None) -> float:
+        value = self.string(key, '')
+        try:
+            number = float(value) if value else default
+        except ValueError:
+            raise self.error(key, "expected a number") from None
+        if not math.isfinite(number):
+            raise self.error(key, "expected a finite number")
+        return self.check_range(key, number, minimum, maximum)
+    
+    def port(self, key: str, default: Optional[int], allow_zero: bool = False) -> int:
+        """Port number (0 = any free port, where `allow_zero`)"""
+        return self.integer(key, default, 0 if allow_zero else 1, 65535)
+    
+    def address(self, key: str, default: str, multicast: bool = False) -> str:
+        """IPv4 address ('' where the default is '')"""
+        value = self.string(key, default)
+        if not value:
+            return value
+        try:
+            parsed = ipaddress.IPv4Address(value)
+        except ValueError:
+            raise self.error(key, "expected an IPv4 address") from None
+        if multicast and not parsed.is_multicast:
+            raise self.error(key, "expected a multicast address (224.0.0.0 - 239.255.255.255)")
+        return value
+    
+    def networks(self, key: str) -> Tuple[str, ...]:
+        """Comma-separated addresses or CIDR networks, normalized (e.g. '192.168.1.0/24')"""
+        networks = []
+        for entry in self.string(key).split(','):
+            entry = entry.strip()
+            if not entry:
+                continue
+            try:
+                networks.append(str(ipaddress.ip_network(entry, strict=False)))
+            except ValueError:
+                raise self.error(key, f"'{entry}' is not an address or network (e.g. 192.168.1.0/24)") from None
+        return tuple(networks)
+    
+    def check_range(self, key: str, number, minimum, maximum):
+        if minimum is not None and number < minimum:
+            raise self.error(key, f"must be at least {minimum}")
+        if maximum is not None and number > maximum:
+            raise self.error(key, f"must be at most {maximum}")
+        return number
+
+
+@dataclass(frozen=True)
+class LinkSettings:
+    """Dead-peer detection for one side of a stream connection"""
+    keepalive_idle: float = 5.0
+    keepalive_interval: float = 2.0
+    keepalive_count: int = 3
+    heartbeat_interval: float = 2.0
+    heartbeat_timeout: float = 6.0
+    
+    @classmethod
+    def from_config(cls, config: configparser.ConfigParser, section: str) -> 'LinkSettings':
+        read = _Section(config, section)
+        heartbeat_interval = read.number('Heartbeat_Interval', 2.0, minimum=0.0)
+        heartbeat_timeout = read.number('Heartbeat_Timeout', 6.0, minimum=0.0)
+        if 0 < heartbeat_interval and heartbeat_timeout <= heartbeat_interval:
+            raise read.error('Heartbeat_Timeout', f"must be longer than Heartbeat_Interval ({heartbeat_interval:g})")
+        return cls(
+            keepalive_idle=read.number('Keepalive_Idle', 5.0, minimum=0.0),
+            keepalive_interval=read.number('Keepalive_Interval', 2.0, minimum=0.1),
+            keepalive_count=read.integer('Keepalive_Count', 3, minimum=1, maximum=127),
+            heartbeat_interval=heartbeat_interval,
+            heartbeat_timeout=heartbeat_timeout
+        )
+
+
+@dataclass(frozen=True)
+class StreamSettings:
+    """A stream listener: the server's Stream_Port or a client's relay (StreamHub)"""
+    listen_address: str
+    port: int
+    max_clients: int
+    link: LinkSettings
+    history_size: int = 256
+    compression: bool = True
+    udp: bool = False
+    multicast_group: str = ''
+    multicast_port: int = 5994
+    multicast_ttl: int = 1
+    multicast_interface: str = ''
+    
+    @classmethod
+    def from_config(cls, config: configparser.ConfigParser, section: str, listen_key: str, port_key: str,
+                    max_clients_key: str, multicast: bool = False, udp: bool = False) -> 'StreamSettings':
+        """Listener from a config section (keepalive, heartbeat, history and compression keys are shared)
+        
+        Multicast_* keys are read only if `multicast` is set, UDP_Transport only if `udp` is.
+        """
+        read = _Section(config, section)
+        settings = {}
+        if multicast:
+            settings = dict(
+                multicast_group=read.address('Multicast_Group', '', multicast=True),
+                multicast_port=read.port('Multicast_Port', 5994),
+                multicast_ttl=read.integer('Multicast_TTL', 1, minimum=0, maximum=255),
+                multicast_interface=read.address('Multicast_Interface', '')
+            )
+        return cls(
+            listen_address=read.address(listen_key, '0.0.0.0'),
+            port=read.port(port_key, None, allow_zero=True),
+            max_clients=read.integer(max_clients_key, 5, minimum=1),
+            link=LinkSettings.from_config(config, section),
+            history_size=read.integer('History_Size', 256, minimum=1),
+            compression=read.boolean('Compression', True),
+            udp=read.boolean('UDP_Transport', False) if udp else False,
+            **settings
+        )
+
+
+@dataclass(frozen=True)
+class AdminSettings:
+    """Local admin socket (Admin_* keys)"""
+    enabled: bool = False
+    address: str = '127.0.0.1'
+    port: int = 5995
+    
+    @classmethod
+    def from_config(cls, config: configparser.ConfigParser, section: str, default_port: int) -> 'AdminSettings':
+        read = _Section(config, section)
+        if not read.boolean('Admin_Enabled', False):
+            return cls(port=default_port)
+        return cls(True, read.string('Admin_Address', '127.0.0.1') or '127.0.0.1',
+                   read.port('Admin_Port', default_port, allow_zero=True))
+
+
+@dataclass(frozen=True)
+class DiagnosticsSettings:
+    """[DIAGNOSTICS]: health checks, console output and logging"""
+    enable_health_checks: bool = True
+    startup_tests: bool = True
+    fast_start: bool = False
+    periodic_check_interval: float = 60.0
+    ping_timeout: float = 5.0
+    display_interface_info: bool = True
+    test_server_ip: str = ''
+    test_radio_ip: str = ''
+    console_refresh_interval: float = 1.0
+    console_summary_interval: float = 10.0
+    quiet_console: bool = False
+    debug_logging: bool = False
+    max_log_files: int = 2
+    max_log_bytes: int = 10 * 1024 * 1024
+    max_log_age: float = 0.0  # Seconds
+    compress_log_archives: bool = False
+    change_journal: bool = True
+    
+    @classmethod
+    def from_config(cls, config: configparser.ConfigParser) -> 'DiagnosticsSettings':
+        read = _Section(config, 'DIAGNOSTICS')
+        return cls(
+            enable_health_checks=read.boolean('Enable_Health_Checks', True),
+            startup_tests=read.boolean('Startup_Tests', True),
+            fast_start=read.boolean('Fast_Start', False),
+            periodic_check_interval=read.number('Periodic_Check_Interval', 60.0, minimum=0.0),
+            ping_timeout=read.number('Ping_Timeout', 5.0, minimum=0.1, maximum=60.0),
+            display_interface_info=read.boolean('Display_Interface_Info', True),
+            test_server_ip=read.string('Test_Server_IP'),
+            test_radio_ip=read.string('Test_Radio_IP'),
+            console_refresh_interval=read.number('Console_Refresh_Interval', 1.0, minimum=0.01),
+            console_summary_interval=read.number('Console_Summary_Interval', 10.0, minimum=0.0),
+            quiet_console=read.boolean('Quiet_Console', False),
+            debug_logging=read.boolean('Debug_Logging', False),
+            max_log_files=read.integer('Max_Log_Files', 2, minimum=0),
+            max_log_bytes=int(read.number('Max_Log_Size_MB', 10.0, minimum=0.0) * 1024 * 1024),
+            max_log_age=read.number('Max_Log_Age_Hours', 0.0, minimum=0.0) * 3600,
+            compress_log_archives=read.boolean('Compress_Log_Archives', False),
+            change_journal=read.boolean('Change_Journal', True)
+        )
+
+
+@dataclass(frozen=True)
+class ServerSettings:
+    """Everything FRS-Discovery-Server reads from config.ini ([SERVER] and [DIAGNOSTICS])"""
+    discovery_port: int
+    stream: StreamSettings
+    admin: AdminSettings
+    diagnostics: DiagnosticsSettings
+    stale_interval_multiple: float = 3.0
+    stale_minimum_seconds: float = 2.0
+    stale_default_seconds: float = 30.0
+    capture_file: str = ''
+    handoff_socket: str = ''
+    source_rate_limit: float = 20.0
+    source_burst: int = 40
+    allowed_sources: Tuple[str, ...] = ()
+    echo_window_seconds: float = 5.0
+    
+    @property
+    def listen_address(self) -> str:
+        return self.stream.listen_address
+    
+    @classmethod
+    def from_config(cls, config: configparser.ConfigParser) -> 'ServerSettings':
+        """Raises SettingsError for the first invalid value"""
+        read = _Section(config, 'SERVER')
+        return cls(
+            discovery_port=read.port('Discovery_Port', 4992, allow_zero=True),
+            stream=StreamSettings.from_config(config, 'SERVER', 'Listen_Address', 'Stream_Port', 'Max_Clients',
+                                              multicast=True, udp=True),
+            admin=AdminSettings.from_config(config, 'SERVER', default_port=5995),
+            diagnostics=DiagnosticsSettings.from_config(config),
+            stale_interval_multiple=read.number('Stale_Interval_Multiple', 3.0, minimum=1.0),
+            stale_minimum_seconds=read.number('Stale_Minimum_Seconds', 2.0, minimum=0.0),
+            stale_default_seconds=read.number('Stale_Default_Seconds', 30.0, minimum=0.1),
+            capture_file=read.string('Capture_File'),
+            handoff_socket=read.string('Handoff_Socket'),
+            source_rate_limit=read.number('Source_Rate_Limit', 20.0, minimum=0.0),
+            source_burst=read.integer('Source_Burst', 40, minimum=1),
+            allowed_sources=read.networks('Allowed_Sources'),
+            echo_window_seconds=read.number('Echo_Window_Seconds', 5.0, minimum=0.0)
+        )
+
+
+@dataclass(frozen=True)
+class ClientSettings:
+    """Everything FRS-Discovery-Client reads from config.ini ([CLIENT] and [DIAGNOSTICS])"""
+    server_address: str
+    stream_port: int
+    link: LinkSettings
+    admin: AdminSettings
+    diagnostics: DiagnosticsSettings
+    relay: Optional[StreamSettings] = None  # None unless Relay_Enabled
+    broadcast_address: str = '255.255.255.255'
+    discovery_port: int = 4992
+    reconnect_interval: float = 5.0
+    transport: str = 'tcp'
+    compression: bool = True
+    subscribe: Optional[Dict[str, List[str]]] = None  # Subscription filters (None = every radio)
+    use_multicast: bool = True
+    multicast_interface: str = ''
+    cached_packet_file: str = 'last_discovery_packet.json'
+    use_cached_packet: bool = True
+    max_cache_age: int = 3600
+    cached_broadcast_interval: float = 3.0
+    
+    @classmethod
+    def from_config(cls, config: configparser.ConfigParser) -> 'ClientSettings':
+        """Raises SettingsError for the first invalid value"""
+        read = _Section(config, 'CLIENT')
+        transport = read.string('Transport', 'tcp').lower()
+        if transport not in ('tcp', 'udp'):
+            raise read.error('Transport', "expected tcp or udp")
+        try:
+            subscribe = parse_filter_spec(read.string('Subscribe')) or None
+        except ValueError as e:
+            raise read.error('Subscribe', str(e)) from None
+        relay = None
+        if read.boolean('Relay_Enabled', False):
+            relay = StreamSettings.from_config(config, 'CLIENT', 'Relay_Listen_Address', 'Relay_Port',
+                                               'Relay_Max_Clients')
+        return cls(
+            server_address=read.string('Server_Address', None),
+            stream_port=read.port('Stream_Port', None),
+            link=LinkSettings.from_config(config, 'CLIENT'),
+            admin=AdminSettings.from_config(config, 'CLIENT', default_port=5996),
+            diagnostics=DiagnosticsSettings.from_config(config),
+            relay=relay,
+            broadcast_address=read.address('Broadcast_Address', '255.255.255.255'),
+            discovery_port=read.port('Discovery_Port', 4992),
+            reconnect_interval=read.number('Reconnect_Interval', 5.0, minimum=0.1),
+            transport=transport,
+            compression=read.boolean('Compression', True),
+            subscribe=subscribe,
+            use_multicast=read.boolean('Use_Multicast', True),
+            multicast_interface=read.address('Multicast_Interface', ''),
+            cached_packet_file=read.string('Cached_Packet_File', 'last_discovery_packet.json') or 'last_discovery_packet.json',
+            use_cached_packet=read.boolean('Use_Cached_Packet', True),
+            max_cache_age=read.integer('Max_Cache_Age', 3600, minimum=0),
+            cached_broadcast_interval=read.number('Cached_Broadcast_Interval', 3.0, minimum=0.1)
+        )
+
+
+def read_config(path: str, settings_class) -> Tuple[configparser.ConfigParser, object]:
+    """Read a config file into (config, settings_class.from_config(config))
+    
+    Raises:
+        FileNotFoundError: If the file doesn't exist
+        configparser.Error: If it can't be parsed
+        SettingsError: For an invalid or missing value
+    """
+    config = configparser.ConfigParser()
+    if not config.read(path):
+        raise FileNotFoundError(path)
+    return config, settings_class.from_config(config)
+
+
+def load_config(path: str, settings_class, log_file: str) -> Tuple[configparser.ConfigParser, object]:
+    """Load and validate a program's configuration, then start its log file
+    
+    Returns:
+        (config, settings); exits with an error for an invalid value, before
+        anything is started
+    """
+    try:
+        config, settings = read_config(path, settings_class)
+    except FileNotFoundError:
+        print(f"ERROR: {path} not found!")
+        sys.exit(1)
+    except (configparser.Error, SettingsError) as e:
+        print(f"ERROR: Invalid {path}: {e}")
+        sys.exit(1)
+    
+    # Rotate the log and start logging (on a background thread)
+    start_file_logging(log_file, settings.diagnostics)
+    return config, settings
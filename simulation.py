@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+FlexRadio Discovery Proxy - Simulation Module
+Synthetic FlexRadio VITA-49 discovery traffic for load tests, benchmarks and
+integration tests.
+
+Copyright (c) 2026 Chris L White (WX7V)
+
+Licensed under the MIT License - see LICENSE file for details
+"""
+
+import configparser
+import importlib.util
+import os
+import socket
+import struct
+import sys
+import threading
+import time
+from typing import Optional, Dict, Tuple
+
+from stream_protocol import VITA_HEADER_SIZE
+
+# VITA-49 header as sent by FlexRadio discovery (VITA_HEADER_SIZE bytes):
+# header word, stream ID, class ID (OUI 0x001C2D, FlexRadio), integer and fractional timestamps
+VITA_HEADER = struct.Struct('>BBHIQIQ')
+FLEX_DISCOVERY_STREAM_ID = 0x00000800
+FLEX_DISCOVERY_CLASS_ID = 0x00001C2D534CFFFF
+
+RADIO_MODELS = ['FLEX-6400', 'FLEX-6600', 'FLEX-6700', 'FLEX-8400', 'FLEX-8600']
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def import_entry_script(filename: str, module_name: Optional[str] = None):
+    """Import one of the hyphenated entry scripts (e.g. FRS-Discovery-Server.py) as a module"""
+    path = os.path.join(SCRIPT_DIR, filename)
+    module_name = module_name or os.path.splitext(filename)[0].replace('-', '_').lower()
+    if module_name in sys.modules:
+        return sys.modules[module_name]
+    spec = importlib.util.spec_from_file_location(module_name, path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def loopback_config(max_clients: int = 5) -> configparser.ConfigParser:
+    """Server configuration for an in-process test server on 127.0.0.1 (ephemeral
+    ports; health checks, change journal, console status output and the source
+    rate limit disabled, as test radios broadcast far faster than real ones)"""
+    config = configparser.ConfigParser()
+    config['SERVER'] = {
+        'Listen_Address': '127.0.0.1',
+        'Discovery_Port': '0',
+        'Stream_Port': '0',
+        'Max_Clients': str(max_clients),
+        'Source_Rate_Limit': '0',
+    }
+    config['DIAGNOSTICS'] = {
+        'Enable_Health_Checks': 'false',
+        'Startup_Tests': 'false',
+        'Periodic_Check_Interval': '0',
+        'Ping_Timeout': '1.0',
+        'Display_Interface_Info': 'false',
+        'Change_Journal': 'false',
+        'Quiet_Console': 'true',
+    }
+    return config
+
+
+def radio_fields(index: int, status: str = 'Available') -> Dict[str, str]:
+    """Realistic discovery key/value fields for simulated radio number `index`"""
+    model = RADIO_MODELS[index % len(RADIO_MODELS)]
+    return {
+        'discovery_protocol_version': '3.1.0.2',
+        'model': model,
+        'serial': f"{1000 + index:04d}-5678-{model[-4:]}-{index:04d}",
+        'version': '4.1.5.39794',
+        'nickname': f"SimRadio{index}",
+        'callsign': f"N{index % 10}SIM",
+        'ip': f"10.0.{index // 250}.{index % 250 + 1}",
+        'port': '4992',
+        'status': status,
+        'inuse_ip': '0.0.0.0' if status == 'Available' else '10.8.0.2',
+        'inuse_host': '' if status == 'Available' else 'OPERATOR-PC',
+        'max_licensed_version': 'v4',
+        'radio_license_id': f"00-1C-2D-00-{index // 256:02X}-{index % 256:02X}",
+        'fpc_mac': '',
+        'wan_connected': '1',
+        'licensed_clients': '2',
+        'available_clients': '2' if status == 'Available' else '1',
+        'max_panadapters': '4',
+        'available_panadapters': '4',
+        'max_slices': '4',
+        'available_slices': '4',
+        'gui_client_ips': '',
+        'gui_client_hosts': '',
+        'gui_client_programs': '',
+        'gui_client_stations': '',
+        'gui_client_handles': '',
+        'min_software_version': '2.1.20.0',
+        'external_port_link': '1',
+        'license_is_unknown': '0',
+    }
+
+
+def build_discovery_packet(fields: Dict[str, str], packet_count: int = 0, timestamp: Optional[float] = None,
+                           fractional: int = 0) -> bytes:
+    """Build a FlexRadio VITA-49 discovery packet (header + null-padded key=value payload)"""
+    payload = ' '.join(f"{key}={value}" for key, value in fields.items()).encode('utf-8')
+    payload += b'\x00' * (4 - len(payload) % 4)
+    size_words = (VITA_HEADER_SIZE + len(payload)) // 4
+    header = VITA_HEADER.pack(
+        0x38,                           # Extension data packet with stream ID, class ID present
+        0x50 | (packet_count & 0x0F),   # TSI=UTC, TSF=sample count, 4-bit packet count
+        size_words,
+        FLEX_DISCOVERY_STREAM_ID,
+        FLEX_DISCOVERY_CLASS_ID,
+        int(timestamp if timestamp is not None else time.time()),
+        fractional
+    )
+    return header + payload
+
+
+def sample_packets(count: int = 8) -> list:
+    """Fixed corpus of discovery packets (radios alternating Available / In_Use)"""
+    return [build_discovery_packet(radio_fields(i, 'Available' if i % 2 == 0 else 'In_Use'),
+                                   packet_count=i, timestamp=1769600000 + i)
+            for i in range(count)]
+
+
+def packet_sequence(packet: bytes) -> int:
+    """Sequence number tagged by SyntheticRadioEmitter (VITA-49 fractional timestamp)"""
+    return struct.unpack_from('>Q', packet, 20)[0]
+
+
+class SyntheticRadioEmitter:
+    """Emits discovery packets for a number of simulated radios at a fixed rate
+    
+    With tag_sequence=True each packet's sequence number is carried in the
+    VITA-49 fractional timestamp field (payload unchanged, so the server sees
+    ordinary repeat packets) and its send time is recorded in `send_times`,
+    so receivers can measure end-to-end latency with packet_sequence().
+    """
+    
+    def __init__(self, target: Tuple[str, int], radios: int = 1, rate: float = 1.0,
+                 flap_every: int = 0, tag_sequence: bool = False):
+        """
+        Args:
+            target: (address, port) to send discovery packets to
+            radios: Number of simulated radios
+            rate: Packets per second per radio
+            flap_every: Toggle each radio's status every N packets (0 = never)
+            tag_sequence: Tag packets with a sequence number and record send times
+        """
+        self.target = target
+        self.radios = radios
+        self.rate = rate
+        self.flap_every = flap_every
+        self.tag_sequence = tag_sequence
+        
+        self.packets_sent = 0
+        self.send_times: Dict[int, float] = {}
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._stop = threading.Event()
+        self._thread = None
+        self._fields = [radio_fields(i) for i in range(radios)]
+        self._cached = [build_discovery_packet(fields) for fields in self._fields]
+    
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='radio-emitter', daemon=True)
+        self._thread.start()
+    
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(2.0)
+        self.sock.close()
+    
+    def next_packet(self, radio: int, count: int) -> bytes:
+        """Build the next packet for a radio (status flaps and sequence tags applied)"""
+        flap = self.flap_every and (count // self.flap_every) % 2 == 1
+        if not flap and not self.tag_sequence:
+            return self._cached[radio]
+        fields = radio_fields(radio, 'In_Use') if flap else self._fields[radio]
+        return build_discovery_packet(fields, packet_count=count, fractional=self.packets_sent)
+    
+    def _run(self):
+        interval = 1.0 / (self.rate * self.radios)
+        deadline = time.perf_counter()
+        count = 0
+        while not self._stop.is_set():
+            radio = count % self.radios
+            packet = self.next_packet(radio, count // self.radios)
+            if self.tag_sequence:
+                self.send_times[self.packets_sent] = time.perf_counter()
+            try:
+                self.sock.sendto(packet, self.target)
+                self.packets_sent += 1
+            except OSError:
+                pass
+            count += 1
+            deadline += interval
+            delay = deadline - time.perf_counter()
+            if delay > 0:
+                self._stop.wait(delay)
+            elif delay < -1.0:
+                deadline = time.perf_counter()  # Fell far behind; don't burst to catch up
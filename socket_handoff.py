@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+FlexRadio Discovery Proxy - Socket Handoff Module
+Zero-downtime upgrades: a running server passes its bound sockets, live
+client connections and stream state to a newer process over a Unix domain
+socket (SCM_RIGHTS), so clients never see a disconnect.
+
+Protocol on the handoff socket (Handoff_Socket):
+    new process  -> b'takeover <pid>\\n'
+    old process  -> 12-digit body length, sent with the file descriptors
+                    (SCM_RIGHTS), then the JSON state body
+    new process  -> b'ok\\n' once it has adopted everything
+
+The old process stops reading its sockets before it sends them; datagrams
+and stream data arriving meanwhile wait in the kernel buffers, so nothing
+is lost. If the new process doesn't confirm, the old one carries on.
+
+Linux/Unix only (socket.send_fds, Python 3.9+).
+
+Copyright (c) 2026 Chris L White (WX7V)
+
+Licensed under the MIT License - see LICENSE file for details
+"""
+
+import json
+import logging
+import os
+import socket
+import threading
+from typing import List, Optional, Tuple
+
+# Most descriptors passed in one handoff (listeners plus client connections)
+MAX_FDS = 250
+HEADER_SIZE = 12
+
+
+def handoff_supported() -> bool:
+    return hasattr(socket, 'AF_UNIX') and hasattr(socket, 'send_fds')
+
+
+def request_takeover(path: str, timeout: float = 10.0) -> Optional[Tuple[dict, List[socket.socket], socket.socket]]:
+    """Ask the process listening on `path` to hand over its sockets
+    
+    Returns:
+        (state, sockets, connection), or None if no process is listening.
+        Call confirm_takeover(connection) once the sockets are in use.
+    """
+    if not handoff_supported() or not os.path.exists(path):
+        return None
+    connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    connection.settimeout(timeout)
+    try:
+        connection.connect(path)
+    except OSError:
+        connection.close()
+        return None  # Stale socket file: nobody to take over from
+    
+    fds = []
+    try:
+        connection.sendall(f"takeover {os.getpid()}\n".encode('ascii'))
+        header, fds, _, _ = socket.recv_fds(connection, HEADER_SIZE, MAX_FDS)
+        while len(header) < HEADER_SIZE:
+            chunk = connection.recv(HEADER_SIZE - len(header))
+            if not chunk:
+                raise ConnectionError("handoff closed during the header")
+            header += chunk
+        length = int(header)
+        body = b''
+        while len(body) < length:
+            chunk = connection.recv(min(65536, length - len(body)))
+            if not chunk:
+                raise ConnectionError("handoff closed during the state")
+            body += chunk
+        state = json.loads(body)
+    except (OSError, ValueError) as e:
+        for fd in fds:
+            os.close(fd)
+        connection.close()
+        raise ConnectionError(f"Handoff failed: {e}") from e
+    return state, [socket.socket(fileno=fd) for fd in fds], connection
+
+
+def confirm_takeover(connection: socket.socket):
+    """Tell the old process that its sockets are in use here (it then exits)"""
+    try:
+        connection.sendall(b'ok\n')
+    finally:
+        connection.close()
+
+
+class HandoffServer:
+    """Listens for a newer process that wants to take over
+    
+    A request is only recorded here; the owner's packet loop calls
+    hand_off() when `pending` is set, so the sockets change hands between
+    two packets.
+    """
+    
+    def __init__(self, path: str, confirm_timeout: float = 10.0):
+        self.path = path
+        self.confirm_timeout = confirm_timeout
+        self.pending = None  # Connection of a process waiting to take over
+        self.handed_off = False
+        self.sock = None
+        self._thread = None
+    
+    def start(self):
+        """Listen on the handoff socket (replacing a stale socket file)"""
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.bind(self.path)
+        os.chmod(self.path, 0o600)  # Only this user may take the sockets over
+        self.sock.listen(1)
+        self._thread = threading.Thread(target=self.serve, name='handoff', daemon=True)
+        self._thread.start()
+    
+    def stop(self):
+        if self.sock is None:
+            return
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)  # Wake the accept thread
+        except OSError:
+            pass
+        self.sock.close()
+        self.sock = None
+        # After a handoff the path belongs to the successor
+        if not self.handed_off and os.path.exists(self.path):
+            try:
+                os.unlink(self.path)
+            except OSError:
+                pass
+    
+    def serve(self):
+        while self.sock is not None:
+            try:
+                connection, _ = self.sock.accept()
+            except OSError:
+                return  # Closed
+            try:
+                connection.settimeout(self.confirm_timeout)
+                request = connection.recv(64).decode('ascii', 'replace').split()
+            except OSError:
+                connection.close()
+                continue
+            if len(request) != 2 or request[0] != 'takeover' or self.pending is not None:
+                connection.close()
+                continue
+            logging.info(f"Takeover requested by process {request[1]}")
+            self.pending = connection
+    
+    def hand_off(self, state: dict, sockets: List[socket.socket]) -> bool:
+        """Send the sockets and state to the pending process and wait for it to confirm
+        
+        Returns:
+            True if the new process took over (this one should exit without
+            closing its connections), False to carry on serving
+        """
+        connection, self.pending = self.pending, None
+        if len(sockets) > MAX_FDS:
+            logging.error(f"Handoff refused: {len(sockets)} sockets (at most {MAX_FDS} can be passed)")
+            connection.close()
+            return False
+        body = json.dumps(state).encode('utf-8')
+        try:
+            socket.send_fds(connection, [f"{len(body):0{HEADER_SIZE}d}".encode('ascii')],
+                            [sock.fileno() for sock in sockets])
+            connection.sendall(body)
+            confirmed = connection.recv(16).startswith(b'ok')
+        except OSError as e:
+            logging.error(f"Handoff failed: {e}")
+            confirmed = False
+        finally:
+            connection.close()
+        self.handed_off = confirmed
+        return confirmed
@@ -0,0 +1,890 @@
+#!/usr/bin/env python3
+"""
+FlexRadio Discovery Proxy - Stream Hub Module
+TCP stream fan-out shared by the server and by clients running in relay mode.
+
+A StreamHub accepts stream clients, sends them sequenced frames (each frame
+is encoded once for all clients), exchanges heartbeats, drops dead clients
+and replays recent radio state changes to clients that resume after a
+reconnect.
+
+Multicast egress (optional): every frame is also sent once to a multicast
+group, which is offered to clients after their first heartbeat. A client
+that receives multicast frames says so ({"type": "multicast", "active":
+true}) and from then on gets only control messages over TCP; its heartbeats
+carry the latest sequence number so it can spot lost datagrams, fetch them
+with a resume request and fall back to TCP ("active": false).
+
+UDP transport (optional): clients on lossy links register by sending
+{"type": "register"} datagrams to the stream port and keep the registration
+alive with heartbeat datagrams. Each frame goes out as one datagram and is
+never retransmitted - the newest frame supersedes older ones, so a lost
+frame costs nothing and a late one is dropped by the client.
+
+Copyright (c) 2026 Chris L White (WX7V)
+
+Licensed under the MIT License - see LICENSE file for details
+"""
+
+import collections
+import logging
+import selectors
+import socket
+import threading
+import time
+import uuid
+import zlib
+from typing import Callable, Optional
+
+from settings import StreamSettings
+
+from stream_protocol import (LineFramer, RadioFilter, HEARTBEAT_FRAME, COMPRESSION_METHOD, PROTOCOL_VERSION,
+                             FRAME_ENCODING, frame_compressor, set_keepalive, encode_frame, encode_message, decode_frames)
+
+
+class ClientConnection:
+    """Represents a connected client"""
+    def __init__(self, sock, addr):
+        self.sock = sock
+        self.addr = addr
+        self.connected_at = time.time()
+        self.packets_sent = 0
+        self.first_seq = None  # Sequence number of the first live frame sent
+        self.multicast = False  # Receives frames from the multicast group instead of the stream
+        self.subscription = None  # RadioFilter, if the client only wants some radios
+        
+        # Compression context once negotiated, with its ratio and CPU cost
+        self.compressor = None
+        self.bytes_raw = 0
+        self.bytes_compressed = 0
+        self.frames_compressed = 0
+        self.compress_time = 0.0
+        
+        # Liveness (monotonic times); heartbeats are only expected once the client has sent one
+        # or announced them in its hello
+        self.active = True
+        self.disconnect_reason = None
+        self.sends_heartbeats = False
+        self.heartbeat_timeout = None  # Longer than the hub's for clients with a slower heartbeat
+        self.protocol = 0  # Stream protocol version from the client's hello (0 = none sent)
+        self.software = None
+        self.last_received = time.monotonic()
+        self.last_sent = self.last_received
+        self.framer = LineFramer()
+    
+    def send_packet(self, data):
+        """Send packet data to client"""
+        # Send packet as JSON with newline delimiter
+        return self.send_encoded(encode_frame(data))
+    
+    def send_encoded(self, bytes_data):
+        """Send an encoded packet frame to client"""
+        if not self.send_frame(bytes_data):
+            return False
+        self.packets_sent += 1
+        # logging.debug(f"Sent {len(bytes_data)} bytes to {self.addr} (packet #{self.packets_sent})")
+        return True
+    
+    def send_frame(self, frame):
+        """Send an already encoded frame to the client"""
+        try:
+            if self.compressor is not None:
+                frame = self.compress(frame)
+            self.sock.sendall(frame)
+            self.last_sent = time.monotonic()
+            return True
+        except Exception as e:
+            # logging.error(f"Error sending to client {self.addr}: {e}")
+            return False
+    
+    def compress(self, frame):
+        """Compress a frame into the connection's stream (flushed so the client can decode it now)"""
+        started = time.perf_counter()
+        data = self.compressor.compress(frame) + self.compressor.flush(zlib.Z_SYNC_FLUSH)
+        self.compress_time += time.perf_counter() - started
+        self.bytes_raw += len(frame)
+        self.bytes_compressed += len(data)
+        self.frames_compressed += 1
+        return data
+    
+    def receive(self):
+        """Read from the client socket (when readable)
+        
+        Returns:
+            List of decoded control messages, or None if the client disconnected
+        """
+        try:
+            data = self.sock.recv(4096)
+        except (BlockingIOError, InterruptedError, socket.timeout):
+            return []
+        except OSError:
+            return None
+        if not data:
+            return None
+        
+        self.last_received = time.monotonic()
+        return decode_frames(self.framer.feed(data))
+    
+    def close(self):
+        """Shut down and close the socket (also unblocks a pending send)"""
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        try:
+            self.sock.close()
+        except OSError:
+            pass
+
+
+class UdpClient:
+    """A client registered for frames by datagram"""
+    def __init__(self, addr):
+        self.addr = addr
+        self.connected_at = time.time()
+        self.packets_sent = 0
+        self.last_received = time.monotonic()
+        self.last_sent = 0.0
+        self.subscription = None
+
+
+class StreamHub:
+    """Accepts stream clients and fans frames out to them
+    
+    Frames are published from the owner's packet thread; a service thread
+    accepts connections, reads client messages (heartbeats, resume requests),
+    sends heartbeats to idle clients and removes dead ones.
+    """
+    
+    def __init__(self, listen_address: str, port: int, max_clients: int, console,
+                 keepalive_idle: float = 5.0, keepalive_interval: float = 2.0, keepalive_count: int = 3,
+                 heartbeat_interval: float = 2.0, heartbeat_timeout: float = 6.0, history_size: int = 256,
+                 multicast_group: str = '', multicast_port: int = 5994, multicast_ttl: int = 1,
+                 multicast_interface: str = '', udp: bool = False, compression: bool = True,
+                 label: str = "Client", on_message: Optional[Callable] = None, software: str = ''):
+        """
+        Args:
+            listen_address: Address to accept stream clients on
+            port: TCP port (0 = ephemeral, resolved by listen())
+            max_clients: Maximum simultaneous clients
+            console: ConsoleRenderer for connect/disconnect notices
+            keepalive_*: TCP keepalive timings for client sockets
+            heartbeat_interval, heartbeat_timeout: Application heartbeat timings (0 = disabled)
+            history_size: Radio state changes kept for resuming clients
+            multicast_group: Group frames are also sent to ('' = multicast egress disabled)
+            multicast_port, multicast_ttl: Destination port and TTL of multicast frames
+            multicast_interface: Local address to send multicast from ('' = system default)
+            udp: Also accept UDP transport clients on the stream port
+            compression: Compress the stream for clients that ask for it
+            label: Name used for clients in notices ("Client", "Relay client")
+            on_message: Callback(client, message) for message types the hub doesn't handle itself
+            software: Version advertised to clients in hello_ack
+        """
+        self.listen_address = listen_address
+        self.port = port
+        self.max_clients = max_clients
+        self.console = console
+        self.keepalive_idle = keepalive_idle
+        self.keepalive_interval = keepalive_interval
+        self.keepalive_count = keepalive_count
+        self.heartbeat_interval = heartbeat_interval
+        self.heartbeat_timeout = heartbeat_timeout
+        self.multicast_group = multicast_group
+        self.multicast_port = multicast_port
+        self.multicast_ttl = multicast_ttl
+        self.multicast_interface = multicast_interface
+        self.udp = udp
+        self.compression = compression
+        self.label = label
+        self.on_message = on_message
+        self.software = software
+        
+        self.running = False
+        self.sock = None
+        self.multicast_sock = None
+        self.udp_sock = None
+        self.clients = []
+        self.udp_clients = {}  # addr -> UdpClient
+        self.clients_lock = threading.Lock()
+        self._thread = None
+        
+        # Frame sequencing: per-run ID, sequence counter and a bounded history
+        # of radio state changes replayed to reconnecting clients
+        self.server_id = uuid.uuid4().hex[:12]
+        self.frame_seq = 0
+        self.history = collections.deque(maxlen=max(1, history_size))
+        self.history_evicted_seq = 0
+        self.resumes_served = 0
+        self.frames_replayed = 0
+        self.multicast_frames = 0
+        self.udp_frames_dropped = 0
+        
+        # Compression totals of disconnected clients: raw bytes, compressed bytes, frames, seconds
+        self.compression_totals = [0, 0, 0, 0.0]
+        
+        # UDP clients always need keepalives (they have no connection to lose)
+        self.udp_keepalive_interval = heartbeat_interval if heartbeat_interval > 0 else 2.0
+        self.udp_timeout = heartbeat_timeout if heartbeat_interval > 0 else 6.0
+    
+    @classmethod
+    def from_settings(cls, settings: StreamSettings, console, label: str = "Client",
+                      on_message: Optional[Callable] = None, software: str = ''):
+        """Create a hub from the server's stream settings or a client's relay settings"""
+        link = settings.link
+        return cls(
+            settings.listen_address,
+            settings.port,
+            settings.max_clients,
+            console,
+            keepalive_idle=link.keepalive_idle,
+            keepalive_interval=link.keepalive_interval,
+            keepalive_count=link.keepalive_count,
+            heartbeat_interval=link.heartbeat_interval,
+            heartbeat_timeout=link.heartbeat_timeout,
+            history_size=settings.history_size,
+            multicast_group=settings.multicast_group,
+            multicast_port=settings.multicast_port,
+            multicast_ttl=settings.multicast_ttl,
+            multicast_interface=settings.multicast_interface,
+            udp=settings.udp,
+            compression=settings.compression,
+            label=label,
+            on_message=on_message,
+            software=software
+        )
+    
+    def listen(self):
+        """Bind and listen on the stream port (resolves port 0)"""
+        self.sock, self.udp_sock = self.open_listeners(self.listen_address, self.port)
+        self.port = self.sock.getsockname()[1]  # Resolve port 0 (ephemeral)
+        self.open_multicast_sender()
+    
+    def open_multicast_sender(self):
+        if self.multicast_group:
+            self.multicast_sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            self.multicast_sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, self.multicast_ttl)
+            self.multicast_sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_LOOP, 1)
+            if self.multicast_interface:
+                self.multicast_sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_IF,
+                                               socket.inet_aton(self.multicast_interface))
+    
+    def open_listeners(self, listen_address, port):
+        """Bound stream listener, plus the UDP transport socket if enabled"""
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        udp_sock = None
+        try:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            sock.bind((listen_address, port))
+            sock.listen(self.max_clients)
+            sock.settimeout(1.0)  # Non-blocking with timeout
+            
+            if self.udp:
+                # Same port number as the stream; non-blocking so a full buffer drops a frame instead of stalling
+                udp_sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+                udp_sock.bind((listen_address, sock.getsockname()[1]))
+                udp_sock.setblocking(False)
+        except OSError:
+            sock.close()
+            if udp_sock is not None:
+                udp_sock.close()
+            raise
+        return sock, udp_sock
+    
+    def rebind(self, listen_address, port):
+        """Move the listener(s) to a new address or port; connected clients stay connected
+        
+        The new sockets are bound before the old ones are given up, so a bind
+        failure (OSError) leaves the hub listening where it was. The service
+        thread closes the old sockets on its next pass.
+        """
+        sock, udp_sock = self.open_listeners(listen_address, port)
+        self.listen_address = listen_address
+        self.port = sock.getsockname()[1]
+        self.sock, self.udp_sock = sock, udp_sock
+        logging.info(f"{self.label} listener moved to {listen_address}:{self.port}")
+    
+    def resize_history(self, history_size):
+        """Keep a different number of radio state changes for resuming clients"""
+        with self.clients_lock:
+            history = collections.deque(self.history, maxlen=max(1, history_size))
+            if len(history) < len(self.history):
+                self.history_evicted_seq = self.history[len(self.history) - len(history) - 1][0]
+            self.history = history
+    
+    def start(self):
+        """Start accepting and servicing clients (listens first if needed)"""
+        if self.sock is None:
+            self.listen()
+        self.running = True
+        self._thread = threading.Thread(target=self.serve, name='stream-hub', daemon=True)
+        self._thread.start()
+    
+    def detach(self):
+        """Stop servicing sockets without closing them (before a handoff); start() resumes"""
+        self.running = False
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+    
+    def export_state(self):
+        """Stream state and sockets for a process taking over (after detach())
+        
+        Compressed streams are ended (Z_FINISH) and restarted, so the new process
+        can continue with a fresh compressor; clients follow without renegotiating.
+        
+        Returns:
+            (state, sockets): JSON-serializable state and the sockets it refers to by index
+        """
+        sockets = [self.sock] + ([self.udp_sock] if self.udp_sock is not None else [])
+        with self.clients_lock:
+            clients = []
+            for client in self.clients:
+                if not client.active:
+                    continue
+                if client.compressor is not None:
+                    try:
+                        client.sock.sendall(client.compressor.flush(zlib.Z_FINISH))
+                    except OSError:
+                        continue
+                    client.compressor = frame_compressor()
+                clients.append({
+                    'fd': len(sockets), 'addr': list(client.addr), 'connected_at': client.connected_at,
+                    'packets_sent': client.packets_sent, 'first_seq': client.first_seq, 'multicast': client.multicast,
+                    'filters': client.subscription.filters if client.subscription else None,
+                    'compressed': client.compressor is not None, 'bytes_raw': client.bytes_raw,
+                    'bytes_compressed': client.bytes_compressed, 'frames_compressed': client.frames_compressed,
+                    'sends_heartbeats': client.sends_heartbeats, 'heartbeat_timeout': client.heartbeat_timeout,
+                    'protocol': client.protocol, 'software': client.software,
+                    'last_received': client.last_received, 'last_sent': client.last_sent,
+                    'pending': client.framer.take_pending().hex()
+                })
+                sockets.append(client.sock)
+            udp_clients = [{'addr': list(client.addr), 'connected_at': client.connected_at,
+                            'packets_sent': client.packets_sent, 'last_received': client.last_received,
+                            'filters': client.subscription.filters if client.subscription else None}
+                           for client in self.udp_clients.values()]
+            state = {
+                'server_id': self.server_id, 'frame_seq': self.frame_seq, 'udp': self.udp_sock is not None,
+                'history': [[seq, frame.decode('utf-8'), radio_info] for seq, frame, radio_info in self.history],
+                'history_evicted_seq': self.history_evicted_seq, 'resumes_served': self.resumes_served,
+                'frames_replayed': self.frames_replayed, 'multicast_frames': self.multicast_frames,
+                'compression_totals': self.compression_totals, 'clients': clients, 'udp_clients': udp_clients
+            }
+        return state, sockets
+    
+    def adopt(self, state, sockets):
+        """Continue the stream of another process from its handed-off state (instead of listen())"""
+        self.sock = sockets[0]
+        self.sock.settimeout(1.0)
+        self.listen_address, self.port = self.sock.getsockname()[:2]
+        self.udp = state['udp']
+        if self.udp:
+            self.udp_sock = sockets[1]
+            self.udp_sock.setblocking(False)
+        self.open_multicast_sender()
+        
+        self.server_id = state['server_id']
+        self.frame_seq = state['frame_seq']
+        self.history.extend((seq, frame.encode('utf-8'), radio_info) for seq, frame, radio_info in state['history'])
+        self.history_evicted_seq = state['history_evicted_seq']
+        self.resumes_served = state['resumes_served']
+        self.frames_replayed = state['frames_replayed']
+        self.multicast_frames = state['multicast_frames']
+        self.compression_totals = state['compression_totals']
+        
+        for info in state['clients']:
+            client = ClientConnection(sockets[info['fd']], tuple(info['addr']))
+            client.sock.setblocking(True)
+            for name in ('connected_at', 'packets_sent', 'first_seq', 'multicast', 'bytes_raw', 'bytes_compressed',
+                         'frames_compressed', 'sends_heartbeats', 'heartbeat_timeout', 'protocol', 'software',
+                         'last_received', 'last_sent'):
+                setattr(client, name, info[name])
+            client.subscription = RadioFilter.from_message(info['filters'])
+            if info['compressed']:
+                client.compressor = frame_compressor()
+            client.framer.feed(bytes.fromhex(info['pending']))
+            self.clients.append(client)
+        for info in state['udp_clients']:
+            client = UdpClient(tuple(info['addr']))
+            client.connected_at = info['connected_at']
+            client.packets_sent = info['packets_sent']
+            client.last_received = info['last_received']
+            client.subscription = RadioFilter.from_message(info['filters'])
+            self.udp_clients[client.addr] = client
+    
+    def release(self):
+        """Close this process's copies of the sockets after a handoff (connections stay up)"""
+        with self.clients_lock:
+            for client in self.clients:
+                client.sock.close()
+            self.clients.clear()
+            self.udp_clients.clear()
+        for sock in (self.sock, self.udp_sock, self.multicast_sock):
+            if sock is not None:
+                sock.close()
+    
+    def stop(self):
+        """Close all client connections and the listening socket"""
+        self.running = False
+        
+        with self.clients_lock:
+            for client in self.clients:
+                client.close()
+                self.add_compression_totals(client)
+            self.clients.clear()
+            self.udp_clients.clear()
+        
+        if self.sock:
+            try:
+                # Wake the service thread so the listening port is released immediately
+                self.sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            self.sock.close()
+        
+        if self.multicast_sock:
+            self.multicast_sock.close()
+        
+        if self.udp_sock:
+            self.udp_sock.close()
+    
+    @property
+    def client_count(self):
+        with self.clients_lock:
+            return len(self.clients) + len(self.udp_clients)
+    
+    def client_list(self):
+        """Connected clients, for the admin socket"""
+        now = time.time()
+        with self.clients_lock:
+            clients = [{'addr': f"{client.addr[0]}:{client.addr[1]}", 'transport': 'multicast' if client.multicast else 'tcp',
+                        'connected_seconds': round(now - client.connected_at), 'packets_sent': client.packets_sent,
+                        'software': client.software, 'protocol': client.protocol,
+                        'compressed': client.compressor is not None,
+                        'subscription': str(client.subscription) if client.subscription else None}
+                       for client in self.clients if client.active]
+            clients += [{'addr': f"{client.addr[0]}:{client.addr[1]}", 'transport': 'udp',
+                         'connected_seconds': round(now - client.connected_at), 'packets_sent': client.packets_sent,
+                         'subscription': str(client.subscription) if client.subscription else None}
+                        for client in self.udp_clients.values()]
+        return clients
+    
+    def kick(self, addr):
+        """Disconnect the client at "host:port"; returns False if there is none"""
+        with self.clients_lock:
+            for client in self.clients:
+                if client.active and f"{client.addr[0]}:{client.addr[1]}" == addr:
+                    client.active = False
+                    client.disconnect_reason = "kicked by admin"
+                    try:
+                        client.sock.shutdown(socket.SHUT_RDWR)  # Takes effect now, not when TCP notices
+                    except OSError:
+                        pass
+                    return True
+            for key, client in list(self.udp_clients.items()):
+                if f"{key[0]}:{key[1]}" == addr:
+                    del self.udp_clients[key]
+                    self.console.notice(f"← {self.label} disconnected (UDP): {addr} ({client.packets_sent} packets sent, "
+                                        f"kicked by admin)")
+                    return True
+        return False
+    
+    def publish(self, data, is_change=False):
+        """Sequence, encode and send a frame to all clients that want it
+        
+        Args:
+            data: Frame dictionary ('seq' and 'server_id' are added)
+            is_change: Keep the frame in the resume history (radio state changes)
+        """
+        radio_info = data.get('radio_info')
+        with self.clients_lock:
+            self.frame_seq += 1
+            
+            # Subscriptions are re-evaluated only when the radio's state changes
+            recipients = [client for client in self.clients if not client.multicast
+                          and (client.subscription is None or client.subscription.wants(radio_info, is_change))]
+            udp_recipients = [client for client in self.udp_clients.values()
+                              if client.subscription is None or client.subscription.wants(radio_info, is_change)]
+            multicast = self.multicast_sock is not None and any(client.subscription is None for client in self.clients)
+            if not recipients and not udp_recipients and not multicast and not is_change:
+                return  # Nobody wants it: never encoded
+            seq = data['seq'] = self.frame_seq
+            data['server_id'] = self.server_id
+            
+            # Encode once for all clients
+            frame = encode_frame(data)
+            
+            if is_change:
+                if len(self.history) == self.history.maxlen:
+                    self.history_evicted_seq = self.history[0][0]
+                self.history.append((seq, frame, radio_info))
+            
+            # UDP clients: one datagram each, never retransmitted (a newer frame supersedes it)
+            if udp_recipients:
+                now = time.monotonic()
+                for client in udp_recipients:
+                    try:
+                        self.udp_sock.sendto(frame, client.addr)
+                        client.packets_sent += 1
+                        client.last_sent = now
+                    except OSError:
+                        self.udp_frames_dropped += 1
+            
+            # One datagram for every multicast client (subscribed clients stay on the stream)
+            if multicast:
+                try:
+                    self.multicast_sock.sendto(frame, (self.multicast_group, self.multicast_port))
+                    self.multicast_frames += 1
+                except OSError as e:
+                    logging.warning(f"Multicast send failed: {e}")
+            
+            failed_clients = []
+            for client in recipients:
+                if client.first_seq is None:
+                    client.first_seq = seq
+                success = client.send_encoded(frame)
+                # logging.debug(f"Send to {client.addr}: {'success' if success else 'FAILED'}")
+                if not success:
+                    failed_clients.append(client)
+            
+            # Remove failed clients
+            for client in failed_clients:
+                if client in self.clients:
+                    self.clients.remove(client)
+                    self.add_compression_totals(client)
+                    self.console.notice(f"← {self.label} send failed: {client.addr}")
+                    # logging.warning(f"Client removed: {client.addr}")
+                    client.close()
+    
+    def serve(self):
+        """Accept incoming client connections and service client sockets
+        
+        Reads heartbeats and disconnects from every client, sends heartbeats to
+        idle clients and removes dead ones, so their slots are freed quickly.
+        """
+        selector = selectors.DefaultSelector()
+        listeners = ()
+        registered = set()
+        try:
+            while self.running:
+                # Pick up the listeners again after a rebind (retiring the old ones)
+                if listeners != (self.sock, self.udp_sock):
+                    for sock in listeners:
+                        if sock is not None:
+                            selector.unregister(sock)
+                            sock.close()
+                    listeners = (self.sock, self.udp_sock)
+                    for sock in listeners:
+                        if sock is not None:
+                            selector.register(sock, selectors.EVENT_READ)
+                
+                # Track client sockets added and removed since the last pass
+                with self.clients_lock:
+                    current = set(self.clients)
+                for client in registered - current:
+                    selector.unregister(client.sock)
+                for client in current - registered:
+                    selector.register(client.sock, selectors.EVENT_READ, client)
+                registered = current
+                
+                tick = min(1.0, self.heartbeat_interval / 2) if self.heartbeat_interval > 0 else 1.0
+                try:
+                    events = selector.select(timeout=tick)
+                except (OSError, ValueError):
+                    if not self.running:
+                        break
+                    continue
+                
+                for key, _ in events:
+                    if key.fileobj is self.udp_sock:
+                        self.service_udp()
+                    elif key.data is None:
+                        self.accept_client()
+                    else:
+                        self.service_client(key.data)
+                
+                self.check_heartbeats()
+                self.remove_disconnected_clients()
+        except Exception as e:
+            if self.running:
+                self.console.notice(f"⚠ FATAL: Accept thread crashed: {e}")
+                # logging.error(f"Accept thread crashed: {e}")
+        finally:
+            selector.close()
+    
+    def accept_client(self):
+        """Accept one pending client connection"""
+        try:
+            client_sock, client_addr = self.sock.accept()
+            # logging.debug(f"Accepted connection from {client_addr}")
+        except (socket.timeout, BlockingIOError):
+            return
+        except OSError as e:
+            if self.running:
+                pass  # logging.error(f"Error accepting client: {e}")
+            return
+        
+        with self.clients_lock:
+            if len(self.clients) >= self.max_clients:
+                # logging.warning(f"Max clients reached, rejecting {client_addr}")
+                client_sock.close()
+                return
+            
+            try:
+                set_keepalive(client_sock, self.keepalive_idle, self.keepalive_interval, self.keepalive_count)
+            except OSError as e:
+                logging.warning(f"Could not enable TCP keepalive for {client_addr}: {e}")
+            
+            client = ClientConnection(client_sock, client_addr)
+            self.clients.append(client)
+            self.console.notice(f"→ {self.label} connected: {client_addr} (Total: {len(self.clients)})")
+            # logging.info(f"Client connected: {client_addr}")
+    
+    def service_udp(self):
+        """Handle pending datagrams from UDP clients (registrations, heartbeats)"""
+        while True:
+            try:
+                data, addr = self.udp_sock.recvfrom(4096)
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError:
+                continue  # e.g. ICMP port unreachable from a client that went away
+            for message in decode_frames([data]):
+                self.handle_udp_message(addr, message)
+    
+    def handle_udp_message(self, addr, message):
+        """Register, refresh or remove a UDP client"""
+        message_type = message.get('type')
+        with self.clients_lock:
+            client = self.udp_clients.get(addr)
+            if message_type == 'unregister':
+                if client:
+                    del self.udp_clients[addr]
+                    self.console.notice(f"← {self.label} disconnected (UDP): {addr} ({client.packets_sent} packets sent)")
+                return
+            if message_type not in ('register', 'heartbeat'):
+                return
+            
+            if client is None:
+                # Heartbeats from an unknown client re-register it (e.g. after a server restart)
+                if len(self.clients) + len(self.udp_clients) >= self.max_clients:
+                    return
+                client = self.udp_clients[addr] = UdpClient(addr)
+                self.console.notice(f"→ {self.label} connected (UDP): {addr} (Total: {len(self.clients) + len(self.udp_clients)})")
+            client.last_received = time.monotonic()
+            
+            if message_type == 'register':
+                client.subscription = RadioFilter.from_message(message.get('filters'))
+                self.send_udp(client, encode_message('registered', server_id=self.server_id, seq=self.frame_seq))
+    
+    def send_udp(self, client, frame):
+        try:
+            self.udp_sock.sendto(frame, client.addr)
+            client.last_sent = time.monotonic()
+        except OSError:
+            pass
+    
+    def service_client(self, client):
+        """Read and handle data sent by a client"""
+        messages = client.receive()
+        if messages is None:
+            client.active = False
+            return
+        for message in messages:
+            self.handle_client_message(client, message)
+    
+    def handle_client_message(self, client, message):
+        """Handle a control message received from a client"""
+        message_type = message.get('type')
+        if message_type == 'hello':
+            self.handle_hello(client, message)
+        elif message_type == 'heartbeat':
+            if not client.sends_heartbeats:
+                # First heartbeat: answer right away so the client knows we send them too
+                client.sends_heartbeats = True
+                with self.clients_lock:
+                    client.send_frame(HEARTBEAT_FRAME)
+                    if self.multicast_sock is not None:
+                        client.send_frame(encode_message('multicast', group=self.multicast_group,
+                                                         port=self.multicast_port, server_id=self.server_id))
+        elif message_type == 'resume':
+            self.resume_client(client, message.get('server_id'), message.get('seq'), message.get('until'))
+        elif message_type == 'multicast':
+            self.set_multicast(client, bool(message.get('active')))
+        elif message_type == 'compress':
+            self.start_compression(client, message.get('methods'))
+        elif message_type == 'subscribe':
+            self.subscribe(client, message.get('filters'))
+        elif self.on_message:
+            self.on_message(client, message)
+    
+    def handle_hello(self, client, hello):
+        """Answer a client's hello with the options this hub will use, then apply its requests"""
+        client.protocol = hello.get('protocol') if isinstance(hello.get('protocol'), int) else 0
+        client.software = hello.get('software')
+        interval = hello.get('heartbeat_interval')
+        methods = hello.get('compression')
+        compression = COMPRESSION_METHOD if self.compression and isinstance(methods, list) and COMPRESSION_METHOD in methods else None
+        subscription = RadioFilter.from_message(hello.get('subscribe'))
+        
+        with self.clients_lock:
+            client.subscription = subscription
+            if isinstance(interval, (int, float)) and interval > 0 and self.heartbeat_interval > 0:
+                client.sends_heartbeats = True
+                client.heartbeat_timeout = max(self.heartbeat_timeout, 3 * interval)
+            client.send_frame(encode_message('hello_ack', protocol=PROTOCOL_VERSION, software=self.software,
+                                             server_id=self.server_id, seq=self.frame_seq, encoding=FRAME_ENCODING,
+                                             compression=compression, heartbeat_interval=self.heartbeat_interval,
+                                             history=self.history.maxlen))
+            if compression and client.compressor is None:
+                # Same switch line as a separate compress request, so the client's framer needs no second path
+                client.send_frame(encode_message('compress', method=COMPRESSION_METHOD))
+                client.compressor = frame_compressor()
+            if self.multicast_sock is not None and subscription is None and client.sends_heartbeats:
+                client.send_frame(encode_message('multicast', group=self.multicast_group,
+                                                 port=self.multicast_port, server_id=self.server_id))
+        
+        logging.info(f"{self.label} {client.addr} hello: software {client.software}, protocol {client.protocol}, "
+                     f"compression {compression or 'off'}, {subscription or 'all radios'}")
+        resume = hello.get('resume')
+        if isinstance(resume, dict):
+            self.resume_client(client, resume.get('server_id'), resume.get('seq'))
+    
+    def subscribe(self, client, filters):
+        """Only send the client frames of radios matching its filters (none = every radio)"""
+        subscription = RadioFilter.from_message(filters)
+        with self.clients_lock:
+            client.subscription = subscription
+            if subscription is not None and client.multicast:
+                self.set_multicast_locked(client, False)
+        logging.info(f"{self.label} {client.addr} subscribed to {subscription or 'all radios'}")
+    
+    def start_compression(self, client, methods):
+        """Answer a compression request and compress everything sent afterwards"""
+        if not self.compression or not isinstance(methods, list) or COMPRESSION_METHOD not in methods:
+            return  # The client keeps reading an uncompressed stream
+        with self.clients_lock:
+            if client.compressor is None:
+                client.send_frame(encode_message('compress', method=COMPRESSION_METHOD))
+                client.compressor = frame_compressor()
+    
+    def compression_summary(self):
+        """Compression ratio and CPU cost per frame over all clients, or None if nothing was compressed"""
+        raw, compressed, frames, seconds = self.compression_totals
+        with self.clients_lock:
+            for client in self.clients:
+                raw += client.bytes_raw
+                compressed += client.bytes_compressed
+                frames += client.frames_compressed
+                seconds += client.compress_time
+        if not frames:
+            return None
+        return f"{raw / max(1, compressed):.1f}:1 ({raw} -> {compressed} bytes), {seconds / frames * 1e6:.1f} µs per frame"
+    
+    def set_multicast(self, client, active):
+        """Switch a client between multicast and stream delivery of frames"""
+        with self.clients_lock:
+            self.set_multicast_locked(client, active)
+    
+    def set_multicast_locked(self, client, active):
+        if active == client.multicast or (active and (self.multicast_sock is None or client.subscription is not None)):
+            return  # Multicast carries every radio, so subscribed clients stay on the stream
+        client.multicast = active
+        if not active:
+            client.first_seq = None  # Frames until the next one sent by TCP are missed
+        logging.info(f"{self.label} {client.addr} {'receives multicast' if active else 'fell back to TCP'}")
+    
+    def resume_client(self, client, server_id, resume_seq, until_seq=None):
+        """Replay the radio state changes a client missed
+        
+        Frames after `resume_seq` that were sent before the client's first live
+        frame (or before `until_seq`, for multicast datagrams lost mid-stream)
+        are missed; those still in the history that carry a state change are
+        resent, followed by a 'resumed' message with the counts.
+        """
+        with self.clients_lock:
+            if server_id != self.server_id or not isinstance(resume_seq, int):
+                # Different server run (or bad request): history doesn't apply
+                client.send_frame(encode_message('resumed', server_id=self.server_id, seq=self.frame_seq,
+                                                 missed=None, replayed=0, complete=False))
+                return
+            
+            if isinstance(until_seq, int):
+                end_seq = min(until_seq, self.frame_seq + 1)
+            elif client.first_seq is not None and not client.multicast:
+                end_seq = client.first_seq
+            else:
+                end_seq = self.frame_seq + 1
+            subscription = client.subscription
+            frames = [frame for seq, frame, radio_info in self.history if resume_seq < seq < end_seq
+                      and (subscription is None or subscription.match(radio_info))]
+            for frame in frames:
+                if not client.send_frame(frame):
+                    client.active = False
+                    return
+            
+            missed = max(0, end_seq - 1 - resume_seq)
+            complete = self.history_evicted_seq <= resume_seq
+            client.send_frame(encode_message('resumed', server_id=self.server_id, seq=end_seq - 1,
+                                             missed=missed, replayed=len(frames), complete=complete))
+            self.resumes_served += 1
+            self.frames_replayed += len(frames)
+        
+        logging.info(f"{self.label} {client.addr} resumed from seq {resume_seq}: {missed} frame(s) missed, "
+                     f"{len(frames)} change(s) replayed{'' if complete else ' (history incomplete)'}")
+    
+    def check_heartbeats(self):
+        """Send heartbeats to idle clients and flag clients whose heartbeats stopped"""
+        now = time.monotonic()
+        if self.udp_clients:
+            self.check_udp_clients(now)
+        if self.heartbeat_interval <= 0:
+            return
+        with self.clients_lock:
+            for client in self.clients:
+                if not client.active or not client.sends_heartbeats:
+                    continue
+                if now - client.last_received > (client.heartbeat_timeout or self.heartbeat_timeout):
+                    client.active = False
+                    client.disconnect_reason = f"no heartbeat for {now - client.last_received:.0f}s"
+                elif now - client.last_sent >= self.heartbeat_interval:
+                    # Multicast clients learn the latest sequence number, to spot lost datagrams
+                    frame = encode_message('heartbeat', seq=self.frame_seq) if client.multicast else HEARTBEAT_FRAME
+                    if not client.send_frame(frame):
+                        client.active = False
+    
+    def check_udp_clients(self, now):
+        """Expire UDP clients that stopped sending keepalives; send heartbeats to idle ones"""
+        with self.clients_lock:
+            for addr, client in list(self.udp_clients.items()):
+                if now - client.last_received > self.udp_timeout:
+                    del self.udp_clients[addr]
+                    self.console.notice(f"← {self.label} disconnected (UDP): {addr} ({client.packets_sent} packets sent, "
+                                        f"no heartbeat for {now - client.last_received:.0f}s)")
+                elif now - client.last_sent >= self.udp_keepalive_interval:
+                    self.send_udp(client, encode_message('heartbeat', seq=self.frame_seq))
+    
+    def remove_disconnected_clients(self):
+        """Remove clients that have disconnected"""
+        with self.clients_lock:
+            disconnected = [client for client in self.clients if not client.active]
+            
+            for client in disconnected:
+                self.clients.remove(client)
+                self.add_compression_totals(client)
+                duration = time.time() - client.connected_at
+                reason = f", {client.disconnect_reason}" if client.disconnect_reason else ""
+                self.console.notice(f"← {self.label} disconnected: {client.addr} ({client.packets_sent} packets sent, {duration:.0f}s{reason})")
+                # logging.info(f"Client disconnected: {client.addr} - Sent {client.packets_sent} packets in {duration:.1f}s")
+                client.close()
+    
+    def add_compression_totals(self, client):
+        """Keep a removed client's compression statistics (clients_lock held)"""
+        if client.frames_compressed:
+            totals = self.compression_totals
+            totals[0] += client.bytes_raw
+            totals[1] += client.bytes_compressed
+            totals[2] += client.frames_compressed
+            totals[3] += client.compress_time
+            logging.info(f"{self.label} {client.addr} stream compressed {client.bytes_raw / max(1, client.bytes_compressed):.1f}:1, "
+                         f"{client.compress_time / client.frames_compressed * 1e6:.1f} µs per frame")
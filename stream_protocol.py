@@ -0,0 +1,377 @@
+#!/usr/bin/env python3
+"""
+FlexRadio Discovery Proxy - Stream Protocol Module
+Framing helpers for the server-to-client TCP stream (newline-delimited JSON),
+and the discovery packet parsing and frame layout shared by the server,
+client, diagnostics and benchmarks.
+
+Besides discovery packet frames, either side may send control messages: JSON
+objects with a "type" field.
+
+A connecting client opens with {"type": "hello", "protocol", "software",
+"encodings", "compression", "heartbeat_interval"} plus optional "subscribe"
+and "resume" fields (see below). The server answers {"type": "hello_ack",
+"protocol", "software", "server_id", "seq", "encoding", "compression",
+"heartbeat_interval", "history"} with what it will use, then acts on the
+requests as if they had been sent as separate messages. Peers ignore fields
+they don't know; clients that send nothing (v3.0.x) get the plain stream, and
+a client whose hello goes unanswered is talking to such an older server.
+
+Heartbeats ({"type": "heartbeat"}) keep an idle
+link verified in both directions; each side only enforces heartbeat timeouts
+once its peer has shown it sends them, so older peers keep working.
+
+Packet frames carry a per-server sequence number ("seq", "server_id"). A
+reconnecting client sends {"type": "resume", "server_id", "seq"} with the
+last sequence it saw; the server replays the radio state changes it missed
+from a bounded history and confirms with {"type": "resumed", "seq",
+"missed", "replayed", "complete"}.
+
+Compression is negotiated per connection: the client sends {"type":
+"compress", "methods": [...]}, and a server that supports one of them
+answers {"type": "compress", "method": ...}. Everything the server sends
+after that line is a zlib stream (preset dictionary, context kept for the
+whole connection, Z_SYNC_FLUSH after every frame); client-to-server
+messages stay uncompressed. The server may end the stream (Z_FINISH) and
+start a new one right after it, e.g. when another process takes the
+connection over.
+
+A client that only needs some radios sends {"type": "subscribe", "filters":
+{"serial": ["1234-*"], "nickname": ["Shack*"]}}: it then only gets frames of
+radios where any pattern matches (fnmatch, case-insensitive).
+
+Copyright (c) 2026 Chris L White (WX7V)
+
+Licensed under the MIT License - see LICENSE file for details
+"""
+
+import fnmatch
+import json
+import re
+import socket
+import sys
+import time
+import zlib
+from typing import Dict, List, Optional
+
+# Largest partial frame kept while waiting for its newline (protects against
+# a peer that never sends one)
+MAX_FRAME_SIZE = 1024 * 1024
+
+HEARTBEAT_FRAME = b'{"type": "heartbeat"}\n'
+
+# Compression method name; changing the preset dictionary requires a new one
+COMPRESSION_METHOD = 'zlib-dict-1'
+
+# Stream protocol version advertised in hello/hello_ack, and the frame encoding
+PROTOCOL_VERSION = 1
+FRAME_ENCODING = 'json'
+
+# Discovery packets: VITA-49 header, then the space-separated key=value payload
+VITA_HEADER_SIZE = 28
+VITA_PACKET_TYPE = b'\x38'  # First header byte of a discovery packet
+
+# Payload fields copied into a frame's radio_info (missing ones become 'Unknown')
+RADIO_INFO_FIELDS = ('model', 'serial', 'ip', 'nickname', 'callsign', 'version', 'status')
+
+# Typical discovery frame contents for the preset dictionary (the payload
+# appears as text in parsed_payload and as hex in packet_hex)
+_SAMPLE_VITA_HEADER = bytes.fromhex('38500095000008000000' '1c2d534cffff' '00000000' '0000000000000000')
+_SAMPLE_PAYLOAD = ('discovery_protocol_version=3.1.0.2 model=FLEX-6600 serial=1234-5678-9012-3456 '
+                   'version=3.10.10.29573 nickname=FlexRadio callsign=N0CALL ip=192.168.1.100 port=4992 '
+                   'status=Available inuse_ip= inuse_host= max_licensed_version=v3 '
+                   'radio_license_id=00-1C-2D-05-1A-2B fpc_mac= wan_connected=1 licensed_clients=2 '
+                   'available_clients=2 max_panadapters=4 available_panadapters=4 max_slices=4 '
+                   'available_slices=4 gui_client_ips= gui_client_hosts= gui_client_programs= '
+                   'gui_client_stations= gui_client_handles= min_software_version=3.0.0.0 '
+                   'external_port_link=1 license_is_unknown=0')
+
+
+def encode_frame(data: dict) -> bytes:
+    """Encode a message as a newline-terminated JSON frame"""
+    return json.dumps(data).encode('utf-8') + b'\n'
+
+
+def encode_message(message_type: str, **fields) -> bytes:
+    """Encode a control message as a stream frame"""
+    return encode_frame({'type': message_type, **fields})
+
+
+def decode_frames(lines: List[bytes]) -> List[dict]:
+    """Decode framed lines (LineFramer.feed()) into messages, skipping malformed ones"""
+    messages = []
+    for line in lines:
+        try:
+            message = json.loads(line)
+        except ValueError:
+            continue
+        if isinstance(message, dict):
+            messages.append(message)
+    return messages
+
+
+def parse_discovery_payload(payload: bytes) -> Dict[str, str]:
+    """Parse the space-separated key=value pairs of a discovery payload (trailing NULs ignored)"""
+    parsed = {}
+    for pair in payload.decode('utf-8', errors='ignore').rstrip('\x00').split(' '):
+        if '=' in pair:
+            key, value = pair.split('=', 1)
+            parsed[key] = value
+    return parsed
+
+
+def extract_radio_info(parsed: Dict[str, str], source_ip: str) -> Dict[str, str]:
+    """Summary fields of a parsed payload (the radio's IP defaults to the packet's source)"""
+    info = {key: parsed.get(key, 'Unknown') for key in RADIO_INFO_FIELDS}
+    if 'ip' not in parsed:
+        info['ip'] = source_ip
+    return info
+
+
+def packet_frame(data: bytes, addr, parsed: Dict[str, str], radio_info: Dict[str, str], timestamp: str,
+                 timestamp_unix: float, server_version: str) -> dict:
+    """Stream frame for a discovery packet (the hub adds "seq" and "server_id")
+    
+    The complete VITA-49 packet (header, stream ID, timestamps, payload) travels
+    as hex, so the client can rebroadcast it byte for byte.
+    """
+    return {
+        'timestamp': timestamp,
+        'timestamp_unix': timestamp_unix,
+        'server_version': server_version,
+        'packet_hex': data.hex(),
+        'packet_size': len(data),
+        'source_ip': addr[0],
+        'source_port': addr[1],
+        'radio_info': radio_info,
+        'parsed_payload': parsed
+    }
+
+
+def _build_preset_dictionary() -> bytes:
+    packet = _SAMPLE_VITA_HEADER + _SAMPLE_PAYLOAD.encode('ascii')
+    payload = parse_discovery_payload(packet[VITA_HEADER_SIZE:])
+    frame = packet_frame(packet, (payload['ip'], 4992), payload, extract_radio_info(payload, payload['ip']),
+                         '2026-01-01 00:00:00', 1767225600.0, '3.0.1')
+    frame.update({'seq': 1, 'server_id': '000000000000'})
+    return encode_message('heartbeat') + encode_frame(frame)
+
+
+PRESET_DICTIONARY = _build_preset_dictionary()
+
+
+def frame_compressor():
+    """Compression context for one connection's outgoing stream"""
+    return zlib.compressobj(6, zlib.DEFLATED, zlib.MAX_WBITS, zdict=PRESET_DICTIONARY)
+
+
+def parse_filter_spec(spec: str) -> Dict[str, List[str]]:
+    """Parse 'field=pattern, field=pattern' (e.g. 'serial=1234-*, nickname=Shack*') into subscription filters
+    
+    Raises:
+        ValueError: For an entry without '=' or an unknown field
+    """
+    filters = {}
+    for entry in spec.split(','):
+        entry = entry.strip()
+        if not entry:
+            continue
+        field, separator, pattern = entry.partition('=')
+        field = field.strip().lower()
+        if not separator or field not in RadioFilter.FIELDS:
+            raise ValueError(f"Invalid filter '{entry}' (use field=pattern; fields: {', '.join(RadioFilter.FIELDS)})")
+        filters.setdefault(field, []).append(pattern.strip())
+    return filters
+
+
+def set_keepalive(sock: socket.socket, idle: float, interval: float, count: int):
+    """Enable TCP keepalive so a silently dead peer is detected by the kernel
+    
+    A peer is declared dead after about idle + interval * count seconds. On
+    Linux TCP_USER_TIMEOUT is set to the same limit so unacknowledged sends
+    fail in that time too. idle <= 0 leaves keepalive off.
+    """
+    if idle <= 0:
+        return
+    idle_s = max(1, int(round(idle)))
+    interval_s = max(1, int(round(interval)))
+    count = max(1, int(count))
+    
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+    if sys.platform == 'win32':
+        sock.ioctl(socket.SIO_KEEPALIVE_VALS, (1, idle_s * 1000, interval_s * 1000))
+        return
+    
+    if hasattr(socket, 'TCP_KEEPIDLE'):
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPIDLE, idle_s)
+    elif hasattr(socket, 'TCP_KEEPALIVE'):  # macOS
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPALIVE, idle_s)
+    if hasattr(socket, 'TCP_KEEPINTVL'):
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPINTVL, interval_s)
+    if hasattr(socket, 'TCP_KEEPCNT'):
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPCNT, count)
+    if hasattr(socket, 'TCP_USER_TIMEOUT'):
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_USER_TIMEOUT, (idle_s + interval_s * count) * 1000)
+
+
+class LineFramer:
+    """Splits a TCP byte stream into newline-delimited frames
+    
+    Works on bytes, so a multi-byte UTF-8 character split across two recv()
+    calls is never decoded half-way, and each chunk is scanned only once.
+    """
+    
+    def __init__(self, max_frame_size: int = MAX_FRAME_SIZE):
+        self.max_frame_size = max_frame_size
+        self.frames_dropped = 0
+        self._buffer = b''
+    
+    def feed(self, data: bytes) -> List[bytes]:
+        """Add received data and return the complete, non-blank frames (without newlines)"""
+        if b'\n' not in data:
+            self._buffer += data
+            if len(self._buffer) > self.max_frame_size:
+                self._buffer = b''
+                self.frames_dropped += 1
+            return []
+        
+        lines = (self._buffer + data).split(b'\n') if self._buffer else data.split(b'\n')
+        self._buffer = lines.pop()
+        return [line for line in lines if line.strip()]
+    
+    def reset(self):
+        """Discard any partial frame (e.g. after reconnecting)"""
+        self._buffer = b''
+    
+    def take_pending(self) -> bytes:
+        """Remove and return the buffered partial frame (to continue it elsewhere)"""
+        pending, self._buffer = self._buffer, b''
+        return pending
+    
+    @property
+    def pending(self) -> int:
+        """Bytes of the incomplete frame currently buffered"""
+        return len(self._buffer)
+
+
+class CompressedLineFramer(LineFramer):
+    """LineFramer for a stream that may switch to compression part-way
+    
+    Call expect_compression() after requesting compression: the server's
+    answer line is found even when compressed bytes follow it in the same
+    recv() chunk, and everything after it is decompressed before framing.
+    Every chunk is searched until then, so call expect_compression(False)
+    as soon as it is clear the answer isn't coming.
+    """
+    
+    def __init__(self, max_frame_size: int = MAX_FRAME_SIZE):
+        super().__init__(max_frame_size)
+        self._switch_line = None
+        self._decompressor = None
+        
+        # Cumulative statistics (kept across reconnects)
+        self.compressed_bytes = 0
+        self.decompressed_bytes = 0
+        self.compressed_frames = 0
+        self.decompress_time = 0.0
+    
+    @property
+    def compressed(self) -> bool:
+        return self._decompressor is not None
+    
+    @property
+    def expecting_compression(self) -> bool:
+        return self._switch_line is not None
+    
+    def expect_compression(self, expected: bool = True):
+        """Switch to decompression after the server's answer to a compression request
+        
+        Pass False once the server has declined, so later data isn't searched for it.
+        """
+        if self._decompressor is None:
+            self._switch_line = encode_message('compress', method=COMPRESSION_METHOD) if expected else None
+    
+    def feed(self, data: bytes) -> List[bytes]:
+        if self._decompressor is not None:
+            started = time.perf_counter()
+            self.compressed_bytes += len(data)
+            output = self._decompressor.decompress(data)
+            while self._decompressor.eof:
+                # The server ended its zlib stream (e.g. before handing the connection
+                # to a new process); the bytes after it start a new one
+                data = self._decompressor.unused_data
+                self._decompressor = zlib.decompressobj(zdict=PRESET_DICTIONARY)
+                output += self._decompressor.decompress(data)
+            data = output
+            frames = super().feed(data)
+            self.decompress_time += time.perf_counter() - started
+            self.decompressed_bytes += len(data)
+            self.compressed_frames += len(frames)
+            return frames
+        if self._switch_line is None:
+            return super().feed(data)
+        
+        # The answer must start a line; anything after it is compressed
+        buffer = self._buffer + data
+        if buffer.startswith(self._switch_line):
+            split = len(self._switch_line)
+        else:
+            index = buffer.find(b'\n' + self._switch_line)
+            if index < 0:
+                return super().feed(data)
+            split = index + 1 + len(self._switch_line)
+        
+        self._buffer = b''
+        frames = super().feed(buffer[:split])
+        self._switch_line = None
+        self._decompressor = zlib.decompressobj(zdict=PRESET_DICTIONARY)
+        return frames + self.feed(buffer[split:])
+    
+    def reset(self):
+        """Discard any partial frame and the compression state (e.g. after reconnecting)"""
+        super().reset()
+        self._switch_line = None
+        self._decompressor = None
+
+
+class RadioFilter:
+    """Subscription filter: a radio matches if any of its field patterns match
+    
+    Match results are cached per radio serial and only re-evaluated when the
+    radio's state changes.
+    """
+    
+    FIELDS = ('serial', 'model', 'nickname', 'callsign', 'ip')
+    
+    def __init__(self, filters: Dict[str, List[str]]):
+        self.filters = filters
+        self._patterns = [(field, re.compile('|'.join(fnmatch.translate(pattern) for pattern in patterns), re.IGNORECASE))
+                          for field, patterns in filters.items()]
+        self._matches = {}
+    
+    @classmethod
+    def from_message(cls, filters) -> Optional['RadioFilter']:
+        """Filter from a subscribe message (None = every radio; malformed entries are ignored)"""
+        if not isinstance(filters, dict):
+            return None
+        valid = {field: [pattern for pattern in patterns if isinstance(pattern, str)]
+                 for field, patterns in filters.items() if field in cls.FIELDS and isinstance(patterns, list)}
+        valid = {field: patterns for field, patterns in valid.items() if patterns}
+        return cls(valid) if valid else None
+    
+    def match(self, radio_info: Optional[dict]) -> bool:
+        if radio_info is None:
+            return True  # Not a radio frame
+        return any(pattern.match(str(radio_info.get(field, ''))) for field, pattern in self._patterns)
+    
+    def wants(self, radio_info: Optional[dict], is_change: bool) -> bool:
+        """Cached match for a radio (re-evaluated on state changes)"""
+        if radio_info is None:
+            return True
+        serial = radio_info.get('serial')
+        if is_change or serial not in self._matches:
+            self._matches[serial] = self.match(radio_info)
+        return self._matches[serial]
+    
+    def __str__(self):
+        return ', '.join(f"{field}={pattern}" for field, patterns in self.filters.items() for pattern in patterns)
@@ -6,6 +6,7 @@ Test script for health check functionality
 import configparser
 import sys
 from health_checks import HealthChecker, HealthStatus
+from settings import ClientSettings, ServerSettings
 
 def create_test_config():
     """Create a test configuration"""
@@ -15,17 +16,15 @@ def create_test_config():
     config['SERVER'] = {
         'Listen_Address': '0.0.0.0',
         'Discovery_Port': '4992',
-        'Shared_File_Path': './discovery.json',
-        'Update_Interval': '2.0'
+        'Stream_Port': '5992'
     }
     
     # Client section
     config['CLIENT'] = {
-        'Shared_File_Path': './discovery.json',
+        'Server_Address': '127.0.0.1',
+        'Stream_Port': '5992',
         'Broadcast_Address': '255.255.255.255',
-        'Discovery_Port': '4992',
-        'Check_Interval': '3.0',
-        'Max_File_Age': '15.0'
+        'Discovery_Port': '4992'
     }
     
     # Diagnostics section
@@ -48,7 +47,7 @@ def test_server_checks():
     print("="*70)
     
     config = create_test_config()
-    checker = HealthChecker(config, mode='server', version='2.2.0')
+    checker = HealthChecker(ServerSettings.from_config(config), mode='server', version='2.2.0')
     
     results = checker.run_all_checks()
     overall = checker.print_results(title="Server Health Check Test")
@@ -61,7 +60,7 @@ def test_server_checks():
     assert "Version & Configuration" in check_names, "Missing version check"
     assert "Network Interfaces" in check_names, "Missing network interface check"
     assert "UDP Port 4992" in check_names, "Missing port check"
-    assert "File Write Permission" in check_names, "Missing file write check"
+    assert "Stream Port 5992" in check_names, "Missing stream port check"
     
     print(f"\n[+] Server checks completed: {len(results)} checks performed")
     return True
@@ -73,7 +72,7 @@ def test_client_checks():
     print("="*70)
     
     config = create_test_config()
-    checker = HealthChecker(config, mode='client', version='2.2.0')
+    checker = HealthChecker(ClientSettings.from_config(config), mode='client', version='2.2.0')
     
     results = checker.run_all_checks()
     overall = checker.print_results(title="Client Health Check Test")
@@ -87,7 +86,7 @@ def test_client_checks():
     assert "Network Interfaces" in check_names, "Missing network interface check"
     assert "UDP Port 4992" in check_names, "Missing port check"
     assert "Broadcast Capability" in check_names, "Missing broadcast check"
-    assert "File Read Permission" in check_names, "Missing file read check"
+    assert "Server TCP Connectivity" in check_names, "Missing server connectivity check"
     
     print(f"\n[+] Client checks completed: {len(results)} checks performed")
     return True
@@ -102,12 +101,12 @@ def test_with_ping():
     # Add localhost for ping test
     config['DIAGNOSTICS']['Test_Server_IP'] = '127.0.0.1'
     
-    checker = HealthChecker(config, mode='client', version='2.2.0')
+    checker = HealthChecker(ClientSettings.from_config(config), mode='client', version='2.2.0')
     results = checker.run_all_checks()
     checker.print_results(title="Client Health Check with Ping")
     
     # Find the ping result
-    ping_result = next((r for r in results if 'Connectivity' in r.name), None)
+    ping_result = next((r for r in results if r.name == 'Server Connectivity'), None)
     assert ping_result is not None, "Ping check not found"
     assert ping_result.status == HealthStatus.PASS, f"Ping to localhost should pass: {ping_result.message}"
     assert ping_result.latency_ms is not None, "Ping latency not recorded"
@@ -115,6 +114,25 @@ def test_with_ping():
     print(f"\n[+] Ping test completed: {ping_result.latency_ms:.0f}ms latency")
     return True
 
+def test_default_discovery_port():
+    """Keys left to their defaults are checked with the defaults the server uses"""
+    print("\n" + "="*70)
+    print("TEST: Health Checks with Default Discovery Port")
+    print("="*70)
+    
+    config = configparser.ConfigParser()
+    config['SERVER'] = {'Listen_Address': '0.0.0.0', 'Stream_Port': '5992'}
+    
+    checker = HealthChecker(ServerSettings.from_config(config), mode='server', version='3.0.1')
+    results = checker.run_all_checks(is_startup=True)
+    checker.print_results(title="Server Health Check (defaults)")
+    
+    check_names = [r.name for r in results]
+    assert "UDP Port 4992" in check_names, "Default Discovery_Port was not checked"
+    
+    print(f"\n[+] Default settings checked: {len(results)} checks performed")
+    return True
+
 def main():
     """Run all tests"""
     print("\n" + "="*70)
@@ -124,7 +142,8 @@ def main():
     tests = [
         ("Server Health Checks", test_server_checks),
         ("Client Health Checks", test_client_checks),
-        ("Ping Test", test_with_ping)
+        ("Ping Test", test_with_ping),
+        ("Default Discovery Port", test_default_discovery_port)
     ]
     
     passed = 0
@@ -0,0 +1,1093 @@
+#!/usr/bin/env python3
+"""
+Loopback integration tests for server and client
+
+Runs DiscoveryServer and DiscoveryClient in-process on 127.0.0.1 (ephemeral
+ports) with a synthetic radio, captures the client's UDP rebroadcasts and
+checks startup, time-to-first-rebroadcast and recovery times against budgets.
+"""
+
+import configparser
+import dataclasses
+import json
+import logging
+import os
+import socket
+import struct
+import sys
+import threading
+import time
+from ingress_filter import MAX_SOURCES, OTHER_ALLOWED_SOURCES, OTHER_SOURCES
+from settings import ClientSettings, ServerSettings, SettingsError
+from simulation import SyntheticRadioEmitter, build_discovery_packet, import_entry_script, loopback_config, radio_fields
+from socket_handoff import handoff_supported
+from stream_protocol import HEARTBEAT_FRAME, PROTOCOL_VERSION, encode_message
+from traffic_capture import CaptureReader
+
+# Latency budgets (seconds) - generous enough for a loaded CI machine, tight
+# enough to catch a reintroduced sleep or a broken reconnect loop
+STARTUP_BUDGET = 1.0
+FIRST_REBROADCAST_BUDGET = 2.0
+RECOVERY_BUDGET = 3.0
+DEAD_PEER_BUDGET = 3.0
+RADIO_GONE_BUDGET = 2.0
+FAST_START_BUDGET = 0.1  # Server created -> first packet forwarded, with Fast_Start
+MIN_COMPRESSION_RATIO = 10.0
+
+RECONNECT_INTERVAL = 0.5
+RADIO_RATE = 20.0  # packets per second
+HEARTBEAT_INTERVAL = 0.5
+HEARTBEAT_TIMEOUT = 1.5
+MULTICAST_GROUP = '239.255.49.92'
+
+class LoopbackProxy:
+    """Server, client, synthetic radio and rebroadcast receiver on loopback"""
+
+    def __init__(self):
+        self.server_module = import_entry_script('FRS-Discovery-Server.py')
+        self.client_module = import_entry_script('FRS-Discovery-Client.py')
+        self.server = None
+        self.server_thread = None
+        self.client = None
+        self.downstream = None
+        self.client_thread = None
+        self.emitter = None
+        self.discovery_port = 0
+        self.stream_port = 0
+
+        # Receives the client's rebroadcasts (stands in for SmartSDR)
+        self.receiver = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.receiver.bind(('127.0.0.1', 0))
+
+    def start_server(self, multicast=False, udp=False, admin=False, config_path=None, handoff_socket='',
+                     fast_start=False, options=None):
+        """Start the server (on the previous ports after a restart); returns startup seconds
+        
+        `options` are further [SERVER] settings (key -> value).
+        """
+        config = loopback_config()
+        config['SERVER'].update(options or {})
+        if fast_start:
+            # Startup tests on, deferred to the background
+            config['DIAGNOSTICS'].update({'Enable_Health_Checks': 'true', 'Startup_Tests': 'true', 'Fast_Start': 'true',
+                                          'Test_Server_IP': '127.0.0.1', 'Test_Radio_IP': '127.0.0.1'})
+        config['SERVER']['UDP_Transport'] = str(udp).lower()
+        if admin:
+            config['SERVER']['Admin_Enabled'] = 'true'
+            config['SERVER']['Admin_Port'] = '0'
+        if multicast:
+            config['SERVER']['Multicast_Group'] = MULTICAST_GROUP
+            config['SERVER']['Multicast_Port'] = str(free_udp_port())
+            config['SERVER']['Multicast_Interface'] = '127.0.0.1'
+        config['SERVER']['Discovery_Port'] = str(self.discovery_port)
+        config['SERVER']['Stream_Port'] = str(self.stream_port)
+        config['SERVER']['Heartbeat_Interval'] = str(HEARTBEAT_INTERVAL)
+        config['SERVER']['Heartbeat_Timeout'] = str(HEARTBEAT_TIMEOUT)
+        config['SERVER']['Stale_Minimum_Seconds'] = '0.5'
+        config['SERVER']['Handoff_Socket'] = handoff_socket
+        if config_path:
+            with open(config_path, 'w') as f:
+                config.write(f)
+
+        started = time.perf_counter()
+        self.server = self.server_module.DiscoveryServer(config, config_path=config_path)
+        self.server_thread = threading.Thread(target=self.server.start, daemon=True)
+        self.server_thread.start()
+        wait_for(lambda: self.server.running and self.server.tcp_sock, timeout=10, what="server startup")
+        elapsed = time.perf_counter() - started
+
+        self.discovery_port = self.server.discovery_port
+        self.stream_port = self.server.stream_port
+        return elapsed
+
+    def stop_server(self):
+        self.server.running = False
+        self.server_thread.join(5.0)
+
+    def start_radio(self, flap_every=0, radios=1, rate=RADIO_RATE):
+        self.emitter = SyntheticRadioEmitter(('127.0.0.1', self.discovery_port), radios=radios, rate=rate,
+                                             flap_every=flap_every)
+        self.emitter.start()
+
+    def client_config(self, stream_port, relay=False, transport='tcp', subscribe=''):
+        config = loopback_config()
+        config['CLIENT'] = {
+            'Broadcast_Address': '127.0.0.1',
+            'Discovery_Port': str(self.receiver.getsockname()[1]),
+            'Server_Address': '127.0.0.1',
+            'Stream_Port': str(stream_port),
+            'Reconnect_Interval': str(RECONNECT_INTERVAL),
+            'Use_Cached_Packet': 'false',
+            'Heartbeat_Interval': str(HEARTBEAT_INTERVAL),
+            'Heartbeat_Timeout': str(HEARTBEAT_TIMEOUT),
+            'Relay_Enabled': str(relay).lower(),
+            'Relay_Listen_Address': '127.0.0.1',
+            'Relay_Port': '0',
+            'Multicast_Interface': '127.0.0.1',
+            'Transport': transport,
+            'Subscribe': subscribe,
+        }
+        return config
+
+    def start_client(self, stream_port=None, relay=False, transport='tcp', subscribe=''):
+        """Start the client; returns startup seconds (until connected to the server)"""
+        config = self.client_config(stream_port or self.stream_port, relay=relay, transport=transport, subscribe=subscribe)
+
+        started = time.perf_counter()
+        self.client = self.client_module.DiscoveryClient(config)
+        self.client_thread = threading.Thread(target=self.client.start, daemon=True)
+        self.client_thread.start()
+        wait_for(lambda: self.client.running and self.client.tcp_sock, timeout=10, what="client connect")
+        return time.perf_counter() - started
+
+    def start_downstream(self):
+        """Start a second client connected to the first client's relay"""
+        wait_for(lambda: self.client.relay.sock, timeout=10, what="relay to listen")
+        self.downstream = self.client_module.DiscoveryClient(self.client_config(self.client.relay.port))
+        self.downstream_thread = threading.Thread(target=self.downstream.start, daemon=True)
+        self.downstream_thread.start()
+        wait_for(lambda: self.downstream.running and self.downstream.tcp_sock, timeout=10, what="downstream connect")
+
+    def drop_links(self):
+        """Drop every client's TCP connection on the server side"""
+        with self.server.clients_lock:
+            for client in self.server.clients:
+                try:
+                    client.sock.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+
+    def drain(self):
+        """Discard rebroadcasts received so far"""
+        self.receiver.setblocking(False)
+        try:
+            while True:
+                self.receiver.recv(4096)
+        except (BlockingIOError, OSError):
+            pass
+        finally:
+            self.receiver.setblocking(True)
+
+    def wait_for_rebroadcast(self, since, timeout=10.0):
+        """Seconds from `since` (perf_counter) until the next rebroadcast arrives"""
+        self.receiver.settimeout(timeout)
+        try:
+            self.receiver.recv(4096)
+        except socket.timeout:
+            raise AssertionError(f"No rebroadcast received within {timeout:.0f}s")
+        return time.perf_counter() - since
+
+    def close(self):
+        if self.emitter:
+            self.emitter.stop()
+        if self.downstream:
+            self.downstream.running = False
+            self.downstream_thread.join(5.0)
+        if self.client:
+            self.client.running = False
+            self.client_thread.join(5.0)
+        if self.server and self.server.running:
+            self.stop_server()
+        self.receiver.close()
+
+def wait_for(condition, timeout, what):
+    deadline = time.perf_counter() + timeout
+    while not condition():
+        if time.perf_counter() > deadline:
+            raise AssertionError(f"Timed out waiting for {what}")
+        time.sleep(0.005)
+
+def free_udp_port():
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def free_tcp_port():
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def check_budget(name, seconds, budget):
+    print(f"  {name:28} {seconds * 1000:8.0f} ms  (budget {budget * 1000:.0f} ms)")
+    assert seconds <= budget, f"{name} took {seconds:.2f}s (budget {budget:.2f}s)"
+
+def test_startup_and_first_rebroadcast():
+    """Server/client startup and time to first rebroadcast"""
+    print("\n" + "="*70)
+    print("TEST: Startup and Time to First Rebroadcast")
+    print("="*70)
+
+    proxy = LoopbackProxy()
+    try:
+        server_startup = proxy.start_server()
+        proxy.start_radio()
+        started = time.perf_counter()
+        client_startup = proxy.start_client()
+        first_rebroadcast = proxy.wait_for_rebroadcast(started)
+    finally:
+        proxy.close()
+
+    check_budget("Server startup", server_startup, STARTUP_BUDGET)
+    check_budget("Client startup", client_startup, STARTUP_BUDGET)
+    check_budget("Time to first rebroadcast", first_rebroadcast, FIRST_REBROADCAST_BUDGET)
+    return True
+
+def test_recovery_after_server_restart():
+    """Rebroadcasts resume after the server is stopped and restarted"""
+    print("\n" + "="*70)
+    print("TEST: Recovery After Server Restart")
+    print("="*70)
+
+    proxy = LoopbackProxy()
+    try:
+        proxy.start_server()
+        proxy.start_radio()
+        started = time.perf_counter()
+        proxy.start_client()
+        proxy.wait_for_rebroadcast(started)
+
+        proxy.stop_server()
+        proxy.drain()
+        started = time.perf_counter()
+        proxy.start_server()
+        recovery = proxy.wait_for_rebroadcast(started)
+    finally:
+        proxy.close()
+
+    check_budget("Recovery after restart", recovery, RECOVERY_BUDGET)
+    return True
+
+def test_recovery_after_link_drop():
+    """Rebroadcasts resume after the TCP link is dropped"""
+    print("\n" + "="*70)
+    print("TEST: Recovery After TCP Link Drop")
+    print("="*70)
+
+    proxy = LoopbackProxy()
+    try:
+        proxy.start_server()
+        proxy.start_radio()
+        started = time.perf_counter()
+        proxy.start_client()
+        proxy.wait_for_rebroadcast(started)
+
+        started = time.perf_counter()
+        proxy.drop_links()
+        wait_for(lambda: proxy.client.tcp_sock is None, timeout=5, what="client to notice the dropped link")
+        proxy.drain()
+        recovery = proxy.wait_for_rebroadcast(started)
+    finally:
+        proxy.close()
+
+    check_budget("Recovery after link drop", recovery, RECOVERY_BUDGET)
+    return True
+
+def test_resume_after_link_drop():
+    """Changes missed while the link was down are replayed on reconnect"""
+    print("\n" + "="*70)
+    print("TEST: Resume After TCP Link Drop")
+    print("="*70)
+
+    proxy = LoopbackProxy()
+    try:
+        proxy.start_server()
+        proxy.start_radio(flap_every=1)  # Every packet is a radio state change
+        started = time.perf_counter()
+        proxy.start_client()
+        proxy.wait_for_rebroadcast(started)
+
+        proxy.drop_links()
+        wait_for(lambda: proxy.client.tcp_sock is None, timeout=5, what="client to notice the dropped link")
+        wait_for(lambda: proxy.client.tcp_sock is not None and not proxy.client.resume_pending,
+                 timeout=5, what="client to resume")
+        missed = proxy.client.frames_missed
+        replayed = proxy.client.frames_replayed
+    finally:
+        proxy.close()
+
+    print(f"  Frames missed: {missed} | Changes replayed: {replayed}")
+    assert missed > 0, "No frames were missed while disconnected"
+    assert replayed == missed, f"Replayed {replayed} of {missed} missed changes"
+    return True
+
+def test_radio_gone():
+    """A radio that stops broadcasting is reported gone to the client"""
+    print("\n" + "="*70)
+    print("TEST: Radio Gone Detection")
+    print("="*70)
+
+    proxy = LoopbackProxy()
+    try:
+        proxy.start_server()
+        proxy.start_radio()
+        started = time.perf_counter()
+        proxy.start_client()
+        proxy.wait_for_rebroadcast(started)
+
+        proxy.emitter.stop()
+        started = time.perf_counter()
+        wait_for(lambda: proxy.client.radios_gone, timeout=10, what="client to be told the radio is gone")
+        detection = time.perf_counter() - started
+    finally:
+        proxy.close()
+
+    check_budget("Radio gone detection", detection, RADIO_GONE_BUDGET)
+    return True
+
+def test_dead_client_detection():
+    """A client that stops sending heartbeats is dropped and its slot freed"""
+    print("\n" + "="*70)
+    print("TEST: Dead Client Detection")
+    print("="*70)
+
+    proxy = LoopbackProxy()
+    silent_client = None
+    try:
+        proxy.start_server()
+
+        # Announces heartbeats, then goes silent like a peer behind a dropped VPN
+        silent_client = socket.create_connection(('127.0.0.1', proxy.stream_port))
+        silent_client.sendall(HEARTBEAT_FRAME)
+        wait_for(lambda: proxy.server.clients, timeout=5, what="server to register the client")
+        started = time.perf_counter()
+        wait_for(lambda: not proxy.server.clients, timeout=10, what="server to drop the silent client")
+        detection = time.perf_counter() - started
+    finally:
+        if silent_client:
+            silent_client.close()
+        proxy.close()
+
+    check_budget("Dead client detection", detection, DEAD_PEER_BUDGET)
+    return True
+
+def test_dead_server_detection():
+    """The client reconnects when the server stops sending heartbeats"""
+    print("\n" + "="*70)
+    print("TEST: Dead Server Detection")
+    print("="*70)
+
+    # Stand-in server: answers the client's heartbeat once, then goes silent
+    listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    listener.bind(('127.0.0.1', 0))
+    listener.listen(2)
+    listener.settimeout(10)
+
+    proxy = LoopbackProxy()
+    connections = []
+    try:
+        proxy.start_client(stream_port=listener.getsockname()[1])
+        connection, _ = listener.accept()
+        connections.append(connection)
+        connection.recv(4096)
+        connection.sendall(HEARTBEAT_FRAME)
+        started = time.perf_counter()
+
+        connection, _ = listener.accept()  # Client gave up on the silent server and reconnected
+        connections.append(connection)
+        detection = time.perf_counter() - started
+    finally:
+        proxy.close()
+        for connection in connections:
+            connection.close()
+        listener.close()
+
+    check_budget("Dead server detection", detection, DEAD_PEER_BUDGET)
+    return True
+
+def test_relay_mode():
+    """A relay client forwards the stream to a downstream client"""
+    print("\n" + "="*70)
+    print("TEST: Relay Mode")
+    print("="*70)
+
+    proxy = LoopbackProxy()
+    try:
+        proxy.start_server()
+        proxy.start_radio()
+        started = time.perf_counter()
+        proxy.start_client(relay=True)
+        proxy.start_downstream()
+        wait_for(lambda: proxy.downstream.broadcast_count, timeout=10, what="downstream rebroadcast")
+        first_relayed = time.perf_counter() - started
+
+        # Downstream clients see the relay's own sequence numbers
+        relay_id = proxy.client.relay.server_id
+        downstream_id = proxy.downstream.server_id
+        gaps = proxy.downstream.sequence_gaps
+    finally:
+        proxy.close()
+
+    assert downstream_id == relay_id, f"Downstream tracks server ID {downstream_id}, relay is {relay_id}"
+    assert gaps == 0, f"Downstream saw {gaps} sequence gap(s)"
+    check_budget("Time to first relayed packet", first_relayed, FIRST_REBROADCAST_BUDGET)
+    return True
+
+def test_multicast_egress():
+    """Frames move to the multicast group, and back to TCP when the group stops delivering"""
+    print("\n" + "="*70)
+    print("TEST: Multicast Egress and Fallback")
+    print("="*70)
+
+    proxy = LoopbackProxy()
+    try:
+        proxy.start_server(multicast=True)
+        proxy.start_radio()
+        started = time.perf_counter()
+        proxy.start_client()
+        wait_for(lambda: proxy.client.multicast_active, timeout=5, what="client to receive multicast")
+        switch = time.perf_counter() - started
+
+        # No packet frames go over the stream while the client is on multicast
+        connection = proxy.server.clients[0]
+        wait_for(lambda: connection.multicast, timeout=2, what="server to stop streaming frames")
+        streamed = connection.packets_sent
+        broadcasts = proxy.client.broadcast_count
+        wait_for(lambda: proxy.client.broadcast_count >= broadcasts + 5, timeout=5, what="multicast rebroadcasts")
+        assert connection.packets_sent == streamed, "Frames were still sent over TCP to a multicast client"
+
+        # Group stops delivering (e.g. multicast routing lost): client falls back to TCP
+        membership = struct.pack('4s4s', socket.inet_aton(MULTICAST_GROUP), socket.inet_aton('127.0.0.1'))
+        proxy.client.multicast_sock.setsockopt(socket.IPPROTO_IP, socket.IP_DROP_MEMBERSHIP, membership)
+        started = time.perf_counter()
+        wait_for(lambda: not connection.multicast, timeout=10, what="client to fall back to TCP")
+        fallback = time.perf_counter() - started
+        proxy.drain()
+        proxy.wait_for_rebroadcast(time.perf_counter())
+    finally:
+        proxy.close()
+
+    check_budget("Switch to multicast", switch, FIRST_REBROADCAST_BUDGET)
+    check_budget("Fallback to TCP", fallback, DEAD_PEER_BUDGET)
+    return True
+
+def test_udp_transport():
+    """Frames arrive over the UDP transport, and registration recovers after a server restart"""
+    print("\n" + "="*70)
+    print("TEST: UDP Transport")
+    print("="*70)
+
+    proxy = LoopbackProxy()
+    try:
+        proxy.start_server(udp=True)
+        proxy.start_radio()
+        started = time.perf_counter()
+        proxy.start_client(transport='udp')
+        first_rebroadcast = proxy.wait_for_rebroadcast(started)
+        wait_for(lambda: proxy.server.hub.udp_clients, timeout=2, what="server to register the UDP client")
+        assert not proxy.server.clients, "UDP client also holds a stream connection"
+
+        proxy.stop_server()
+        proxy.drain()
+        started = time.perf_counter()
+        proxy.start_server(udp=True)
+        recovery = proxy.wait_for_rebroadcast(started)
+    finally:
+        proxy.close()
+
+    check_budget("Time to first rebroadcast", first_rebroadcast, FIRST_REBROADCAST_BUDGET)
+    check_budget("Recovery after restart", recovery, RECOVERY_BUDGET)
+    return True
+
+def test_udp_loss():
+    """Frames lost on a UDP link are counted for the summary, not logged as a warning each"""
+    print("\n" + "="*70)
+    print("TEST: UDP Loss")
+    print("="*70)
+
+    warnings = []
+    handler = logging.Handler(logging.WARNING)
+    handler.emit = lambda record: warnings.append(record.getMessage())
+    logging.getLogger().addHandler(handler)
+    proxy = LoopbackProxy()
+    try:
+        proxy.start_server(udp=True)
+        proxy.start_radio()
+        proxy.start_client(transport='udp')
+        received = proxy.client.handle_frame
+        arrived = [0]
+
+        def lossy_link(packet_data, via_multicast=False):
+            arrived[0] += 1
+            if 'type' in packet_data or arrived[0] % 3:
+                received(packet_data, via_multicast)
+        proxy.client.handle_frame = lossy_link  # Every third frame is lost
+        wait_for(lambda: proxy.client.frames_missed >= 10, timeout=10, what="lost frames")
+        gaps, missed = proxy.client.sequence_gaps, proxy.client.frames_missed
+    finally:
+        proxy.close()
+        logging.getLogger().removeHandler(handler)
+
+    gap_warnings = [message for message in warnings if message.startswith('Sequence gap')]
+    print(f"  {gaps} gap(s), {missed} frame(s) lost | {len(gap_warnings)} gap warning(s) logged")
+    assert not gap_warnings, f"UDP loss logged as warnings: {gap_warnings[:3]}"
+    return True
+
+def test_stream_compression():
+    """The negotiated compressed stream cuts bytes per frame by an order of magnitude"""
+    print("\n" + "="*70)
+    print("TEST: Stream Compression")
+    print("="*70)
+
+    proxy = LoopbackProxy()
+    try:
+        proxy.start_server()
+        proxy.start_radio()
+        proxy.start_client()
+        wait_for(lambda: proxy.client.framer.compressed_frames >= 40, timeout=10, what="compressed frames")
+        framer = proxy.client.framer
+        ratio = framer.decompressed_bytes / framer.compressed_bytes
+        per_frame = framer.compressed_bytes / framer.compressed_frames
+        connection = proxy.server.clients[0]
+        compress_cost = connection.compress_time / connection.frames_compressed
+    finally:
+        proxy.close()
+
+    print(f"  Compression ratio           {ratio:8.1f}:1 ({per_frame:.0f} bytes per frame)")
+    print(f"  Compression CPU per frame   {compress_cost * 1e6:8.1f} µs")
+    assert ratio >= MIN_COMPRESSION_RATIO, f"Compression ratio {ratio:.1f}:1 (expected >= {MIN_COMPRESSION_RATIO:g}:1)"
+    return True
+
+def test_subscription_filters():
+    """A subscribed client only receives (and rebroadcasts) the radios it asked for"""
+    print("\n" + "="*70)
+    print("TEST: Subscription Filters")
+    print("="*70)
+
+    proxy = LoopbackProxy()
+    try:
+        proxy.start_server()
+        proxy.start_radio(radios=2)
+        proxy.start_client(subscribe='nickname=simradio1')
+        wait_for(lambda: proxy.client.broadcast_count >= 20, timeout=10, what="subscribed rebroadcasts")
+        proxy.receiver.settimeout(1.0)
+        nicknames = set()
+        for _ in range(20):
+            payload = proxy.receiver.recv(4096)[28:].decode('ascii', 'replace')
+            nicknames.update(field[len('nickname='):] for field in payload.split() if field.startswith('nickname='))
+        connection = proxy.server.clients[0]
+        sent, received = connection.packets_sent, proxy.server.packet_count
+    finally:
+        proxy.close()
+
+    print(f"  Radios rebroadcast: {', '.join(sorted(nicknames))} | Frames sent {sent} of {received} packets")
+    assert nicknames == {'SimRadio1'}, f"Rebroadcast radios {nicknames}, subscribed to SimRadio1 only"
+    assert sent < received * 0.75, f"Server sent {sent} frames for {received} packets from 2 radios"
+    return True
+
+def test_hello_handshake():
+    """Hello/hello_ack negotiates options; a client that sends nothing still gets the plain stream"""
+    print("\n" + "="*70)
+    print("TEST: Hello Handshake")
+    print("="*70)
+
+    proxy = LoopbackProxy()
+    sockets = []
+    try:
+        proxy.start_server()
+        proxy.start_radio()
+        proxy.start_client()
+        wait_for(lambda: proxy.client.server_protocol, timeout=5, what="hello_ack at the client")
+
+        # v3.0.x client: sends nothing, reads frames
+        legacy = socket.create_connection(('127.0.0.1', proxy.stream_port), timeout=5)
+        sockets.append(legacy)
+        legacy_line = legacy.makefile('rb').readline()
+
+        # Hello without compression: the ack arrives as plain JSON, first thing on the stream
+        plain = socket.create_connection(('127.0.0.1', proxy.stream_port), timeout=5)
+        sockets.append(plain)
+        plain.sendall(encode_message('hello', protocol=PROTOCOL_VERSION, software='test', encodings=['json'],
+                                     compression=[], heartbeat_interval=0))
+        ack = json.loads(plain.makefile('rb').readline())
+        client_versions = sorted((c.software or '-', c.protocol) for c in proxy.server.clients)
+    finally:
+        for sock in sockets:
+            sock.close()
+        proxy.close()
+
+    print(f"  Client versions seen by server: {client_versions}")
+    print(f"  hello_ack: {ack}")
+    assert ack.get('type') == 'hello_ack' and ack.get('protocol') == PROTOCOL_VERSION, f"Unexpected first line {ack}"
+    assert ack.get('compression') is None and ack.get('server_id'), f"Unexpected hello_ack {ack}"
+    assert 'packet_hex' in json.loads(legacy_line), f"Legacy client got {legacy_line[:80]!r}"
+    assert ('-', 0) in client_versions and (proxy.client_module.__version__, PROTOCOL_VERSION) in client_versions
+    return True
+
+def test_hello_unanswered():
+    """Against a server that never answers the hello (v3.0.x), the client stops looking for compression"""
+    print("\n" + "="*70)
+    print("TEST: Hello Unanswered")
+    print("="*70)
+
+    proxy = LoopbackProxy()
+    try:
+        proxy.start_server()
+        proxy.server.hub.handle_hello = lambda client, hello: None  # Ignores the hello like a v3.0.x server
+        proxy.start_radio()
+        started = time.perf_counter()
+        proxy.start_client()
+        proxy.client.hello_ack_timeout = 0.5
+        wait_for(lambda: not proxy.client.framer.expecting_compression, timeout=5,
+                 what="client to stop expecting compression")
+        gave_up_seconds = time.perf_counter() - started
+        broadcasts = proxy.client.broadcast_count
+        wait_for(lambda: proxy.client.broadcast_count >= broadcasts + 5, timeout=5, what="rebroadcasts after giving up")
+        compressed, protocol = proxy.client.framer.compressed, proxy.client.server_protocol
+    finally:
+        proxy.close()
+
+    print(f"  Stopped expecting compression after {gave_up_seconds:.2f}s; plain stream still rebroadcast")
+    assert not compressed and protocol == 0, f"Unexpected stream state: compressed={compressed}, protocol={protocol}"
+    return True
+
+def test_admin_socket():
+    """The admin socket reports stats and clients, kicks a client and runs health checks"""
+    print("\n" + "="*70)
+    print("TEST: Admin Socket")
+    print("="*70)
+
+    proxy = LoopbackProxy()
+    admin = None
+    level = logging.getLogger().level
+    try:
+        proxy.start_server(admin=True)
+        proxy.start_radio()
+        proxy.start_client()
+        wait_for(lambda: proxy.client.broadcast_count >= 5, timeout=10, what="rebroadcasts")
+        wait_for(lambda: proxy.server.admin.running, timeout=5, what="admin socket")
+        admin = socket.create_connection(('127.0.0.1', proxy.server.admin.port), timeout=10)
+        replies = admin.makefile('rb')
+
+        def command(line):
+            admin.sendall(line.encode('ascii') + b'\n')
+            return json.loads(replies.readline())
+
+        stats = command('stats')['result']
+        clients = command('clients')['result']
+        radios = command('radios')['result']
+        started = time.perf_counter()
+        kicked = command(f"kick {clients[0]['addr']}")
+        wait_for(lambda: [c['addr'] for c in proxy.server.hub.client_list()] not in ([], [clients[0]['addr']]),
+                 timeout=5, what="kicked client to reconnect")
+        kick_seconds = time.perf_counter() - started
+        loglevel = command('loglevel debug')['result']
+        unknown = command('frobnicate')
+        health = command('health')['result']
+    finally:
+        logging.getLogger().setLevel(level)
+        if admin:
+            admin.close()
+        proxy.close()
+
+    print(f"  stats: {stats['packets_received']} packets, {stats['radios']} radio(s), {stats['clients']} client(s)")
+    print(f"  clients: {[(c['addr'], c['software'], c['packets_sent']) for c in clients]}")
+    print(f"  kick: {kicked} (reconnected in {kick_seconds * 1000:.0f} ms) | health: {len(health)} check(s)")
+    assert stats['radios'] == 1 and stats['clients'] == 1 and stats['packets_received'] >= 5, f"Unexpected stats {stats}"
+    assert radios[0]['nickname'] == 'SimRadio0', f"Unexpected radios {radios}"
+    assert kicked['ok'], f"Kick failed: {kicked}"
+    assert loglevel == 'DEBUG' and not unknown['ok'], f"loglevel -> {loglevel}, unknown command -> {unknown}"
+    assert health and all('status' in result for result in health), f"Unexpected health results {health}"
+    return True
+
+def test_config_reload():
+    """Editing config.ini applies the changed settings in place; connected clients stay connected"""
+    print("\n" + "="*70)
+    print("TEST: Config Reload")
+    print("="*70)
+
+    proxy = LoopbackProxy()
+    config_path = os.path.abspath('test-reload-config.ini')
+    old_port_refused = False
+    try:
+        proxy.discovery_port = free_udp_port()
+        proxy.stream_port = free_tcp_port()
+        proxy.start_server(config_path=config_path)
+        proxy.start_radio()
+        proxy.start_client()
+        wait_for(lambda: proxy.client.broadcast_count >= 5, timeout=10, what="rebroadcasts")
+        connection = proxy.server.clients[0]
+
+        config = configparser.ConfigParser()
+        config.read(config_path)
+        new_port = free_tcp_port()
+        config['SERVER'].update(Stream_Port=str(new_port), Max_Clients='2', Stale_Default_Seconds='20',
+                                Multicast_TTL='4')
+        with open(config_path, 'w') as f:
+            config.write(f)
+        started = time.perf_counter()
+        proxy.server.reloader.request()  # What SIGHUP does; the file change alone is noticed too
+        wait_for(lambda: proxy.server.reloader.reloads, timeout=5, what="config reload")
+        reload_seconds = time.perf_counter() - started
+
+        broadcasts = proxy.client.broadcast_count
+        wait_for(lambda: proxy.client.broadcast_count >= broadcasts + 5, timeout=5, what="rebroadcasts after reload")
+        still_connected = proxy.server.clients == [connection] and connection.active
+        socket.create_connection(('127.0.0.1', new_port), timeout=2).close()
+        try:
+            socket.create_connection(('127.0.0.1', proxy.stream_port), timeout=2).close()
+        except ConnectionRefusedError:
+            old_port_refused = True
+        max_clients, stale_default = proxy.server.hub.max_clients, proxy.server.stale_default
+
+        # The client's section is none of the server's business: no changes, no restart notice
+        config['CLIENT'] = {'Server_Address': '192.0.2.1', 'Stream_Port': str(free_tcp_port())}
+        with open(config_path, 'w') as f:
+            config.write(f)
+        other_role_changes = proxy.server.reloader.reload()
+    finally:
+        proxy.close()
+        if os.path.exists(config_path):
+            os.remove(config_path)
+
+    print(f"  Reload applied in {reload_seconds:.2f}s | stream port {proxy.stream_port} -> {new_port} | "
+          f"Max_Clients {max_clients} | Stale_Default_Seconds {stale_default:g}")
+    assert still_connected, "The connected client was dropped by the reload"
+    assert old_port_refused, "The old stream port still accepts connections"
+    assert max_clients == 2 and stale_default == 20, "Changed settings were not applied"
+    assert other_role_changes == {}, f"Client settings were reloaded by the server: {other_role_changes}"
+    return True
+
+def test_invalid_settings():
+    """Bad config values fail at startup (naming the setting) and reject a reload, instead of failing while running"""
+    print("\n" + "="*70)
+    print("TEST: Invalid Settings")
+    print("="*70)
+
+    server_module = import_entry_script('FRS-Discovery-Server.py')
+    bad_values = [
+        ('SERVER', 'Stream_Port', '70000'),
+        ('SERVER', 'Max_Clients', 'five'),
+        ('SERVER', 'Heartbeat_Timeout', '1'),  # Not longer than the default 2s Heartbeat_Interval
+        ('SERVER', 'Multicast_Group', '10.0.0.1'),
+        ('DIAGNOSTICS', 'Quiet_Console', 'maybe'),
+        ('CLIENT', 'Transport', 'sctp'),
+        ('CLIENT', 'Subscribe', 'colour=red'),
+    ]
+    for section, key, value in bad_values:
+        config = loopback_config()
+        config['CLIENT'] = {'Server_Address': '127.0.0.1', 'Stream_Port': '5992'}
+        ServerSettings.from_config(config), ClientSettings.from_config(config)  # Valid as loaded
+        config[section][key] = value
+        try:
+            ServerSettings.from_config(config) if section != 'CLIENT' else ClientSettings.from_config(config)
+        except SettingsError as e:
+            print(f"  {e}")
+            assert f"[{section}] {key}" in str(e), f"Error doesn't name the setting: {e}"
+        else:
+            raise AssertionError(f"[{section}] {key} = {value} was accepted")
+
+    settings = ServerSettings.from_config(loopback_config())
+    try:
+        settings.stream.port = 1
+        raise AssertionError("Settings can be changed in place")
+    except dataclasses.FrozenInstanceError:
+        pass
+
+    # A reload with a bad value keeps everything as it was
+    config_path = os.path.abspath('test-invalid-config.ini')
+    config = loopback_config()
+    try:
+        with open(config_path, 'w') as f:
+            config.write(f)
+        server = server_module.DiscoveryServer(config, config_path=config_path)
+        edited = loopback_config()
+        edited['SERVER'].update(Max_Clients='3', Stale_Default_Seconds='-1')
+        with open(config_path, 'w') as f:
+            edited.write(f)
+        changes = server.reloader.reload()
+    finally:
+        os.remove(config_path)
+    assert changes is None and server.reloader.reloads == 0, "The invalid reload was applied"
+    assert server.hub.max_clients == 5 and server.settings.stream.max_clients == 5, "A valid value of the rejected reload was applied"
+    return True
+
+def test_socket_handoff():
+    """A new server process takes over the sockets and clients of the running one without a reconnect"""
+    print("\n" + "="*70)
+    print("TEST: Socket Handoff")
+    print("="*70)
+
+    if not handoff_supported():
+        print("  Skipped: no descriptor passing on this platform")
+        return True
+
+    proxy = LoopbackProxy()
+    handoff_socket = os.path.abspath('test-handoff.sock')
+    old_server = None
+    try:
+        proxy.start_server(handoff_socket=handoff_socket)
+        proxy.start_radio()
+        proxy.start_client()
+        wait_for(lambda: proxy.client.broadcast_count >= 10, timeout=10, what="rebroadcasts")
+        wait_for(lambda: proxy.server.handoff, timeout=5, what="handoff socket")
+        old_server, old_thread = proxy.server, proxy.server_thread
+        connection = old_server.clients[0]
+        server_id, seq = old_server.hub.server_id, old_server.hub.frame_seq
+
+        started = time.perf_counter()
+        proxy.start_server(handoff_socket=handoff_socket)  # Same config: the new process takes over
+        old_thread.join(5.0)
+        takeover_seconds = time.perf_counter() - started
+
+        broadcasts = proxy.client.broadcast_count
+        wait_for(lambda: proxy.client.broadcast_count >= broadcasts + 10, timeout=5, what="rebroadcasts after handoff")
+        adopted = [(client.addr, client.packets_sent >= connection.packets_sent) for client in proxy.server.clients]
+        new_server_id, new_seq = proxy.server.hub.server_id, proxy.server.hub.frame_seq
+        client = proxy.client
+        gaps, restarts, compressed = client.sequence_gaps, client.server_restarts, client.framer.compressed_frames
+        old_stopped = not old_thread.is_alive() and old_server.handed_off
+    finally:
+        proxy.close()
+
+    print(f"  Takeover in {takeover_seconds * 1000:.0f} ms | stream #{seq} -> #{new_seq} | "
+          f"sequence gaps {gaps} | compressed frames {compressed}")
+    assert old_stopped, "The old server did not hand over and exit"
+    assert adopted == [(connection.addr, True)], f"Client connection not adopted: {adopted}"
+    assert new_server_id == server_id and new_seq > seq, "The stream did not continue under the same server ID"
+    assert gaps == 0 and restarts == 0, f"Client saw {gaps} sequence gap(s) and {restarts} server restart(s)"
+    return True
+
+def test_fast_start():
+    """With Fast_Start the first packet is forwarded within 100 ms and the startup tests still run"""
+    print("\n" + "="*70)
+    print("TEST: Fast Start")
+    print("="*70)
+
+    proxy = LoopbackProxy()
+    try:
+        # The radio is already broadcasting, as after a service restart
+        proxy.discovery_port = free_udp_port()
+        proxy.start_radio(rate=500.0)
+        proxy.start_server(fast_start=True)
+        wait_for(lambda: proxy.server.startup.first_packet is not None, timeout=5, what="first packet forwarded")
+        wait_for(lambda: proxy.server.startup_check_results is not None, timeout=30, what="deferred startup tests")
+        summary = proxy.server.startup.summary()
+        first_packet = proxy.server.startup.first_packet
+        phases = [phase for phase, _ in proxy.server.startup.phases]
+        checks = len(proxy.server.startup_check_results)
+    finally:
+        proxy.close()
+
+    print(f"  {summary}")
+    print(f"  Deferred startup tests: {checks} result(s)")
+    check_budget("First packet forwarded", first_packet, FAST_START_BUDGET)
+    assert 'health checks' not in phases, f"Startup tests ran before forwarding: {phases}"
+    assert checks > 0, "The deferred startup tests reported nothing"
+    return True
+
+def test_flood_protection():
+    """A flooding source is rate limited and a source off the allowlist is dropped, before forwarding"""
+    print("\n" + "="*70)
+    print("TEST: Flood Protection")
+    print("="*70)
+
+    rate, burst = 10.0, 20
+    proxy = LoopbackProxy()
+    rogue = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    rogue.bind(('127.0.0.2', 0))
+    try:
+        proxy.start_server(options={'Source_Rate_Limit': str(rate), 'Source_Burst': str(burst),
+                                    'Allowed_Sources': '127.0.0.1/32'})
+        proxy.start_client()
+        wait_for(lambda: proxy.server.clients, timeout=5, what="client connection")
+        started = time.perf_counter()
+        proxy.start_radio(rate=200.0)  # Twenty times the limit
+        for _ in range(20):
+            rogue.sendto(proxy.emitter.next_packet(0, 0), ('127.0.0.1', proxy.discovery_port))
+        time.sleep(1.0)
+        proxy.emitter.stop()
+        elapsed = time.perf_counter() - started
+        wait_for(lambda: proxy.server.ingress.sources.get('127.0.0.2', None) is not None
+                 and proxy.server.ingress.sources['127.0.0.2'].packets == 20, timeout=5, what="rogue packets")
+        forwarded = proxy.server.packet_count
+        sources = proxy.server.ingress.summary()['sources']
+        broadcasts = proxy.client.broadcast_count
+    finally:
+        rogue.close()
+        proxy.close()
+
+    radio, stranger = sources['127.0.0.1'], sources['127.0.0.2']
+    print(f"  Radio: {radio['packets']} received, {radio['dropped']} dropped | "
+          f"127.0.0.2: {stranger['packets']} received, {stranger['dropped']} dropped | forwarded {forwarded}")
+    assert radio['dropped'] > 0, "The flood was not rate limited"
+    assert forwarded <= burst + rate * elapsed + 2, f"{forwarded} packets forwarded in {elapsed:.1f}s"
+    assert stranger == {'packets': 20, 'dropped': 20, 'allowed': False}, f"Source off the allowlist: {stranger}"
+    assert broadcasts > 0, "Admitted packets were not forwarded"
+    return True
+
+def test_flood_from_many_sources():
+    """After a flood from more addresses than are tracked, a new radio still gets its own rate limit
+
+    Run without and with an allowlist covering the flood: allowed addresses are bounded by the table too.
+    """
+    print("\n" + "="*70)
+    print("TEST: Flood From Many Sources")
+    print("="*70)
+
+    flood_sources = [f"127.0.{1 + i // 250}.{1 + i % 250}" for i in range(300)]
+    for allowed, shared_key in (('', OTHER_SOURCES), ('127.0.0.0/16', OTHER_ALLOWED_SOURCES)):
+        proxy = LoopbackProxy()
+        try:
+            proxy.start_server(options={'Source_Rate_Limit': '10', 'Source_Burst': '20', 'Allowed_Sources': allowed})
+            proxy.server.ingress.idle = 0.5  # Forget quiet sources sooner than in service
+            target = ('127.0.0.1', proxy.discovery_port)
+            flood = build_discovery_packet(radio_fields(0))
+            for address in flood_sources:
+                with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+                    sock.bind((address, 0))
+                    for _ in range(5):
+                        sock.sendto(flood, target)
+                time.sleep(0.001)  # Stay within the receive buffer
+            wait_for(lambda: shared_key in proxy.server.ingress.sources, timeout=5, what="source table full")
+            shared = proxy.server.ingress.sources[shared_key]
+            flood_tracked = len(proxy.server.ingress.sources)
+            time.sleep(1.0)  # The flood is over: its sources go quiet
+
+            with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+                sock.bind(('127.0.9.1', 0))
+                radio = build_discovery_packet(radio_fields(7))
+                for _ in range(10):
+                    sock.sendto(radio, target)
+                    time.sleep(0.05)
+            wait_for(lambda: '127.0.9.1' in proxy.server.ingress.sources
+                     and proxy.server.ingress.sources['127.0.9.1'].packets == 10, timeout=5, what="new radio packets")
+            state = proxy.server.ingress.sources['127.0.9.1']
+            new_radio = (state.packets, state.dropped)
+            tracked = len(proxy.server.ingress.sources)
+        finally:
+            proxy.close()
+
+        print(f"  Allowed_Sources {allowed or '(any)'}: flood overflow bucket {shared.packets} packet(s), "
+              f"{flood_tracked} source(s) tracked | new radio: {new_radio[0]} received, {new_radio[1]} dropped | "
+              f"{tracked} source(s) tracked")
+        assert flood_tracked <= MAX_SOURCES + 2, f"Source table grew past its bound: {flood_tracked}"
+        assert new_radio == (10, 0), f"New radio not admitted at its own rate: {new_radio}"
+    return True
+
+def test_capture_flush():
+    """Captured packets reach disk within the flush interval after traffic stops, not only at shutdown"""
+    print("\n" + "="*70)
+    print("TEST: Capture Flush")
+    print("="*70)
+
+    capture_path = os.path.abspath('test-capture.frscap')
+    proxy = LoopbackProxy()
+    try:
+        proxy.start_server(options={'Capture_File': capture_path})
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+            for index in range(3):
+                sock.sendto(build_discovery_packet(radio_fields(index)), ('127.0.0.1', proxy.discovery_port))
+        wait_for(lambda: proxy.server.packet_count >= 3, timeout=5, what="captured packets")
+        # Then silence: only the scheduled flush can write the buffered records
+        started = time.perf_counter()
+
+        def records_on_disk():
+            with CaptureReader(capture_path) as reader:
+                return len(reader)
+        wait_for(lambda: records_on_disk() == 3, timeout=proxy.server.recorder.flush_interval + 2,
+                 what="capture flushed while the server runs")
+        flush_seconds = time.perf_counter() - started
+    finally:
+        proxy.close()
+        for path in (capture_path, capture_path + '.idx'):
+            if os.path.exists(path):
+                os.remove(path)
+
+    print(f"  3 record(s) on disk {flush_seconds:.2f}s after the last packet, server still running")
+    return True
+
+def test_echo_suppression():
+    """Copies of the radio's packets from another address (a looped-back rebroadcast) are not forwarded"""
+    print("\n" + "="*70)
+    print("TEST: Echo Suppression")
+    print("="*70)
+
+    proxy = LoopbackProxy()
+    echo = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    echo.bind(('127.0.0.2', 0))  # Stands in for a client rebroadcasting onto the radio LAN
+    try:
+        proxy.start_server()
+        proxy.start_client()
+        proxy.start_radio()
+        wait_for(lambda: proxy.server.packet_count >= 5, timeout=5, what="radio packets")
+        for _ in range(10):
+            echo.sendto(proxy.emitter.next_packet(0, 0), ('127.0.0.1', proxy.discovery_port))
+        # Another radio's packet from the same address is not an echo
+        echo.sendto(build_discovery_packet(radio_fields(1)), ('127.0.0.1', proxy.discovery_port))
+        wait_for(lambda: len(proxy.server.radios) == 2, timeout=5, what="second radio")
+        echoes = proxy.server.echoes.summary()
+    finally:
+        echo.close()
+        proxy.close()
+
+    print(f"  Echoes dropped: {echoes['dropped']} ({echoes['sources']})")
+    assert echoes['sources'] == {'127.0.0.2': 10}, f"Echoes not all dropped: {echoes}"
+    return True
+
+def main():
+    """Run all tests"""
+    print("\n" + "="*70)
+    print("FlexRadio Discovery Proxy - Loopback Integration Tests")
+    print("="*70)
+
+    tests = [
+        ("Startup and First Rebroadcast", test_startup_and_first_rebroadcast),
+        ("Recovery After Server Restart", test_recovery_after_server_restart),
+        ("Recovery After Link Drop", test_recovery_after_link_drop),
+        ("Resume After Link Drop", test_resume_after_link_drop),
+        ("Radio Gone Detection", test_radio_gone),
+        ("Dead Client Detection", test_dead_client_detection),
+        ("Dead Server Detection", test_dead_server_detection),
+        ("Relay Mode", test_relay_mode),
+        ("Multicast Egress and Fallback", test_multicast_egress),
+        ("UDP Transport", test_udp_transport),
+        ("UDP Loss", test_udp_loss),
+        ("Stream Compression", test_stream_compression),
+        ("Subscription Filters", test_subscription_filters),
+        ("Hello Handshake", test_hello_handshake),
+        ("Hello Unanswered", test_hello_unanswered),
+        ("Admin Socket", test_admin_socket),
+        ("Config Reload", test_config_reload),
+        ("Invalid Settings", test_invalid_settings),
+        ("Socket Handoff", test_socket_handoff),
+        ("Fast Start", test_fast_start),
+        ("Flood Protection", test_flood_protection),
+        ("Echo Suppression", test_echo_suppression),
+        ("Flood From Many Sources", test_flood_from_many_sources),
+        ("Capture Flush", test_capture_flush)
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test_name, test_func in tests:
+        try:
+            if test_func():
+                passed += 1
+        except AssertionError as e:
+            print(f"\n[X] Test FAILED: {test_name}")
+            print(f"  Error: {e}")
+            failed += 1
+        except Exception as e:
+            print(f"\n[X] Test ERROR: {test_name}")
+            print(f"  Exception: {e}")
+            failed += 1
+
+    # Summary
+    print("\n" + "="*70)
+    print("TEST SUMMARY")
+    print("="*70)
+    print(f"Total Tests: {len(tests)}")
+    print(f"Passed: {passed}")
+    print(f"Failed: {failed}")
+    print("="*70)
+
+    if failed == 0:
+        print("\n[+] ALL TESTS PASSED!")
+        return 0
+    else:
+        print(f"\n[X] {failed} TEST(S) FAILED")
+        return 1
+
+if __name__ == "__main__":
+    sys.exit(main())
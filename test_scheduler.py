@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Tests for the housekeeping scheduler (timer heap)
+"""
+
+import sys
+from scheduler import Scheduler
+
+class FakeClock:
+    """Manually advanced monotonic clock"""
+    def __init__(self):
+        self.now = 100.0
+    
+    def __call__(self):
+        return self.now
+    
+    def advance(self, seconds):
+        self.now += seconds
+
+def test_periodic_tasks_run_on_time():
+    """Periodic tasks run at their own intervals regardless of wakeups"""
+    clock = FakeClock()
+    scheduler = Scheduler(clock)
+    runs = []
+    scheduler.every(1.0, lambda: runs.append(('fast', clock.now)), name='fast')
+    scheduler.every(2.5, lambda: runs.append(('slow', clock.now)), name='slow')
+    
+    # Frequent wakeups (steady traffic) never starve the tasks
+    for _ in range(48):
+        clock.advance(0.125)
+        scheduler.run_due()
+    
+    fast = [t for name, t in runs if name == 'fast']
+    slow = [t for name, t in runs if name == 'slow']
+    assert len(fast) == 6, f"Expected 6 fast runs, got {len(fast)}"
+    assert len(slow) == 2, f"Expected 2 slow runs, got {len(slow)}"
+    assert slow[0] == 102.5, f"Slow task ran at {slow[0]}"
+    return True
+
+def test_time_until_next():
+    """Wakeup timeout is the time until the earliest deadline, capped"""
+    clock = FakeClock()
+    scheduler = Scheduler(clock)
+    assert scheduler.time_until_next(maximum=1.0) == 1.0
+    scheduler.call_later(0.3, lambda: None)
+    assert abs(scheduler.time_until_next(maximum=1.0) - 0.3) < 1e-9
+    clock.advance(0.5)
+    assert scheduler.time_until_next(maximum=1.0) == 0.0
+    return True
+
+def test_reschedule_and_cancel():
+    """Rescheduled tasks run once at the new deadline; cancelled tasks never run"""
+    clock = FakeClock()
+    scheduler = Scheduler(clock)
+    runs = []
+    task = scheduler.call_later(5.0, lambda: runs.append('moved'))
+    scheduler.reschedule(task, 1.0)
+    cancelled = scheduler.call_later(0.5, lambda: runs.append('cancelled'))
+    scheduler.cancel(cancelled)
+    assert len(scheduler) == 1, f"Expected 1 pending task, got {len(scheduler)}"
+    
+    clock.advance(1.0)
+    scheduler.run_due()
+    clock.advance(5.0)
+    scheduler.run_due()
+    assert runs == ['moved'], f"Unexpected runs: {runs}"
+    return True
+
+def test_missed_runs_are_skipped():
+    """A periodic task that fell far behind runs once, not once per missed interval"""
+    clock = FakeClock()
+    scheduler = Scheduler(clock)
+    runs = []
+    scheduler.every(1.0, lambda: runs.append(clock.now))
+    clock.advance(10.0)
+    scheduler.run_due()
+    assert len(runs) == 1, f"Expected 1 catch-up run, got {len(runs)}"
+    assert abs(scheduler.time_until_next(maximum=5.0) - 1.0) < 1e-9
+    return True
+
+def test_failing_task_keeps_schedule():
+    """An exception in a task doesn't stop other or later runs"""
+    clock = FakeClock()
+    scheduler = Scheduler(clock)
+    runs = []
+    
+    def failing():
+        runs.append('failing')
+        raise RuntimeError("boom")
+    
+    scheduler.every(1.0, failing)
+    scheduler.every(1.0, lambda: runs.append('ok'))
+    for _ in range(2):
+        clock.advance(1.0)
+        scheduler.run_due()
+    assert runs.count('failing') == 2 and runs.count('ok') == 2, f"Unexpected runs: {runs}"
+    return True
+
+def main():
+    """Run all tests"""
+    print("\n" + "="*70)
+    print("FlexRadio Discovery Proxy - Scheduler Tests")
+    print("="*70)
+    
+    tests = [
+        ("Periodic Tasks Run On Time", test_periodic_tasks_run_on_time),
+        ("Time Until Next Deadline", test_time_until_next),
+        ("Reschedule and Cancel", test_reschedule_and_cancel),
+        ("Missed Runs Skipped", test_missed_runs_are_skipped),
+        ("Failing Task Keeps Schedule", test_failing_task_keeps_schedule)
+    ]
+    
+    passed = 0
+    failed = 0
+    
+    for test_name, test_func in tests:
+        try:
+            if test_func():
+                print(f"[+] {test_name}")
+                passed += 1
+        except AssertionError as e:
+            print(f"\n[X] Test FAILED: {test_name}")
+            print(f"  Error: {e}")
+            failed += 1
+        except Exception as e:
+            print(f"\n[X] Test ERROR: {test_name}")
+            print(f"  Exception: {e}")
+            failed += 1
+    
+    print("\n" + "="*70)
+    print(f"Passed: {passed} | Failed: {failed}")
+    print("="*70)
+    return 0 if failed == 0 else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,321 @@
+#!/usr/bin/env python3
+"""
+FlexRadio Discovery Proxy - Traffic Capture Module
+Records received discovery datagrams to a compact indexed capture file and
+replays them into a server for offline debugging, benchmarks and regression
+tests.
+
+Capture file layout (little-endian):
+    8-byte magic, then one record per datagram:
+        float64 arrival time (Unix), 4-byte IPv4 source address,
+        uint16 source port, uint16 datagram length, datagram bytes
+    Sidecar index (<capture>.idx): uint64 file offset of every record
+
+The index is rebuilt by scanning the capture if it is missing or does not
+match (e.g. after a crash), and a partial trailing record is discarded.
+    
+    python traffic_capture.py info field.frscap
+    python traffic_capture.py replay field.frscap                  # into an in-process server, original speed
+    python traffic_capture.py replay field.frscap --speed 10       # 10x speed
+    python traffic_capture.py replay field.frscap --speed 0        # as fast as possible
+    python traffic_capture.py replay field.frscap --target 10.0.0.5:4992
+
+Copyright (c) 2026 Chris L White (WX7V)
+
+Licensed under the MIT License - see LICENSE file for details
+"""
+
+import array
+import collections
+import mmap
+import os
+import socket
+import struct
+import sys
+import time
+from typing import Callable, List, NamedTuple, Optional, Tuple
+
+CAPTURE_MAGIC = b'FRSCAP\x00\x01'
+RECORD_HEADER = struct.Struct('<d4sHH')
+INDEX_SUFFIX = '.idx'
+
+
+class CaptureRecord(NamedTuple):
+    timestamp: float
+    addr: Tuple[str, int]
+    data: bytes
+
+
+def _scan_offsets(buf, size: int) -> Tuple[List[int], int]:
+    """Offsets of all complete records in a capture buffer and the end of the last one"""
+    offsets = []
+    offset = len(CAPTURE_MAGIC)
+    while offset + RECORD_HEADER.size <= size:
+        length = RECORD_HEADER.unpack_from(buf, offset)[3]
+        end = offset + RECORD_HEADER.size + length
+        if end > size:
+            break
+        offsets.append(offset)
+        offset = end
+    return offsets, offset
+
+
+def _load_index(path: str, buf, size: int) -> Optional[array.array]:
+    """Record offsets from the sidecar index, or None if it is missing or stale"""
+    try:
+        with open(path + INDEX_SUFFIX, 'rb') as f:
+            raw = f.read()
+    except OSError:
+        return None
+    offsets = array.array('Q')
+    offsets.frombytes(raw[:len(raw) - len(raw) % offsets.itemsize])
+    if sys.byteorder == 'big':
+        offsets.byteswap()
+    if not offsets:
+        return offsets if size == len(CAPTURE_MAGIC) else None
+    last = offsets[-1]
+    if last + RECORD_HEADER.size > size:
+        return None
+    if last + RECORD_HEADER.size + RECORD_HEADER.unpack_from(buf, last)[3] != size:
+        return None
+    return offsets
+
+
+def _write_index(path: str, offsets):
+    index = array.array('Q', offsets)
+    if sys.byteorder == 'big':
+        index.byteswap()
+    with open(path + INDEX_SUFFIX, 'wb') as f:
+        index.tofile(f)
+
+
+class CaptureWriter:
+    """Appends received datagrams to a capture file
+    
+    Writes are buffered, so recording costs a couple of in-memory copies per
+    packet. The owner calls flush() every `flush_interval` seconds from a
+    timer (the server schedules it), so records reach disk even when traffic
+    stops; close() flushes the rest. Appending to an existing capture
+    repairs its tail and index first.
+    """
+    
+    def __init__(self, path: str, flush_interval: float = 1.0):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.records = 0
+        
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            self._repair(path)
+        else:
+            with open(path, 'wb') as f:
+                f.write(CAPTURE_MAGIC)
+            _write_index(path, [])
+        
+        self._file = open(path, 'ab', buffering=65536)
+        self._index = open(path + INDEX_SUFFIX, 'ab', buffering=16384)
+        self._offset = self._file.tell()
+    
+    @staticmethod
+    def _repair(path: str):
+        """Drop a partial trailing record and rebuild a stale index"""
+        with open(path, 'r+b') as f:
+            size = os.fstat(f.fileno()).st_size
+            if size < len(CAPTURE_MAGIC):
+                raise ValueError(f"{path} is not a discovery capture file")
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+                if buf[:len(CAPTURE_MAGIC)] != CAPTURE_MAGIC:
+                    raise ValueError(f"{path} is not a discovery capture file")
+                if _load_index(path, buf, size) is not None:
+                    return
+                offsets, end = _scan_offsets(buf, size)
+            if end != size:
+                f.truncate(end)
+        _write_index(path, offsets)
+    
+    def write(self, data: bytes, addr: Tuple[str, int], timestamp: float):
+        """Append one datagram received from `addr` at `timestamp`"""
+        header = RECORD_HEADER.pack(timestamp, socket.inet_aton(addr[0]), addr[1], len(data))
+        self._index.write(self._offset.to_bytes(8, 'little'))
+        self._file.write(header)
+        self._file.write(data)
+        self._offset += RECORD_HEADER.size + len(data)
+        self.records += 1
+    
+    def flush(self):
+        # Data before index, so the index never points past the data
+        self._file.flush()
+        self._index.flush()
+    
+    def close(self):
+        if not self._file.closed:
+            self.flush()
+            self._file.close()
+            self._index.close()
+
+
+class CaptureReader:
+    """Random-access reader for a capture file (memory-mapped)"""
+    
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, 'rb')
+        size = os.fstat(self._file.fileno()).st_size
+        if size < len(CAPTURE_MAGIC):
+            self._file.close()
+            raise ValueError(f"{path} is not a discovery capture file")
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mmap[:len(CAPTURE_MAGIC)] != CAPTURE_MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not a discovery capture file")
+        
+        offsets = _load_index(path, self._mmap, size)
+        if offsets is None:
+            offsets, _ = _scan_offsets(self._mmap, size)
+        self._offsets = offsets
+    
+    def __len__(self):
+        return len(self._offsets)
+    
+    def __getitem__(self, index: int) -> CaptureRecord:
+        offset = self._offsets[index]
+        timestamp, address, port, length = RECORD_HEADER.unpack_from(self._mmap, offset)
+        start = offset + RECORD_HEADER.size
+        return CaptureRecord(timestamp, (socket.inet_ntoa(address), port), self._mmap[start:start + length])
+    
+    def __iter__(self):
+        for index in range(len(self._offsets)):
+            yield self[index]
+    
+    def close(self):
+        self._mmap.close()
+        self._file.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+
+
+def replay(reader: CaptureReader, deliver: Callable[[CaptureRecord], None], speed: float = 1.0,
+           start: int = 0, count: Optional[int] = None) -> dict:
+    """Feed capture records to `deliver` with their original spacing
+    
+    Args:
+        reader: Capture to replay
+        deliver: Called with each CaptureRecord
+        speed: 1.0 = original speed, N = N times faster, 0 = as fast as possible
+        start: Index of the first record to replay
+        count: Number of records to replay (default: all remaining)
+    
+    Returns:
+        Dictionary with packets, elapsed seconds and the capture time span covered
+    """
+    end = len(reader) if count is None else min(len(reader), start + count)
+    first_timestamp = None
+    last_timestamp = None
+    started = time.perf_counter()
+    
+    for index in range(start, end):
+        record = reader[index]
+        if first_timestamp is None:
+            first_timestamp = record.timestamp
+        last_timestamp = record.timestamp
+        if speed > 0:
+            delay = started + (record.timestamp - first_timestamp) / speed - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        deliver(record)
+    
+    elapsed = time.perf_counter() - started
+    return {
+        'packets': max(0, end - start),
+        'elapsed': elapsed,
+        'capture_span': (last_timestamp - first_timestamp) if first_timestamp is not None else 0.0,
+    }
+
+
+def udp_sender(target: Tuple[str, int]) -> Callable[[CaptureRecord], None]:
+    """Deliver function that sends each record's datagram to `target` over UDP"""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    
+    def deliver(record: CaptureRecord):
+        sock.sendto(record.data, target)
+    return deliver
+
+
+def server_feeder(server) -> Callable[[CaptureRecord], None]:
+    """Deliver function that hands each record straight to DiscoveryServer.handle_datagram
+    
+    Records keep their original source address and arrival time, so repeated
+    replays of the same capture produce identical frames.
+    """
+    def deliver(record: CaptureRecord):
+        server.handle_datagram(record.data, record.addr, record.timestamp)
+    return deliver
+
+
+def print_info(reader: CaptureReader):
+    """Print a summary of a capture file"""
+    print(f"Capture: {reader.path}")
+    print(f"Records: {len(reader)}")
+    if not len(reader):
+        return
+    first, last = reader[0], reader[len(reader) - 1]
+    span = last.timestamp - first.timestamp
+    print(f"From:    {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(first.timestamp))}")
+    print(f"To:      {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(last.timestamp))} ({span:.1f}s)")
+    sources = collections.Counter(f"{record.addr[0]}:{record.addr[1]}" for record in reader)
+    print("Sources:")
+    for source, packets in sources.most_common():
+        print(f"  {source:22} {packets} packet(s)")
+
+
+def main():
+    import argparse  # Only the command line needs it (the server imports CaptureWriter)
+    parser = argparse.ArgumentParser(description="Inspect and replay discovery traffic captures")
+    commands = parser.add_subparsers(dest='command', required=True)
+    
+    info_parser = commands.add_parser('info', help="Summarize a capture file")
+    info_parser.add_argument('capture')
+    
+    replay_parser = commands.add_parser('replay', help="Replay a capture into a server")
+    replay_parser.add_argument('capture')
+    replay_parser.add_argument('--speed', type=float, default=1.0,
+                               help="1 = original speed, N = N times faster, 0 = as fast as possible (default 1)")
+    replay_parser.add_argument('--target', help="Send to a running server over UDP: HOST:DISCOVERY_PORT "
+                                                "(default: in-process server)")
+    replay_parser.add_argument('--start', type=int, default=0, help="First record to replay")
+    replay_parser.add_argument('--count', type=int, help="Number of records to replay")
+    args = parser.parse_args()
+    
+    with CaptureReader(args.capture) as reader:
+        if args.command == 'info':
+            print_info(reader)
+            return 0
+        
+        if args.target:
+            host, port = args.target.rsplit(':', 1)
+            deliver = udp_sender((host, int(port)))
+            destination = f"{host}:{port}"
+        else:
+            from simulation import import_entry_script, loopback_config
+            server_module = import_entry_script('FRS-Discovery-Server.py')
+            server = server_module.DiscoveryServer(loopback_config())
+            deliver = server_feeder(server)
+            destination = "in-process server"
+        
+        speed = "max speed" if args.speed <= 0 else f"{args.speed:g}x"
+        print(f"Replaying {reader.path} into {destination} at {speed}...")
+        results = replay(reader, deliver, speed=args.speed, start=args.start, count=args.count)
+    
+    rate = results['packets'] / results['elapsed'] if results['elapsed'] > 0 else 0.0
+    print(f"Replayed {results['packets']} packet(s) spanning {results['capture_span']:.1f}s "
+          f"in {results['elapsed']:.3f}s ({rate:.0f} packets/s)")
+    if not args.target and args.speed <= 0 and results['packets']:
+        print(f"Server processing: {results['elapsed'] / results['packets'] * 1e6:.1f} µs per packet")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())